@@ -0,0 +1,169 @@
+"""
+Agendador único das requisições (páginas pelo caminho HTTP e pelo navegador, sitemaps e o
+download do fallback newspaper3k), por host, e a única camada de retentativa do pipeline:
+
+- no máximo CONEXOES_POR_HOST requisições simultâneas ao mesmo host;
+- ritmo limitado a uma taxa (requisições/s) por host, ajustada no estilo AIMD: cada sucesso
+  soma AUMENTO_TAXA, uma falha transitória (429, 5xx, timeout) multiplica por FATOR_REDUCAO_TAXA
+  (no máximo uma redução a cada INTERVALO_MIN_REDUCAO_S, como o TCP faz por RTT);
+- falhas transitórias são refeitas até MAX_TENTATIVAS vezes, com espera exponencial com jitter
+  (ou o Retry-After do servidor, que também pausa o host para todos os workers).
+
+Quando o site fica lento ou começa a recusar, os workers passam a esperar a vez em vez de
+esgotar a fila gerando placeholders.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import metricas
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+CONEXOES_POR_HOST = int(os.environ.get("BLOG99_CONEXOES_POR_HOST", "8"))
+TAXA_INICIAL = float(os.environ.get("BLOG99_REQUISICOES_POR_SEGUNDO", "5")) # Requisições/s por host
+TAXA_MAXIMA = float(os.environ.get("BLOG99_REQUISICOES_POR_SEGUNDO_MAX", "20"))
+TAXA_MINIMA = 0.2
+AUMENTO_TAXA = 0.5 # Aumento aditivo a cada sucesso
+FATOR_REDUCAO_TAXA = 0.5 # Redução multiplicativa a cada falha transitória
+INTERVALO_MIN_REDUCAO_S = 1.0 # Falhas em rajada (várias URLs ao mesmo tempo) reduzem a taxa uma vez só
+MAX_TENTATIVAS = 3
+ESPERA_BASE_S = 1.0
+ESPERA_MAXIMA_S = 60.0
+
+
+class FalhaTransitoria(Exception):
+    """Falha que vale tentar de novo mais tarde (ex.: HTTP 429 ou 5xx). espera_s vem do Retry-After, se houver."""
+
+    def __init__(self, mensagem, espera_s=None):
+        super().__init__(mensagem)
+        self.espera_s = espera_s
+
+
+def espera_retry_after(valor):
+    """Segundos indicados num cabeçalho Retry-After (em segundos ou data HTTP), ou None."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def host_da_url(url):
+    return urlparse(url).netloc.lower()
+
+
+class _Host:
+    def __init__(self, conexoes, taxa):
+        self.vagas = threading.BoundedSemaphore(conexoes)
+        self.taxa = taxa
+        self.proxima_liberacao = 0.0 # time.monotonic() a partir do qual a próxima requisição pode sair
+        self.ultima_reducao = float("-inf")
+        self.lock = threading.Lock()
+
+
+class AgendadorHosts:
+    """Limites de concorrência e de ritmo por host, com backoff AIMD. Seguro para várias threads."""
+
+    def __init__(self, conexoes_por_host=CONEXOES_POR_HOST, taxa_inicial=TAXA_INICIAL, taxa_maxima=TAXA_MAXIMA,
+                 max_tentativas=MAX_TENTATIVAS):
+        self.conexoes_por_host = conexoes_por_host
+        self.taxa_inicial = taxa_inicial
+        self.taxa_maxima = taxa_maxima
+        self.max_tentativas = max_tentativas
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        nome = host_da_url(url)
+        with self._lock:
+            if nome not in self._hosts:
+                self._hosts[nome] = _Host(self.conexoes_por_host, self.taxa_inicial)
+            return self._hosts[nome]
+
+    def taxa(self, url):
+        """Taxa atual (requisições/s) do host da URL."""
+        return self._host(url).taxa
+
+    def _aguardar_vez(self, host):
+        with host.lock:
+            agora = time.monotonic()
+            inicio = max(agora, host.proxima_liberacao)
+            host.proxima_liberacao = inicio + 1.0 / host.taxa
+        if inicio > agora:
+            metricas.registrar_duracao("agendador_espera", inicio - agora)
+            time.sleep(inicio - agora)
+
+    def _sucesso(self, host):
+        with host.lock:
+            host.taxa = min(self.taxa_maxima, host.taxa + AUMENTO_TAXA)
+
+    def _falha(self, host, pausa_s=None):
+        with host.lock:
+            agora = time.monotonic()
+            reduziu = agora - host.ultima_reducao >= INTERVALO_MIN_REDUCAO_S
+            if reduziu:
+                host.taxa = max(TAXA_MINIMA, host.taxa * FATOR_REDUCAO_TAXA)
+                host.ultima_reducao = agora
+            if pausa_s:
+                host.proxima_liberacao = max(host.proxima_liberacao, agora + pausa_s)
+            taxa = host.taxa
+        if reduziu:
+            metricas.contar("agendador_reducoes_taxa")
+        return taxa
+
+    def executar(self, url, funcao, transitorias=()):
+        """
+        Executa funcao() (a requisição da página) respeitando os limites do host da URL.
+
+        Args:
+            url (str): URL da página; o host define os limites aplicados.
+            funcao (callable): Função sem argumentos que faz a requisição e retorna o resultado.
+                Deve levantar FalhaTransitoria para respostas que valem nova tentativa (429, 5xx).
+            transitorias (tuple): Outras exceções tratadas como transitórias (ex.: timeouts).
+
+        Returns:
+            O retorno de funcao(). Esgotadas as tentativas, a última exceção é propagada.
+        """
+        host = self._host(url)
+        for tentativa in range(1, self.max_tentativas + 1):
+            with host.vagas:
+                self._aguardar_vez(host)
+                try:
+                    resultado = funcao()
+                except (FalhaTransitoria, *transitorias) as e:
+                    erro = e
+                else:
+                    self._sucesso(host)
+                    return resultado
+            retry_after = getattr(erro, "espera_s", None)
+            taxa = self._falha(host, pausa_s=retry_after)
+            if tentativa == self.max_tentativas:
+                logger.error(f"❌ {url}: falha transitória após {tentativa} tentativas ({type(erro).__name__}: {erro}).")
+                raise erro
+            # Espera exponencial com jitter completo, ou o Retry-After informado pelo servidor
+            espera = retry_after if retry_after is not None else random.uniform(0, min(ESPERA_MAXIMA_S, ESPERA_BASE_S * 2 ** tentativa))
+            logger.warning(
+                f"Falha transitória em {url} ({type(erro).__name__}: {erro}). Tentativa {tentativa + 1}/{self.max_tentativas} "
+                f"em {espera:.1f}s; ritmo do host reduzido para {taxa:.2f} req/s."
+            )
+            metricas.contar("agendador_retentativas")
+            time.sleep(espera)
+
+
+_agendador = utilitarios.compartilhado(AgendadorHosts)
+
+
+def obter_agendador():
+    """Retorna o agendador compartilhado por todos os workers (criado no primeiro uso)."""
+    return _agendador()
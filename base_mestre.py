@@ -0,0 +1,144 @@
+"""
+Base mestre dos posts em Parquet, particionada por categoria e só de acréscimo.
+
+Cada execução grava, em cada categoria que tocou, um novo arquivo de parte com apenas as
+linhas novas ou alteradas. Na leitura, a versão mais recente de cada URL prevalece (upsert
+por URL). O custo de uma execução depende do número de posts novos, não do tamanho do histórico;
+as partes de uma categoria são compactadas num único arquivo quando passam de MAX_PARTES_POR_CATEGORIA.
+
+O Excel deixa de ser a fonte de dados e passa a ser uma visão gerada a partir da base:
+    python base_mestre.py [saida.xlsx]
+"""
+import glob
+import logging
+import os
+import re
+import time
+
+import pandas as pd
+
+import exportador
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_BASE = "base_blog99"
+MAX_PARTES_POR_CATEGORIA = 20
+COLUNAS_BASE = [
+    'data_captura', 'data_publicacao', 'url', 'categoria', 'titulo',
+    'resumo_meta', 'topic_cluster', 'grupo_duplicata', 'conteudo'
+]
+COLUNAS_EXCEL = [coluna for coluna in COLUNAS_BASE if coluna != 'conteudo']
+
+
+def _nome_particao(categoria):
+    nome = categoria if isinstance(categoria, str) and categoria.strip() else "sem_categoria"
+    nome = re.sub(r"[^\w.-]+", "_", nome)
+    return f"categoria={nome}"
+
+
+def _mais_recente_por_url(df):
+    """Mantém a última versão de cada URL, na posição em que a URL apareceu pela primeira vez."""
+    if df.empty:
+        return df
+    colunas = list(df.columns)
+    ordem = df['url'].drop_duplicates()
+    return df.drop_duplicates(subset=['url'], keep='last').set_index('url').loc[ordem].reset_index()[colunas]
+
+
+def _ler_parte(caminho, colunas=None, filtros=None):
+    """Uma parte da base, só com as colunas pedidas que ela tem (partes antigas podem não ter colunas novas) e a 'url'."""
+    if colunas:
+        import pyarrow.parquet as pq
+        existentes = set(pq.read_schema(caminho).names)
+        colunas = [coluna for coluna in dict.fromkeys(['url', *colunas]) if coluna in existentes]
+    return pd.read_parquet(caminho, columns=colunas or None, filters=filtros)
+
+
+class BaseMestre:
+    """Base Parquet particionada por categoria (base_blog99/categoria=<nome>/parte-<n>.parquet)."""
+
+    def __init__(self, diretorio=DIRETORIO_BASE):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def partes(self, categoria=None):
+        """Arquivos de parte, do mais antigo para o mais novo (de uma categoria ou de todas)."""
+        particoes = [_nome_particao(categoria)] if categoria is not None else self._particoes()
+        return [caminho for particao in particoes for caminho in self._partes_da_particao(particao)]
+
+    def _particoes(self):
+        return sorted(nome for nome in os.listdir(self.diretorio) if nome.startswith("categoria="))
+
+    def _partes_da_particao(self, particao):
+        return sorted(glob.glob(os.path.join(self.diretorio, particao, "parte-*.parquet")))
+
+    def vazia(self):
+        return not self.partes()
+
+    def upsert(self, df):
+        """Grava as linhas novas ou alteradas de df como uma nova parte em cada categoria presente."""
+        if df.empty:
+            return 0
+        df = df[[coluna for coluna in COLUNAS_BASE if coluna in df.columns]]
+        for categoria, grupo in df.groupby('categoria', dropna=False, sort=False):
+            self._gravar_parte(categoria, grupo.drop_duplicates(subset=['url'], keep='last'))
+            if len(self.partes(categoria)) > MAX_PARTES_POR_CATEGORIA:
+                self.compactar(categoria)
+        logger.info(f"✅ Base mestre atualizada: {len(df)} linhas gravadas em {df['categoria'].nunique(dropna=False)} categorias.")
+        return len(df)
+
+    def _gravar_parte(self, categoria, df, particao=None):
+        diretorio = os.path.join(self.diretorio, particao or _nome_particao(categoria))
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, f"parte-{time.time_ns()}.parquet")
+        df.to_parquet(f"{caminho}.tmp", index=False)
+        with open(f"{caminho}.tmp", "rb+") as f:
+            os.fsync(f.fileno()) # A parte precisa estar em disco antes de as URLs contarem como processadas
+        os.replace(f"{caminho}.tmp", caminho)
+        return caminho
+
+    def ler(self, colunas=None, categorias=None, urls=None):
+        """
+        Lê a base com a versão mais recente de cada URL. Opcionalmente só algumas colunas, categorias ou URLs.
+        Colunas e URLs são filtradas na leitura de cada parte (o 'conteudo' não é lido se não for pedido).
+        """
+        caminhos = [caminho for categoria in categorias for caminho in self.partes(categoria)] if categorias else self.partes()
+        if not caminhos or (urls is not None and not len(urls)):
+            return pd.DataFrame(columns=colunas or COLUNAS_BASE)
+        filtros = [('url', 'in', list(urls))] if urls is not None else None
+        df = _mais_recente_por_url(pd.concat(
+            (_ler_parte(caminho, colunas, filtros) for caminho in caminhos), ignore_index=True
+        ))
+        if colunas:
+            df = df[[coluna for coluna in colunas if coluna in df.columns]]
+        return df
+
+    def compactar(self, categoria=None):
+        """Junta as partes de uma categoria (ou de todas) num único arquivo, mantendo só a última versão de cada URL."""
+        for particao in ([_nome_particao(categoria)] if categoria is not None else self._particoes()):
+            partes = self._partes_da_particao(particao)
+            if len(partes) <= 1:
+                continue
+            df = _mais_recente_por_url(pd.concat((pd.read_parquet(caminho) for caminho in partes), ignore_index=True))
+            # A parte compactada é gravada antes de apagar as antigas: um crash no meio só deixa versões repetidas
+            self._gravar_parte(categoria, df, particao=particao)
+            for caminho in partes:
+                os.remove(caminho)
+            logger.info(f"Base mestre: {len(partes)} partes de '{particao}' compactadas ({len(df)} URLs).")
+
+    def importar_excel(self, caminho, aba='Dados Brutos'):
+        """Migração única: carrega na base os posts de um Excel gerado por versões anteriores."""
+        df = pd.read_excel(caminho, sheet_name=aba)
+        logger.info(f"Importando {len(df)} linhas da aba '{aba}' de '{caminho}' para a base mestre...")
+        return self.upsert(df)
+
+    def gerar_excel(self, nome_base="blog99_resultado"):
+        """Regenera o Excel (Dados Brutos, Motorista, 99Pay) a partir da base."""
+        return exportador.exportar_para_excel(self.ler(colunas=COLUNAS_EXCEL), nome_base=nome_base)
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    nome_saida = sys.argv[1] if len(sys.argv) > 1 else "blog99_resultado.xlsx"
+    BaseMestre().gerar_excel(nome_base=nome_saida.replace('.xlsx', ''))
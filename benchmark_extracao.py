@@ -0,0 +1,292 @@
+"""
+Benchmark offline do crawler: sobe um servidor HTTP local com uma cópia sintética do blog
+(sitemap-index, sitemap .xml.gz, vários templates de post, páginas lentas e com erro) e mede
+sitemap, extração, NLP e exportação sem acessar a internet.
+Uso:
+    python benchmark_extracao.py [num_posts] [num_workers]
+Mostra, por etapa, URLs/s, percentis de latência por página e pico de memória (RSS),
+e grava tudo em benchmark_extracao.json.
+
+O caminho do navegador usa NavegadorHTTPLocal, que busca a página por HTTP e expõe a
+mesma interface mínima do WebDriver usada pelo crawler (get, page_source, find_element).
+"""
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+NUM_POSTS = 200
+NUM_WORKERS = 4
+SEMENTE = 99
+FRACAO_LENTAS = 0.05
+ATRASO_LENTAS_S = 0.5
+FRACAO_ERRO_500 = 0.03
+FRACAO_ERRO_404 = 0.02
+ARQUIVO_RESULTADO = "benchmark_extracao.json"
+SECOES = ["motorista", "99pay", "passageiro", "99moto", "99food"]
+
+_PARAGRAFO = (
+    "Manter o carro em dia evita multas e gastos inesperados. Confira a revisão, o alinhamento, "
+    "o balanceamento e a troca de óleo, e acompanhe o licenciamento e o IPVA no site do Detran. "
+    "Quem dirige por aplicativo também precisa planejar a renda extra e controlar os gastos mensais."
+)
+
+
+# --- Cópia sintética do blog ---
+
+def _template_post(n, tipo, secao):
+    titulo = f"Post {n} sobre {secao}: dicas de manutenção e economia"
+    meta_pub = '<meta property="article:published_time" content="2024-03-12T10:00:00+00:00">' if n % 3 else ""
+    data_texto = "" if meta_pub else f"<p class='data'>Publicado em {1 + n % 28:02d}/03/2024</p>"
+    corpo = "".join(f"<p>{_PARAGRAFO}</p>" for _ in range(4 + n % 6))
+    if tipo == "entry-content":
+        conteudo = f"<article class='entry-content'>{corpo}<figure><figcaption>Legenda</figcaption></figure></article>"
+    elif tipo == "td-post-content":
+        conteudo = f"<div class='td-post-content'>{corpo}<script>var x = 1;</script></div>"
+    else: # fina: conteúdo curto, força a escalada para o navegador e o fallback newspaper3k
+        conteudo = "<div class='entry-content'><p>Carregando...</p></div>"
+    menu = "".join(f"<li><a href='/blog/{s}/'>{s}</a></li>" for s in SECOES)
+    return (
+        f"<!DOCTYPE html><html lang='pt-BR'><head><meta charset='utf-8'><title>{titulo}</title>"
+        f"<meta name='description' content='Resumo do post {n} sobre {secao}.'>{meta_pub}"
+        f"<link rel='stylesheet' href='/static/estilo.css'></head><body>"
+        f"<header><nav><ul>{menu}</ul></nav></header><main>{data_texto}{conteudo}"
+        f"<aside>Posts relacionados</aside></main><footer>99 Tecnologia</footer></body></html>"
+    )
+
+
+def gerar_blog(num_posts, semente=SEMENTE):
+    """
+    Retorna {caminho: (status, content_type, corpo_bytes, atraso_s)} com o sitemap-index,
+    dois sitemaps filhos (um deles .xml.gz) e os posts.
+    """
+    aleatorio = random.Random(semente)
+    rotas = {}
+    urls_por_sitemap = {"/sitemap/posts-1.xml": [], "/sitemap/posts-2.xml.gz": []}
+    hoje = datetime(2024, 6, 1)
+    for n in range(num_posts):
+        secao = SECOES[n % len(SECOES)]
+        caminho = f"/blog/{secao}/post-{n}/"
+        sorteio = aleatorio.random()
+        tipo = aleatorio.choices(["entry-content", "td-post-content", "fina"], weights=[6, 3, 1])[0]
+        if sorteio < FRACAO_ERRO_500:
+            rota = (500, "text/html", b"<html><body>Erro interno</body></html>", 0)
+        elif sorteio < FRACAO_ERRO_500 + FRACAO_ERRO_404:
+            rota = (404, "text/html", b"<html><body>Nao encontrado</body></html>", 0)
+        else:
+            atraso = ATRASO_LENTAS_S if sorteio > 1 - FRACAO_LENTAS else 0
+            rota = (200, "text/html; charset=utf-8", _template_post(n, tipo, secao).encode("utf-8"), atraso)
+        rotas[caminho] = rota
+        lastmod = (hoje - timedelta(days=n)).strftime("%Y-%m-%d")
+        urls_por_sitemap[list(urls_por_sitemap)[n % 2]].append((caminho, lastmod))
+    # Páginas fora do padrão /blog/<secao>/<post>/, que o filtro do crawler deve descartar
+    urls_por_sitemap["/sitemap/posts-1.xml"] += [("/sobre", None), ("/blog/", None)]
+    return rotas, urls_por_sitemap
+
+
+class _ServidorBlog(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def _criar_handler(rotas, urls_por_sitemap):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            base = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+            caminho = self.path.split("?")[0]
+            if caminho == "/sitemap/index.xml":
+                itens = "".join(f"<sitemap><loc>{base}{filho}</loc></sitemap>" for filho in urls_por_sitemap)
+                corpo = f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{itens}</sitemapindex>'
+                return self._responder(200, "application/xml", corpo.encode("utf-8"))
+            if caminho in urls_por_sitemap:
+                itens = "".join(
+                    f"<url><loc>{base}{url}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</url>"
+                    for url, lastmod in urls_por_sitemap[caminho]
+                )
+                corpo = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{itens}</urlset>'.encode("utf-8")
+                if caminho.endswith(".gz"):
+                    return self._responder(200, "application/x-gzip", gzip.compress(corpo))
+                return self._responder(200, "application/xml", corpo)
+            status, tipo, corpo, atraso = rotas.get(caminho, (404, "text/html", b"Nao encontrado", 0))
+            if atraso:
+                time.sleep(atraso)
+            self._responder(status, tipo, corpo)
+
+        def _responder(self, status, tipo, corpo):
+            self.send_response(status)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass # Sem log por requisição: poluiria a saída e o próprio benchmark
+
+    return Handler
+
+
+def iniciar_servidor(num_posts):
+    """Sobe o blog sintético numa porta livre e retorna (servidor, url_base)."""
+    rotas, urls_por_sitemap = gerar_blog(num_posts)
+    servidor = _ServidorBlog(("127.0.0.1", 0), _criar_handler(rotas, urls_por_sitemap))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+class NavegadorHTTPLocal:
+    """Substituto offline do WebDriver: busca a página por HTTP e expõe get, page_source e find_element."""
+
+    def __init__(self):
+        import requests
+        self._sessao = requests.Session()
+        self.page_source = ""
+
+    def get(self, url):
+        self.page_source = self._sessao.get(url, timeout=10).text
+
+    def find_element(self, by, valor):
+        return self # Usado só pela espera do <body>, que sempre existe
+
+    def quit(self):
+        self._sessao.close()
+
+
+# --- Medição ---
+
+def _rss_atual_mb():
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    # Fora do Linux: pico do processo inteiro (ru_maxrss em KB no Linux, em bytes no macOS)
+    try:
+        import resource
+    except ImportError:
+        return 0.0 # Windows: sem /proc nem resource, o pico de memória não é medido
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+class _AmostradorRSS:
+    """Amostra o RSS em segundo plano durante uma etapa e guarda o pico."""
+
+    def __init__(self, intervalo=0.02):
+        self.intervalo = intervalo
+        self.pico_mb = 0.0
+        self._parar = threading.Event()
+
+    def __enter__(self):
+        self.pico_mb = _rss_atual_mb()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico_mb = max(self.pico_mb, _rss_atual_mb())
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.pico_mb = max(self.pico_mb, _rss_atual_mb())
+
+
+def _medir_etapa(nome, funcao, num_itens, etapa_latencia=None):
+    import metricas
+    metricas.reiniciar()
+    with _AmostradorRSS() as amostrador:
+        inicio = time.perf_counter()
+        retorno = funcao()
+        duracao = time.perf_counter() - inicio
+    resultado = {
+        "etapa": nome,
+        "itens": num_itens(retorno) if callable(num_itens) else num_itens,
+        "duracao_s": round(duracao, 3),
+        "pico_rss_mb": round(amostrador.pico_mb, 1),
+    }
+    resultado["itens_por_s"] = round(resultado["itens"] / duracao, 1) if duracao else None
+    if etapa_latencia:
+        latencias = metricas.resumo()["etapas"].get(etapa_latencia, {})
+        resultado.update({chave: latencias.get(chave) for chave in ("p50_s", "p95_s", "p99_s", "max_s")})
+    return resultado, retorno
+
+
+def executar(num_posts=NUM_POSTS, num_workers=NUM_WORKERS):
+    """Roda todas as etapas contra o blog local, num diretório temporário (cache e estado não são tocados)."""
+    diretorio_original = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    servidor, url_base = iniciar_servidor(num_posts)
+    with tempfile.TemporaryDirectory() as diretorio_temp:
+        os.chdir(diretorio_temp)
+        try:
+            import crawler
+            import exportador
+            import nlp_utils
+            import pool_workers
+
+            crawler.SITEMAP_URLS = [f"{url_base}/sitemap/index.xml"]
+            crawler.USAR_CACHE_HTML = False # Mede a extração de verdade, não o cache
+            resultados = []
+
+            resultado, urls = _medir_etapa("sitemap (baixar_sitemap_filtrado)", crawler.baixar_sitemap_filtrado, len)
+            resultados.append(resultado)
+
+            resultado, posts = _medir_etapa(
+                "extração (extrair_conteudo_da_url)",
+                lambda: pool_workers.processar_urls_em_paralelo(
+                    urls, fabrica_driver=NavegadorHTTPLocal, num_workers=num_workers
+                ),
+                len(urls), etapa_latencia="url_total"
+            )
+            resultados.append(resultado)
+
+            df = pd.DataFrame(posts)
+            resultado, df_processado = _medir_etapa("NLP (run_nlp_pipeline)", lambda: nlp_utils.run_nlp_pipeline(df), len(df))
+            resultados.append(resultado)
+
+            df_processado['topic_cluster'] = df_processado['topic_clusters'].apply(lambda x: ', '.join(x) if x else 'Sem Cluster')
+            df_exportacao = df_processado.drop(columns=['topic_clusters', 'topic_clusters_scores'], errors='ignore')
+            resultado, _ = _medir_etapa(
+                "exportação (exportar_para_excel)",
+                lambda: exportador.exportar_para_excel(df_exportacao, nome_base="benchmark"), len(df_exportacao)
+            )
+            resultados.append(resultado)
+        finally:
+            import estado_crawl
+            estado_crawl.obter_estado().fechar() # Libera o SQLite antes de apagar o diretório temporário
+            os.chdir(diretorio_original)
+            servidor.shutdown()
+
+    with open(ARQUIVO_RESULTADO, "w", encoding="utf-8") as f:
+        json.dump({"num_posts": num_posts, "num_workers": num_workers, "etapas": resultados}, f, ensure_ascii=False, indent=2)
+    return resultados
+
+
+def _formatar(valor, casas=3):
+    return "-" if valor is None else f"{valor:.{casas}f}"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    num_posts = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_POSTS
+    num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_WORKERS
+    resultados = executar(num_posts, num_workers)
+    logging.getLogger().setLevel(logging.INFO)
+    print(f"{'Etapa':<38} {'itens':>6} {'tempo (s)':>9} {'itens/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'pico RSS (MB)':>13}")
+    for r in resultados:
+        print(
+            f"{r['etapa']:<38} {r['itens']:>6} {r['duracao_s']:>9.2f} {_formatar(r['itens_por_s'], 1):>8} "
+            f"{_formatar(r.get('p50_s')):>8} {_formatar(r.get('p95_s')):>8} {_formatar(r.get('p99_s')):>8} {r['pico_rss_mb']:>13.1f}"
+        )
+    print(f"Resultados gravados em {ARQUIVO_RESULTADO}")
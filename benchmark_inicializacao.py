@@ -0,0 +1,77 @@
+"""
+Benchmark de inicialização: mede o tempo entre o início da importação e o módulo pronto
+para cada script de entrada, em um processo Python novo a cada repetição.
+Mostra também as importações mais lentas (python -X importtime) para achar o que ficou caro.
+Uso:
+    python benchmark_inicializacao.py [repeticoes]
+Sai com código 1 se algum script passar de ORCAMENTO_MS (útil para detectar regressões).
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS_DE_ENTRADA = ["main", "reextrai_urls_com_erro", "gera_historico_urls_do_excel", "reprocessa_cache"]
+REPETICOES = 5
+ORCAMENTO_MS = 1500 # Tempo máximo aceitável de importação por script
+TOP_IMPORTACOES = 5
+
+_CODIGO_MEDICAO = "import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+
+
+def medir_importacao(modulo, diretorio_repo, importtime=False):
+    """Importa o módulo em um processo novo e retorna (segundos, stderr)."""
+    comando = [sys.executable]
+    if importtime:
+        comando += ["-X", "importtime"]
+    comando += ["-c", _CODIGO_MEDICAO.format(modulo=modulo)]
+    ambiente = dict(os.environ, PYTHONPATH=diretorio_repo)
+    # Roda em diretório temporário: main.py cria o arquivo de log no diretório corrente ao ser importado
+    with tempfile.TemporaryDirectory() as diretorio_temp:
+        resultado = subprocess.run(comando, cwd=diretorio_temp, env=ambiente, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1] if resultado.stderr.strip() else "erro desconhecido")
+    return float(resultado.stdout.strip().splitlines()[-1]), resultado.stderr
+
+
+def importacoes_mais_lentas(saida_importtime, top=TOP_IMPORTACOES):
+    """Lista (ms acumulados, pacote) das importações diretas mais caras na saída do -X importtime."""
+    custos = {}
+    for linha in saida_importtime.splitlines():
+        campos = linha[len("import time:"):].split("|")
+        if not linha.startswith("import time:") or len(campos) != 3 or not campos[1].strip().isdigit():
+            continue
+        # Só as importações diretas do script (um nível de indentação abaixo dele), agrupadas pelo pacote raiz
+        nivel = (len(campos[2]) - len(campos[2].lstrip()) - 1) // 2
+        if nivel != 1:
+            continue
+        pacote = campos[2].strip().split(".")[0]
+        custos[pacote] = custos.get(pacote, 0) + int(campos[1]) / 1000
+    return sorted(((ms, pacote) for pacote, ms in custos.items()), reverse=True)[:top]
+
+
+def executar(repeticoes=REPETICOES):
+    diretorio_repo = os.path.dirname(os.path.abspath(__file__))
+    acima_do_orcamento = []
+    print(f"{'Script':<32} {'mediana (ms)':>12} {'mín (ms)':>10}  Importações mais lentas")
+    for modulo in SCRIPTS_DE_ENTRADA:
+        try:
+            tempos = [medir_importacao(modulo, diretorio_repo)[0] * 1000 for _ in range(repeticoes)]
+            _, saida_importtime = medir_importacao(modulo, diretorio_repo, importtime=True)
+        except RuntimeError as e:
+            print(f"{modulo:<32} ❌ falhou ao importar: {e}")
+            acima_do_orcamento.append(modulo)
+            continue
+        mediana = statistics.median(tempos)
+        lentas = ", ".join(f"{pacote} {ms:.0f}ms" for ms, pacote in importacoes_mais_lentas(saida_importtime))
+        marcador = "❌" if mediana > ORCAMENTO_MS else "✅"
+        print(f"{modulo:<32} {mediana:>12.0f} {min(tempos):>10.0f}  {marcador} {lentas}")
+        if mediana > ORCAMENTO_MS:
+            acima_do_orcamento.append(modulo)
+    return acima_do_orcamento
+
+
+if __name__ == "__main__":
+    falhas = executar(int(sys.argv[1]) if len(sys.argv) > 1 else REPETICOES)
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,110 @@
+import re
+import unicodedata
+from collections import Counter, deque
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Habilitação' -> 'habilitacao'."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Tokens normalizados do texto. Palavras inteiras: 'me' não casa dentro de 'melhor'."""
+    return _TOKEN.findall(normalizar(texto))
+
+
+class BuscadorPalavrasChave:
+    """
+    Autômato Aho-Corasick sobre tokens, construído uma única vez a partir de um
+    dicionário {categoria: {cluster: [palavras-chave]}} (formato de TOPIC_CLUSTERS_KEYWORDS).
+
+    A busca é por palavra inteira e insensível a acentos e maiúsculas, e encontra
+    todas as palavras-chave do texto em uma única passada linear, independentemente
+    do número de palavras-chave.
+    """
+
+    def __init__(self, clusters_keywords):
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saidas = [set()] # (categoria, cluster) reconhecidos ao chegar em cada estado
+        self._termos = [set()] # Palavras-chave normalizadas reconhecidas em cada estado
+        self._ordem_clusters = {} # Ordem de definição, para devolver clusters de forma estável
+
+        for categoria, clusters in clusters_keywords.items():
+            for cluster, keywords in clusters.items():
+                self._ordem_clusters.setdefault((categoria, cluster), len(self._ordem_clusters))
+                for keyword in keywords:
+                    tokens = tokenizar(keyword)
+                    if tokens:
+                        self._adicionar(tokens, (categoria, cluster))
+        self._construir_falhas()
+
+    def _adicionar(self, tokens, saida):
+        estado = 0
+        for token in tokens:
+            proximo = self._transicoes[estado].get(token)
+            if proximo is None:
+                proximo = len(self._transicoes)
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._saidas.append(set())
+                self._termos.append(set())
+                self._transicoes[estado][token] = proximo
+            estado = proximo
+        self._saidas[estado].add(saida)
+        self._termos[estado].add(" ".join(tokens))
+
+    def _construir_falhas(self):
+        # Busca em largura a partir dos filhos da raiz, cuja falha é sempre a própria raiz
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for token, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and token not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                self._falha[proximo] = self._transicoes[falha].get(token, 0)
+                # Herda as saídas do sufixo: "multa moto" também reconhece "moto" se for keyword
+                self._saidas[proximo] |= self._saidas[self._falha[proximo]]
+                self._termos[proximo] |= self._termos[self._falha[proximo]]
+
+    def buscar(self, texto):
+        """Retorna o conjunto de (categoria, cluster) cujas palavras-chave aparecem no texto."""
+        encontrados = set()
+        if not texto:
+            return encontrados
+        estado = 0
+        transicoes, falha, saidas = self._transicoes, self._falha, self._saidas
+        for token in tokenizar(texto):
+            while estado and token not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(token, 0)
+            if saidas[estado]:
+                encontrados |= saidas[estado]
+        return encontrados
+
+    def contar_termos(self, texto):
+        """Quantas vezes cada palavra-chave (normalizada, ex.: 'taxa selic') aparece no texto, na mesma passada linear."""
+        contagem = Counter()
+        if not texto:
+            return contagem
+        estado = 0
+        transicoes, falha, termos = self._transicoes, self._falha, self._termos
+        for token in tokenizar(texto):
+            while estado and token not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(token, 0)
+            if termos[estado]:
+                contagem.update(termos[estado])
+        return contagem
+
+    def clusters(self, texto, categoria):
+        """Clusters da categoria encontrados no texto, na ordem em que foram definidos."""
+        return sorted(
+            (cluster for cat, cluster in self.buscar(texto) if cat == categoria),
+            key=lambda cluster: self._ordem_clusters[(categoria, cluster)]
+        )
@@ -0,0 +1,172 @@
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_CACHE = "cache_html"
+CACHE_TAMANHO_MAX_MB = 2048
+NIVEL_COMPRESSAO = 6
+TAMANHO_LOTE_ACESSOS = 100 # Atualizações de último acesso (leituras) acumuladas antes de cada commit
+
+
+class CacheHTML:
+    """
+    Cache em disco do HTML bruto, endereçado por conteúdo.
+
+    Cada HTML é gravado comprimido (gzip) em objetos/<hash[:2]>/<hash>.html.gz, onde
+    hash é o SHA-256 do conteúdo. Um índice SQLite mapeia URL -> hash, guardando o
+    tamanho comprimido e o último acesso. Quando o total passa de tamanho_max_mb,
+    as URLs acessadas há mais tempo são removidas (LRU) e os objetos sem referência apagados.
+    O total é calculado uma vez na abertura e mantido a cada gravação e remoção; o último
+    acesso das leituras é gravado em lotes de TAMANHO_LOTE_ACESSOS (perdê-lo num crash só
+    afeta a ordem do LRU).
+    É seguro para uso a partir de várias threads (workers do pool).
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE, tamanho_max_mb=CACHE_TAMANHO_MAX_MB):
+        self.diretorio = diretorio
+        self.tamanho_max_bytes = tamanho_max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(diretorio, "objetos"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(diretorio, "indice.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS paginas (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                data_captura TEXT NOT NULL,
+                ultimo_acesso TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_paginas_hash ON paginas(hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_paginas_acesso ON paginas(ultimo_acesso)")
+        self._conn.commit()
+        self._total = self._tamanho_total()
+        self._acessos_pendentes = 0
+
+    def _caminho_objeto(self, hash_conteudo):
+        return os.path.join(self.diretorio, "objetos", hash_conteudo[:2], f"{hash_conteudo}.html.gz")
+
+    @staticmethod
+    def hash_conteudo(html):
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        return hashlib.sha256(html).hexdigest()
+
+    def salvar(self, url, html):
+        """Grava o HTML (str ou bytes) da URL no cache e retorna o hash do conteúdo."""
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        hash_conteudo = self.hash_conteudo(html)
+        caminho = self._caminho_objeto(hash_conteudo)
+        agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        with self._lock:
+            if not os.path.exists(caminho):
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                caminho_tmp = f"{caminho}.{threading.get_ident()}.tmp"
+                with gzip.open(caminho_tmp, "wb", compresslevel=NIVEL_COMPRESSAO) as f:
+                    f.write(html)
+                os.replace(caminho_tmp, caminho)
+            tamanho = os.path.getsize(caminho)
+
+            linha_antiga = self._conn.execute("SELECT hash, tamanho FROM paginas WHERE url = ?", (url,)).fetchone()
+            if not self._em_uso(hash_conteudo):
+                self._total += tamanho
+            self._conn.execute(
+                "INSERT OR REPLACE INTO paginas (url, hash, tamanho, data_captura, ultimo_acesso) VALUES (?, ?, ?, ?, ?)",
+                (url, hash_conteudo, tamanho, agora, agora)
+            )
+            if linha_antiga and linha_antiga[0] != hash_conteudo:
+                self._remover_objeto_sem_referencia(*linha_antiga)
+            self._evictar()
+            self._commit()
+        return hash_conteudo
+
+    def obter(self, url):
+        """Retorna os bytes do HTML da URL ou None se não estiver no cache."""
+        with self._lock:
+            linha = self._conn.execute("SELECT hash, tamanho FROM paginas WHERE url = ?", (url,)).fetchone()
+            if not linha:
+                return None
+            caminho = self._caminho_objeto(linha[0])
+            if not os.path.exists(caminho):
+                logger.warning(f"Objeto do cache ausente para {url}. Removendo entrada do índice.")
+                self._conn.execute("DELETE FROM paginas WHERE url = ?", (url,))
+                if not self._em_uso(linha[0]):
+                    self._total -= linha[1]
+                self._commit()
+                return None
+            self._conn.execute(
+                "UPDATE paginas SET ultimo_acesso = ? WHERE url = ?",
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), url)
+            )
+            self._acessos_pendentes += 1
+            if self._acessos_pendentes >= TAMANHO_LOTE_ACESSOS:
+                self._commit()
+        with gzip.open(caminho, "rb") as f:
+            return f.read()
+
+    def entradas(self):
+        """Lista (url, hash, data_captura) de todas as páginas do cache."""
+        with self._lock:
+            return self._conn.execute("SELECT url, hash, data_captura FROM paginas ORDER BY url").fetchall()
+
+    def tamanho_total(self):
+        with self._lock:
+            return self._total
+
+    def _tamanho_total(self):
+        # Soma por objeto distinto: páginas com o mesmo conteúdo dividem um único arquivo
+        linha = self._conn.execute("SELECT SUM(tamanho) FROM (SELECT DISTINCT hash, tamanho FROM paginas)").fetchone()
+        return linha[0] or 0
+
+    def _commit(self):
+        self._conn.commit()
+        self._acessos_pendentes = 0
+
+    def _em_uso(self, hash_conteudo):
+        return self._conn.execute("SELECT 1 FROM paginas WHERE hash = ? LIMIT 1", (hash_conteudo,)).fetchone() is not None
+
+    def _remover_objeto_sem_referencia(self, hash_conteudo, tamanho):
+        if self._em_uso(hash_conteudo):
+            return
+        self._total -= tamanho
+        try:
+            os.remove(self._caminho_objeto(hash_conteudo))
+        except FileNotFoundError:
+            pass
+
+    def _evictar(self):
+        if self._total <= self.tamanho_max_bytes:
+            return
+        removidas = 0
+        for url, hash_conteudo, tamanho in self._conn.execute(
+            "SELECT url, hash, tamanho FROM paginas ORDER BY ultimo_acesso"
+        ).fetchall():
+            if self._total <= self.tamanho_max_bytes:
+                break
+            self._conn.execute("DELETE FROM paginas WHERE url = ?", (url,))
+            self._remover_objeto_sem_referencia(hash_conteudo, tamanho)
+            removidas += 1
+        logger.info(f"Cache HTML acima do limite: {removidas} páginas antigas removidas.")
+
+    def fechar(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+
+_cache = utilitarios.compartilhado(CacheHTML)
+
+
+def obter_cache():
+    """Retorna a instância compartilhada do cache (criada no primeiro uso)."""
+    return _cache()
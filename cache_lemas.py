@@ -0,0 +1,69 @@
+import logging
+import sqlite3
+import threading
+
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+CACHE_LEMAS_PATH = "cache_lemas.sqlite"
+TAMANHO_CONSULTA = 500 # Hashes por SELECT ... IN (...), abaixo do limite de variáveis do SQLite
+
+
+class CacheLemas:
+    """
+    Cache em SQLite do texto lematizado, indexado pelo SHA-256 do texto limpo e pelo modelo spaCy.
+
+    Posts que não mudaram nunca passam de novo pelo spaCy; trocar o modelo (nome ou versão)
+    invalida naturalmente as entradas antigas, que ficam com outra chave.
+    """
+
+    def __init__(self, caminho=CACHE_LEMAS_PATH):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS lemas (
+                hash TEXT NOT NULL,
+                modelo TEXT NOT NULL,
+                lemas TEXT NOT NULL,
+                PRIMARY KEY (hash, modelo)
+            )"""
+        )
+        self._conn.commit()
+
+    def obter_varios(self, hashes, modelo):
+        """Retorna {hash: lemas} dos hashes já presentes no cache para o modelo."""
+        hashes = list(hashes)
+        encontrados = {}
+        with self._lock:
+            for inicio in range(0, len(hashes), TAMANHO_CONSULTA):
+                lote = hashes[inicio:inicio + TAMANHO_CONSULTA]
+                marcadores = ", ".join("?" * len(lote))
+                encontrados.update(self._conn.execute(
+                    f"SELECT hash, lemas FROM lemas WHERE modelo = ? AND hash IN ({marcadores})",
+                    (modelo, *lote)
+                ))
+        return encontrados
+
+    def salvar_varios(self, lemas_por_hash, modelo):
+        """Grava {hash: lemas} em uma única transação."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO lemas (hash, modelo, lemas) VALUES (?, ?, ?)",
+                ((hash_conteudo, modelo, lemas) for hash_conteudo, lemas in lemas_por_hash.items())
+            )
+            self._conn.commit()
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = utilitarios.compartilhado(CacheLemas)
+
+
+def obter_cache_lemas():
+    """Retorna a instância compartilhada do cache de lemas (criada no primeiro uso)."""
+    return _cache()
@@ -0,0 +1,150 @@
+"""
+Cliente HTTP único do pipeline (sitemaps, caminho HTTP dos posts e fallback newspaper3k).
+
+Uma só requests.Session compartilhada pelas threads, com:
+- pool de conexões keep-alive por host (sem novo handshake TLS a cada página);
+- Accept-Encoding gzip/deflate, e br quando o pacote brotli está instalado (o corpo é descomprimido pelo urllib3);
+- timeouts separados de conexão e de leitura;
+- retentativas numa só camada: get_com_retentativa passa pelo agendador (agendador.py), que refaz
+  erros de conexão, timeouts e respostas 429/5xx com backoff e ajusta o ritmo do host; a sessão em si
+  não refaz nada (sem Retry do urllib3), para as tentativas não se multiplicarem;
+- corpo das páginas sempre em UTF-8 (corpo_utf8): o charset declarado ou detectado é respeitado
+  e os corpos em outro charset são transcodificados antes do parse e do cache de HTML;
+- contabilização por requisição: latência em '<rotulo>' e bytes recebidos (comprimidos) em '<rotulo>_bytes'.
+"""
+import codecs
+import logging
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+import agendador
+import metricas
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36"
+TIMEOUT_CONEXAO_S = 5
+TIMEOUT_LEITURA_S = 10
+TIMEOUT_PADRAO = (TIMEOUT_CONEXAO_S, TIMEOUT_LEITURA_S)
+CONEXOES_POR_HOST = 16 # Conexões mantidas abertas por host (workers do pool + downloads de sitemap)
+TAMANHO_BUSCA_META_CHARSET = 4096 # Bytes do início do corpo onde a tag <meta charset> é procurada
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+ERROS_TRANSITORIOS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+
+def _criar_sessao():
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=CONEXOES_POR_HOST, pool_maxsize=CONEXOES_POR_HOST)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    sessao.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+    })
+    return sessao
+
+
+_sessao = utilitarios.compartilhado(_criar_sessao)
+
+
+def obter_sessao():
+    """Retorna a sessão HTTP compartilhada (criada no primeiro uso)."""
+    return _sessao()
+
+
+def bytes_recebidos(response):
+    """Bytes lidos da rede para a resposta (antes da descompressão), ou 0 se não der para medir."""
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def contabilizar_bytes(response, rotulo="http_get"):
+    """Soma os bytes da resposta ao contador '<rotulo>_bytes'. Respostas em stream: chamar depois de ler o corpo."""
+    total = bytes_recebidos(response)
+    metricas.contar(f"{rotulo}_bytes", total)
+    logger.debug(f"{response.url}: {total} bytes recebidos (HTTP {response.status_code}).")
+    return total
+
+
+def encoding_da_resposta(response):
+    """
+    Charset do corpo: o declarado no Content-Type; sem ele, UTF-8 se o corpo for UTF-8 válido
+    (o caso do blog, que nem sempre declara o charset), senão o da tag <meta charset> ou, por
+    último, o detectado pelo requests (apparent_encoding).
+    """
+    if "charset" in response.headers.get("Content-Type", "").lower() and response.encoding:
+        return response.encoding
+    try:
+        response.content.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    meta = _META_CHARSET.search(response.content[:TAMANHO_BUSCA_META_CHARSET])
+    if meta:
+        return meta.group(1).decode("ascii")
+    return response.apparent_encoding or "utf-8"
+
+
+def corpo_utf8(response):
+    """Corpo da resposta em bytes UTF-8, transcodificado quando o charset da página é outro."""
+    encoding = encoding_da_resposta(response)
+    try:
+        if codecs.lookup(encoding).name in ("utf-8", "ascii"):
+            return response.content
+    except LookupError:
+        logger.warning(f"{response.url}: charset desconhecido '{encoding}'. Lendo o corpo como UTF-8.")
+        return response.content
+    return response.content.decode(encoding, errors="replace").encode("utf-8")
+
+
+def get(url, rotulo="http_get", stream=False, timeout=TIMEOUT_PADRAO, **kwargs):
+    """
+    GET pela sessão compartilhada, registrando a latência em metricas sob rotulo.
+
+    Args:
+        url (str): URL a baixar.
+        rotulo (str): Nome da etapa nas métricas (ex.: 'http_get', 'sitemap_get').
+        stream (bool): Não lê o corpo agora; nesse caso a latência é até os cabeçalhos e
+            contabilizar_bytes deve ser chamada pelo chamador depois de ler o corpo.
+        timeout: Segundos, ou (conexão, leitura).
+        **kwargs: Repassados ao requests (ex.: headers).
+
+    Returns:
+        requests.Response
+    """
+    inicio = time.perf_counter()
+    try:
+        response = obter_sessao().get(url, stream=stream, timeout=timeout, **kwargs)
+    finally:
+        metricas.registrar_duracao(rotulo, time.perf_counter() - inicio)
+    if not stream:
+        contabilizar_bytes(response, rotulo)
+    return response
+
+
+def get_com_retentativa(url, rotulo="http_get", **kwargs):
+    """
+    get() pelo agendador do host da URL, a única camada de retentativa do pipeline: erros de conexão,
+    timeouts e respostas 429/5xx são refeitos até agendador.MAX_TENTATIVAS vezes, com backoff.
+
+    Raises:
+        agendador.FalhaTransitoria: Se a última tentativa ainda respondeu 429 ou 5xx.
+        requests.exceptions.RequestException: Se a última tentativa falhou na conexão ou no tempo limite.
+    """
+    def baixar():
+        response = get(url, rotulo=rotulo, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.close()
+            raise agendador.FalhaTransitoria(
+                f"HTTP {response.status_code}", agendador.espera_retry_after(response.headers.get("Retry-After"))
+            )
+        return response
+
+    return agendador.obter_agendador().executar(url, baixar, transitorias=ERROS_TRANSITORIOS)
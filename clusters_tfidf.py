@@ -0,0 +1,225 @@
+"""
+Pontuação ponderada dos topic clusters pelo texto inteiro dos posts (título, meta descrição e conteúdo).
+
+- Matriz esparsa posts x palavras-chave: as ocorrências de todas as palavras-chave de
+  TOPIC_CLUSTERS_KEYWORDS são contadas numa só passada linear por texto (autômato Aho-Corasick),
+  sem gerar o vocabulário inteiro do corpus.
+- Pesos TF-IDF (tf sublinear, IDF do corpus) com linhas normalizadas (L2): uma palavra-chave
+  repetida no corpo pesa mais que uma menção de passagem, e palavras-chave presentes em quase
+  todos os posts pesam menos.
+- Matriz esparsa palavras-chave x clusters (colunas normalizadas): um único produto dá a
+  similaridade de cosseno de cada post com todos os clusters.
+
+Cada post fica com os clusters da sua categoria acima de LIMIAR_TFIDF, até MAX_CLUSTERS_TFIDF.
+O IDF do corpus inteiro é gravado em CAMINHO_IDF e reaproveitado nos micro-lotes do crawl, que
+assim são todos pontuados com o mesmo IDF. Só é gravado um IDF ajustado sobre pelo menos
+MIN_DOCUMENTOS_IDF posts: enquanto a base mestre for menor, cada lote usa o IDF dos próprios textos,
+e o primeiro lote depois que ela passar do limite ajusta o IDF sobre a base (só as colunas de texto)
+e o grava. A reclassificação da base o reajusta sobre o corpus atual. scipy e scikit-learn só são importados no primeiro uso. Reclassificação da base mestre:
+    python clusters_tfidf.py [saida.xlsx]
+"""
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+import metricas
+from buscador_palavras_chave import BuscadorPalavrasChave, tokenizar
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_TFIDF = ['titulo', 'resumo_meta', 'conteudo']
+LIMIAR_TFIDF = float(os.environ.get("BLOG99_LIMIAR_TFIDF", "0.1")) # Similaridade mínima para atribuir um cluster
+MAX_CLUSTERS_TFIDF = int(os.environ.get("BLOG99_MAX_CLUSTERS_TFIDF", "3"))
+CAMINHO_IDF = "idf_clusters_tfidf.json"
+MIN_DOCUMENTOS_IDF = int(os.environ.get("BLOG99_MIN_DOCUMENTOS_IDF", "200")) # Posts mínimos para gravar o IDF do corpus
+
+
+def vocabulario(clusters_keywords):
+    """
+    Palavras-chave normalizadas (as mesmas chaves de BuscadorPalavrasChave.contar_termos), a lista de
+    (categoria, cluster) e a matriz esparsa palavras-chave x clusters, com colunas normalizadas (L2).
+    """
+    from scipy import sparse
+    from sklearn.preprocessing import normalize
+
+    termos, chaves, linhas, colunas = {}, [], [], []
+    for categoria, clusters in clusters_keywords.items():
+        for cluster, keywords in clusters.items():
+            coluna = len(chaves)
+            chaves.append((categoria, cluster))
+            for termo in {" ".join(tokenizar(keyword)) for keyword in keywords} - {""}:
+                linhas.append(termos.setdefault(termo, len(termos)))
+                colunas.append(coluna)
+    matriz = sparse.csr_matrix((np.ones(len(linhas)), (linhas, colunas)), shape=(len(termos), len(chaves)))
+    return list(termos), chaves, normalize(matriz.tocsc(), norm='l2', axis=0).tocsr()
+
+
+def matriz_ocorrencias(textos, termos, buscador):
+    """Matriz esparsa (CSR) posts x palavras-chave com o número de ocorrências."""
+    from scipy import sparse
+
+    posicao = {termo: j for j, termo in enumerate(termos)}
+    indices, valores, ponteiros = [], [], [0]
+    for texto in textos:
+        for termo, quantidade in buscador.contar_termos(texto if isinstance(texto, str) else "").items():
+            indices.append(posicao[termo])
+            valores.append(quantidade)
+        ponteiros.append(len(indices))
+    return sparse.csr_matrix(
+        (np.asarray(valores, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(ponteiros, dtype=np.int64)),
+        shape=(len(textos), len(termos))
+    )
+
+
+def ajustar_idf(ocorrencias):
+    """IDF suavizado, como o do scikit-learn: ln((1 + n) / (1 + df)) + 1."""
+    documentos = np.bincount(ocorrencias.indices, minlength=ocorrencias.shape[1])
+    return np.log((1 + ocorrencias.shape[0]) / (1 + documentos)) + 1
+
+
+def salvar_idf(termos, idf, documentos, caminho=CAMINHO_IDF):
+    with open(f"{caminho}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"documentos": documentos, "idf": dict(zip(termos, idf.tolist()))}, f, ensure_ascii=False)
+    os.replace(f"{caminho}.tmp", caminho)
+
+
+def carregar_idf(termos, caminho=CAMINHO_IDF):
+    """
+    IDF gravado para estas palavras-chave, ou None se não houver, se o dicionário de palavras-chave mudou
+    ou se foi ajustado sobre menos de MIN_DOCUMENTOS_IDF posts (nesse caso é reajustado quando a base crescer).
+    """
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            salvo = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"IDF salvo em '{caminho}' ilegível ({e}). Usando o IDF do próprio lote.")
+        return None
+    # Formato antigo (só o dicionário de IDF) não diz sobre quantos posts foi ajustado: é reajustado
+    documentos, idf = (salvo.get("documentos", 0), salvo.get("idf", {})) if "idf" in salvo else (0, salvo)
+    if set(idf) != set(termos):
+        logger.info(f"Palavras-chave mudaram desde o último ajuste do IDF ('{caminho}'). Usando o IDF do próprio lote.")
+        return None
+    if documentos < MIN_DOCUMENTOS_IDF:
+        return None
+    return np.asarray([idf[termo] for termo in termos])
+
+
+def idf_do_corpus(termos, buscador):
+    """
+    IDF gravado em CAMINHO_IDF. Se ainda não houver (ou se as palavras-chave mudaram, ou se foi ajustado
+    sobre uma base pequena), ajusta o IDF sobre a base mestre e o grava, para que todos os micro-lotes
+    sejam pontuados com o mesmo IDF. Da base só são lidas as colunas de CAMPOS_TFIDF.
+    Retorna None enquanto a base mestre tiver menos de MIN_DOCUMENTOS_IDF posts.
+    """
+    idf = carregar_idf(termos)
+    if idf is not None:
+        return idf
+    import base_mestre
+
+    base = base_mestre.BaseMestre()
+    # Conta os posts lendo só as URLs: com a base ainda pequena, o conteúdo nem é lido
+    if len(base.ler(colunas=['url'])) < MIN_DOCUMENTOS_IDF:
+        return None
+    df = base.ler(colunas=CAMPOS_TFIDF)
+    inicio = time.perf_counter()
+    campos = [campo for campo in CAMPOS_TFIDF if campo in df.columns]
+    textos = [" ".join(t for t in valores if isinstance(t, str)) for valores in zip(*(df[campo].tolist() for campo in campos))]
+    idf = ajustar_idf(matriz_ocorrencias(textos, termos, buscador))
+    salvar_idf(termos, idf, len(df))
+    logger.info(f"IDF ajustado sobre os {len(df)} posts da base mestre em {time.perf_counter() - inicio:.1f}s e gravado em '{CAMINHO_IDF}'.")
+    return idf
+
+
+def atribuir_clusters(categorias, textos, clusters_keywords, limiar=LIMIAR_TFIDF, max_clusters=MAX_CLUSTERS_TFIDF,
+                      ajustar=False, buscador=None):
+    """
+    Clusters de cada post pela similaridade TF-IDF das suas palavras-chave com as de cada cluster da categoria.
+
+    Args:
+        categorias: Categoria principal de cada post.
+        textos: Texto de cada post (ex.: título + meta descrição + conteúdo).
+        clusters_keywords: Dicionário no formato de TOPIC_CLUSTERS_KEYWORDS.
+        limiar: Similaridade mínima para um cluster ser atribuído.
+        max_clusters: Número máximo de clusters por post.
+        ajustar (bool): Ajusta o IDF sobre estes textos e o grava em CAMINHO_IDF (use com o corpus inteiro).
+            Sem ajustar, usa o IDF do corpus (idf_do_corpus); com a base mestre ainda pequena, usa o IDF
+            destes textos sem gravá-lo.
+        buscador: BuscadorPalavrasChave já construído para clusters_keywords (evita reconstruir o autômato).
+
+    Returns:
+        Lista, por post, de [(cluster, similaridade)] do mais ao menos similar (vazia se nenhum passar do limiar).
+    """
+    from scipy import sparse
+    from sklearn.preprocessing import normalize
+
+    inicio = time.perf_counter()
+    termos, chaves, palavras_por_cluster = vocabulario(clusters_keywords)
+    buscador = buscador or BuscadorPalavrasChave(clusters_keywords)
+    ocorrencias = matriz_ocorrencias(textos, termos, buscador)
+
+    idf = None if ajustar else idf_do_corpus(termos, buscador)
+    if idf is None:
+        idf = ajustar_idf(ocorrencias)
+        if ajustar:
+            salvar_idf(termos, idf, ocorrencias.shape[0])
+    pesos = ocorrencias.copy()
+    pesos.data = 1 + np.log(pesos.data) # tf sublinear
+    pesos = normalize(pesos @ sparse.diags(idf), norm='l2')
+    similaridades = (pesos @ palavras_por_cluster).toarray() # Um único produto esparso: posts x clusters
+
+    colunas_por_categoria = {}
+    for coluna, (categoria, _) in enumerate(chaves):
+        colunas_por_categoria.setdefault(categoria, []).append(coluna)
+
+    resultados = []
+    for i, categoria in enumerate(categorias):
+        colunas = colunas_por_categoria.get(categoria, [])
+        pontuacoes = similaridades[i, colunas]
+        ordem = np.argsort(-pontuacoes, kind='stable')[:max_clusters]
+        resultados.append([
+            (chaves[colunas[j]][1], round(float(pontuacoes[j]), 4)) for j in ordem if pontuacoes[j] >= limiar and pontuacoes[j] > 0
+        ])
+    metricas.registrar_duracao("clusters_tfidf", time.perf_counter() - inicio)
+    return resultados
+
+
+def reclassificar_base(nome_saida="blog99_resultado.xlsx"):
+    """
+    Reclassifica todos os posts da base mestre pelo texto inteiro, com o IDF do corpus completo
+    (gravado para os próximos micro-lotes), grava na base só os posts cujo topic_cluster mudou
+    e regenera o Excel.
+    """
+    import pandas as pd
+    import base_mestre
+    import duplicatas
+    import nlp_utils
+
+    base = base_mestre.BaseMestre()
+    df = base.ler()
+    if df.empty:
+        logger.warning("Base mestre vazia. Nada para reclassificar.")
+        return None
+    inicio = time.perf_counter()
+    clusters, _ = nlp_utils.identificar_topic_clusters_por_tfidf(df, ajustar=True)
+    novos = pd.Series([', '.join(c) if c else 'Sem Cluster' for c in clusters], index=df.index)
+    logger.info(f"✅ {len(df)} posts pontuados pelo texto inteiro em {time.perf_counter() - inicio:.1f}s.")
+
+    alterados = df[df['topic_cluster'] != novos].assign(topic_cluster=novos)
+    logger.info(f"📌 {len(alterados)} posts mudaram de topic_cluster.")
+    base.upsert(alterados)
+    # Os clusters copiados para as quase duplicatas dos próximos lotes vêm do índice de duplicatas
+    duplicatas.obter_indice_duplicatas().registrar_clusters(
+        alterados['url'].tolist(), alterados['categoria'].tolist(), alterados['topic_cluster'].tolist()
+    )
+    return base.gerar_excel(nome_base=nome_saida.replace('.xlsx', ''))
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    reclassificar_base(sys.argv[1] if len(sys.argv) > 1 else "blog99_resultado.xlsx")
@@ -1,16 +1,20 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from collections import OrderedDict
 from datetime import datetime
 import re
 import logging
-from newspaper import Article
+
+import agendador
+import cache_html
+import cliente_http
+import estado_crawl
+import extrator_html
+import metricas
+import navegador
+import sitemap
 
 # Importações Selenium
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
@@ -18,96 +22,105 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 logger = logging.getLogger(__name__)
 
 SITEMAP_URL = "https://99app.com/sitemap/main.xml"
+SITEMAP_URLS = [SITEMAP_URL] # Sitemaps (ou sitemap-index) de todas as propriedades a processar
+PADRAO_URL_BLOG = re.compile(r"/blog/[^/]+/")
 EXCLUDE_KEYWORDS = ["author", "category", "tag"] # Mantidas, mas não utilizadas no filtro de URLs
 SITEMAP_POST_FILTER = "/blog/"
 
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36"
+    "User-Agent": cliente_http.USER_AGENT
 }
 
+# Regra de qualidade: abaixo deste número de palavras o conteúdo é considerado insuficiente
+MIN_PALAVRAS_CONTEUDO = 30
+HTTP_TIMEOUT = cliente_http.TIMEOUT_PADRAO # (conexão, leitura) em segundos
+USAR_CACHE_HTML = True # Grava todo HTML baixado em cache_html/ e reaproveita em novas extrações
+
+
+class FalhaHTTP(Exception):
+    """A página não foi obtida pelo caminho HTTP (404, 5xx persistente, falha de conexão): o navegador não ajudaria."""
+
+
 # --- Funções Auxiliares ---
-def extrair_titulo(soup):
-    title = soup.find('h1')
-    if title:
-        return title.get_text(strip=True)
-    meta_title = soup.find('meta', attrs={'property': 'og:title'})
-    if meta_title and meta_title.get('content'):
-        return meta_title['content'].strip()
-    logger.warning("Título não encontrado para o post.")
-    return "Título Indisponível"
-
-def extrair_resumo_meta(soup):
-    meta_description = soup.find('meta', attrs={'name': 'description'})
-    if meta_description and meta_description.get('content'):
-        return meta_description['content'].strip()
-    logger.warning("Resumo (meta description) não encontrado para o post.")
-    return "Resumo Meta Indisponível"
-
-def extrair_data_publicacao(soup):
-    meta_pub_time = soup.find('meta', attrs={'property': 'article:published_time'})
-    if meta_pub_time and meta_pub_time.get('content'):
-        try:
-            return datetime.fromisoformat(meta_pub_time['content'].replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            logger.warning("Formato de data de publicação inválido na meta tag.")
-
-    time_tag = soup.find('time')
-    if time_tag and time_tag.get('datetime'):
-        try:
-            return datetime.fromisoformat(time_tag['datetime']).strftime('%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            logger.warning("Formato de data de publicação inválido na tag <time>.")
-
-    date_patterns = [
-        re.compile(r'\b\d{1,2}\s+(?:de\s+)?(?:janeiro|fevereiro|março|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)\s+(?:de\s+)?\d{4}\b', re.IGNORECASE),
-        re.compile(r'\b\d{4}-\d{2}-\d{2}\b'), # YYYY-MM-DD
-        re.compile(r'\b\d{2}/\d{2}/\d{4}\b') # DD/MM/YYYY
-    ]
-    for tag in soup.find_all(['p', 'span', 'div', 'li']):
-        text = tag.get_text(strip=True)
-        for pattern in date_patterns:
-            match = pattern.search(text)
-            if match:
-                try:
-                    logger.debug(f"Data encontrada no texto: {match.group(0)}")
-                    return match.group(0)
-                except Exception:
-                    pass
-
-    logger.warning("Data de publicação não encontrada ou formato não reconhecido para o post.")
-    return None
-
-def extrair_conteudo_com_selenium(driver):
-    selectors = [
-        "article.entry-content",
-        "div.entry-content",
-        "div.post-content",
-        "div.td-post-content",
-        "main",
-        "body"
-    ]
-
-    for selector in selectors:
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-            )
-            element = driver.find_element(By.CSS_SELECTOR, selector)
-            for undesirable_tag in element.find_elements(By.TAG_NAME, 'script') + \
-                                   element.find_elements(By.TAG_NAME, 'style') + \
-                                   element.find_elements(By.TAG_NAME, 'aside') + \
-                                   element.find_elements(By.CSS_SELECTOR, 'figcaption'):
-                driver.execute_script("arguments[0].remove();", undesirable_tag)
-            return element.text
-        except Exception:
-            continue
-    logger.warning("Não foi possível encontrar um seletor de conteúdo principal com Selenium.")
-    return None
-
-def extrair_com_newspaper(url):
+def conteudo_suficiente(conteudo):
+    """Verifica se o conteúdo extraído passa na regra mínima de qualidade."""
+    return bool(conteudo) and len(conteudo.split()) >= MIN_PALAVRAS_CONTEUDO
+
+def _cache():
+    return cache_html.obter_cache() if USAR_CACHE_HTML else None
+
+def extrair_conteudo_via_http(url, usar_cache=True, revalidar=False):
+    """
+    Caminho rápido: baixa o HTML com requests (sem navegador) e extrai os campos do post.
+    Se a página já estiver no cache de HTML (e usar_cache=True), nada é baixado.
+    Com revalidar=True (post alterado segundo o sitemap) o cache não é usado diretamente:
+    é feito um GET condicional (If-None-Match/If-Modified-Since) e um 304 reaproveita o HTML do cache.
+    Retorna um dicionário com titulo, resumo_meta, data_publicacao e conteudo,
+    ou None se a página veio (HTTP 200, ou 304 com o cache) mas o conteúdo não passou na regra de qualidade.
+
+    Raises:
+        FalhaHTTP: Se a requisição falhou (erro HTTP, inclusive 5xx depois das retentativas, ou de conexão).
+    """
+    cache = _cache()
+    if cache and usar_cache and not revalidar:
+        html_cache = cache.obter(url)
+        if html_cache is not None:
+            resultado = extrator_html.extrair_post(html_cache, extrator_html.SELETORES_CONTEUDO_HTTP, url=url)
+            if conteudo_suficiente(resultado["conteudo"]):
+                metricas.contar("cache_html_acertos")
+                logger.info(f"HTML de {url} servido pelo cache.")
+                return resultado
+
+    estado = estado_crawl.obter_estado()
+    headers = dict(HEADERS)
+    html_cache = cache.obter(url) if cache and revalidar else None
+    if html_cache is not None:
+        etag, last_modified = estado.validadores(url)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
     try:
+        response = cliente_http.get_com_retentativa(url, rotulo="http_get", headers=headers, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+    except (requests.exceptions.RequestException, agendador.FalhaTransitoria) as e:
+        metricas.contar("http_falhas")
+        raise FalhaHTTP(f"{type(e).__name__}: {e}") from e
+
+    if response.status_code == 304:
+        metricas.contar("http_304")
+        logger.info(f"{url} não foi modificada desde a última extração (HTTP 304). Usando HTML do cache.")
+        html = html_cache
+    else:
+        html = cliente_http.corpo_utf8(response)
+        estado.registrar_validadores(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        if cache and response.status_code == 200:
+            cache.salvar(url, html)
+
+    resultado = extrator_html.extrair_post(html, extrator_html.SELETORES_CONTEUDO_HTTP, url=url)
+    if not conteudo_suficiente(resultado["conteudo"]):
+        metricas.contar("http_insuficiente")
+        logger.info(f"Conteúdo via HTTP insuficiente para {url}. Escalando para o Selenium.")
+        return None
+    return resultado
+
+def extrair_com_newspaper(url, html=None):
+    """
+    Fallback com newspaper3k. O HTML já obtido (HTTP, Selenium ou cache) é passado direto
+    para o newspaper, evitando baixar a página de novo; sem ele, a página é baixada pelo cliente_http.
+    """
+    try:
+        from newspaper import Article # Importado só quando o fallback é usado (importação lenta)
         article = Article(url, language='pt')
-        article.download()
+        if html is None:
+            # Sem HTML em mãos: baixa pela sessão compartilhada, nunca pelo cliente próprio do newspaper
+            response = cliente_http.get_com_retentativa(url, rotulo="newspaper_get", headers=HEADERS, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            html = cliente_http.corpo_utf8(response)
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', errors='replace')
+        article.download(input_html=html)
         article.parse()
         published_date_str = None
         if article.publish_date:
@@ -143,43 +156,37 @@ def categorizar(url):
     else:
         return "Outros"
 
-def baixar_sitemap_filtrado():
-    logger.info(f"Processando sitemap: {SITEMAP_URL}")
-    try:
-        response = requests.get(SITEMAP_URL, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "xml")
-
-        all_urls = [loc.text.strip() for loc in soup.find_all("loc")]
-
+def iterar_sitemap_filtrado(sitemap_urls=None):
+    """
+    Gera (url, lastmod) das URLs de blog à medida que são encontradas nos sitemaps,
+    seguindo sitemap-index e arquivos .xml.gz (ver sitemap.py). lastmod é None quando
+    o sitemap não informa a data. URLs repetidas são entregues uma única vez.
+    """
+    sitemap_urls = sitemap_urls or SITEMAP_URLS
+    vistas = set()
+    total = 0
+    for url, lastmod in sitemap.iterar_sitemaps(sitemap_urls, headers=HEADERS):
+        total += 1
         # Aplica o filtro exato da sua versão anterior que encontrava 752 posts
         # Esta regex busca URLs que contenham "/blog/" seguido de pelo menos um segmento não-barra, e terminando com barra.
-        blog_urls = [url for url in all_urls if re.search(r"/blog/[^/]+/", url)]
-        # Remove duplicatas preservando a ordem original
-        from collections import OrderedDict
-        blog_urls = list(OrderedDict.fromkeys(blog_urls))
+        if PADRAO_URL_BLOG.search(url) and url not in vistas:
+            vistas.add(url)
+            yield url, lastmod
 
-        logger.info(f"🔎 Total de URLs encontradas no sitemap ({SITEMAP_URL}): {len(all_urls)}")
-        logger.info(f"📌 Total de URLs de blog filtradas pelo padrão /blog/*/: {len(blog_urls)}")
-        logger.info(f"❌ URLs ignoradas (fora do padrão /blog/*/): {len(all_urls) - len(blog_urls)}")
+    logger.info(f"🔎 Total de URLs encontradas nos sitemaps ({', '.join(sitemap_urls)}): {total}")
+    logger.info(f"📌 Total de URLs de blog filtradas pelo padrão /blog/*/: {len(vistas)}")
+    logger.info(f"❌ URLs ignoradas (fora do padrão /blog/*/ ou repetidas): {total - len(vistas)}")
 
-        return blog_urls
+def baixar_sitemap_com_lastmod():
+    """Retorna um OrderedDict {url: lastmod} com todas as URLs de blog filtradas."""
+    return OrderedDict(iterar_sitemap_filtrado())
 
-    except requests.exceptions.RequestException as e:
-        logger.warning(f"❌ Erro ao baixar ou processar sitemap '{SITEMAP_URL}'. Detalhes: {e}")
-        return [] # Retorna lista vazia em caso de erro
-    except Exception as e:
-        logger.exception(f"❌ Ocorreu um erro inesperado ao processar sitemap '{SITEMAP_URL}'. Detalhes: {e}")
-        return [] # Retorna lista vazia em caso de erro
-
-def extrair_conteudo_da_url(url, driver):
-    """
-    Extrai o título, conteúdo, resumo meta e data de publicação de uma única URL.
-    Sempre retorna um dicionário, mesmo que a extração falhe, usando placeholders.
-    """
-    logger.info(f"Iniciando extração para URL: {url}")
+def baixar_sitemap_filtrado():
+    return list(baixar_sitemap_com_lastmod())
 
-    post_data = {
+def novo_post_data(url):
+    """Dicionário do post com placeholders, preenchido conforme a extração avança."""
+    return {
         "url": url,
         "titulo": "Título Indisponível",
         "conteudo": "Conteúdo Indisponível",
@@ -189,83 +196,114 @@ def extrair_conteudo_da_url(url, driver):
         "categoria": "Aguardando NLP" # Placeholder inicial antes da categorização
     }
 
-    for tentativa in range(2):
-        try:
+def processar_html(url, html, post_data=None, origem="Selenium"):
+    """
+    Extrai e categoriza o post a partir de um HTML já obtido (page_source do Selenium
+    ou HTML do cache), com fallback newspaper3k sobre o mesmo HTML. Não acessa a rede.
+    """
+    if post_data is None:
+        post_data = novo_post_data(url)
+
+    post_data.update(extrator_html.extrair_post(html, url=url))
+
+    if not conteudo_suficiente(post_data["conteudo"]):
+        logger.warning(f"Conteúdo {origem} insuficiente ou não encontrado para {url}. Tentando fallback newspaper3k...")
+        with metricas.medir("fallback_newspaper"):
+            resultado_np = extrair_com_newspaper(url, html=html)
+        if resultado_np:
+            post_data["titulo"] = resultado_np["titulo"]
+            post_data["conteudo"] = resultado_np["conteudo"]
+            post_data["resumo_meta"] = resultado_np["resumo_meta"]
+            post_data["data_publicacao"] = resultado_np["data_publicacao"]
+            logger.info(f"✅ Extração de conteúdo para {url} bem-sucedida (via Newspaper3k).")
+        else:
+            logger.error(f"❌ {url} | Não foi possível extrair conteúdo nem com {origem} nem com newspaper3k. Usando placeholders.")
+    else:
+        logger.info(f"✅ Extração de conteúdo para {url} bem-sucedida (via {origem}).")
+
+    # Chama a função de categorização após a extração
+    post_data["categoria"] = categorizar(url)
+    return post_data
+
+def extrair_conteudo_da_url(url, driver=None, revalidar=False, obter_driver=None):
+    """
+    Extrai o título, conteúdo, resumo meta e data de publicação de uma única URL.
+    Tenta primeiro o caminho HTTP (sem navegador) e só usa o Selenium quando a página
+    veio, mas o resultado não passa na regra de qualidade.
+    revalidar=True indica um post já processado que mudou no sitemap (GET condicional).
+    obter_driver (função sem argumentos) cria o WebDriver só quando o Selenium é necessário,
+    no lugar de um driver já aberto.
+    Retorna um dicionário, com placeholders se o conteúdo não puder ser extraído.
+
+    Raises:
+        FalhaHTTP: Se a página não pôde ser obtida (ex.: 404 ou 5xx persistente); não há fallback
+            para o Selenium, e a URL é registrada como erro.
+    """
+    logger.info(f"Iniciando extração para URL: {url}")
+
+    post_data = novo_post_data(url)
+
+    resultado_http = extrair_conteudo_via_http(url, revalidar=revalidar)
+    if resultado_http:
+        post_data.update(resultado_http)
+        post_data["categoria"] = categorizar(url)
+        logger.info(f"✅ Post '{post_data['titulo']}' extraído via HTTP e categorizado como '{post_data['categoria']}'.")
+        return post_data
+
+    if driver is None and obter_driver is not None:
+        driver = obter_driver()
+    if driver is None:
+        metricas.contar("selenium_sem_driver")
+        logger.error(f"❌ Nenhum WebDriver disponível para {url} (o caminho HTTP não bastou). Usando placeholders.")
+        return post_data
+
+    def carregar_pagina():
+        with metricas.medir("selenium_driver_get"):
             driver.get(url)
+        with metricas.medir("selenium_espera_body"):
             WebDriverWait(driver, 15).until(
                 EC.presence_of_element_located((By.TAG_NAME, 'body'))
             )
-            html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
-
-            post_data["titulo"] = extrair_titulo(soup)
-            post_data["resumo_meta"] = extrair_resumo_meta(soup)
-            post_data["data_publicacao"] = extrair_data_publicacao(soup)
-            post_data["conteudo"] = extrair_conteudo_com_selenium(driver)
-
-            if post_data["conteudo"] is None or len(post_data["conteudo"].split()) < 30:
-                logger.warning(f"Conteúdo Selenium insuficiente ou não encontrado para {url}. Tentando fallback newspaper3k...")
-                resultado_np = extrair_com_newspaper(url)
-                if resultado_np:
-                    post_data["titulo"] = resultado_np["titulo"]
-                    post_data["conteudo"] = resultado_np["conteudo"]
-                    post_data["resumo_meta"] = resultado_np["resumo_meta"]
-                    post_data["data_publicacao"] = resultado_np["data_publicacao"]
-                    logger.info(f"✅ Extração de conteúdo para {url} bem-sucedida (via Newspaper3k).")
-                else:
-                    logger.error(f"❌ {url} | Não foi possível extrair conteúdo nem com Selenium nem com newspaper3k. Usando placeholders.")
-            else:
-                logger.info(f"✅ Extração de conteúdo para {url} bem-sucedida (via Selenium).")
-
-            # Chama a função de categorização após a extração
-            post_data["categoria"] = categorizar(url)
-            logger.info(f"✅ Post '{post_data['titulo']}' extraído e categorizado como '{post_data['categoria']}'.")
-            return post_data
-
-        except WebDriverException as e:
-            if "invalid session id" in str(e).lower():
-                logger.warning(f"Invalid session id para {url}. Reiniciando driver e tentando novamente.")
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
-                import time
-                time.sleep(3)
-                options = webdriver.ChromeOptions()
-                options.add_argument('--headless')
-                options.add_argument('--no-sandbox')
-                options.add_argument('--disable-dev-shm-usage')
-                service = ChromeService(executable_path="chromedriver-win64/chromedriver-win64/chromedriver.exe")
-                driver = webdriver.Chrome(service=service, options=options)
-                continue
-            else:
-                logger.error(f"❌ Erro do WebDriver ao acessar {url}. Detalhes: {e}. Usando placeholders.")
-                break
-        except TimeoutException:
-            logger.error(f"❌ Tempo esgotado (Timeout) ao carregar a URL: {url}. Usando placeholders.")
-            break
-        except requests.exceptions.RequestException as e:
-            logger.error(f"❌ Erro de rede ao acessar {url}. Detalhes: {e}. Usando placeholders.")
-            break
-        except Exception as e:
-            logger.exception(f"❌ Erro inesperado ao extrair conteúdo da URL: {url}. Detalhes: {e}. Usando placeholders.")
-            break
+        # Uma única ida ao driver: todo o resto sai do parse do page_source
+        with metricas.medir("selenium_page_source"):
+            return driver.page_source
+
+    try:
+        # Timeouts são refeitos pelo agendador (com espera e redução do ritmo do host)
+        html = agendador.obter_agendador().executar(url, carregar_pagina, transitorias=(TimeoutException,))
+        bytes_pagina = navegador.bytes_transferidos(driver)
+        if bytes_pagina is not None:
+            metricas.contar("selenium_bytes_transferidos", bytes_pagina)
+            logger.info(f"Navegador: {bytes_pagina / 1024:.0f} KB transferidos para {url}.")
+        processar_html(url, html, post_data, origem="Selenium")
+        cache = _cache()
+        if cache and estado_crawl.status_do_post(post_data) == estado_crawl.STATUS_OK:
+            # Páginas de erro do navegador (sem conteúdo extraível) não entram no cache
+            cache.salvar(url, html)
+        logger.info(f"✅ Post '{post_data['titulo']}' extraído e categorizado como '{post_data['categoria']}'.")
+    except TimeoutException:
+        # Antes do WebDriverException, da qual TimeoutException é subclasse
+        metricas.contar("selenium_timeouts")
+        logger.error(f"❌ Tempo esgotado (Timeout) ao carregar a URL: {url}. Usando placeholders.")
+    except WebDriverException as e:
+        if "invalid session id" in str(e).lower():
+            # O driver pertence ao chamador (worker do pool): ele reinicia o driver e tenta de novo.
+            logger.warning(f"Invalid session id para {url}. Devolvendo erro para reiniciar o driver.")
+            raise
+        logger.error(f"❌ Erro do WebDriver ao acessar {url}. Detalhes: {e}. Usando placeholders.")
+    except Exception as e:
+        logger.exception(f"❌ Erro inesperado ao extrair conteúdo da URL: {url}. Detalhes: {e}. Usando placeholders.")
     return post_data
 
-# --- Função para reiniciar o driver com delay ---
-import time
+# --- Função para reiniciar o driver ---
 def reiniciar_driver_com_delay(driver):
+    """
+    Encerra o driver e devolve um novo. Mantida para scripts avulsos: o pool de workers
+    recicla os drivers pelo gerenciador_driver, com um driver reserva já iniciado.
+    """
     try:
         if driver:
             driver.quit()
     except Exception:
         pass
-    time.sleep(3)
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    # Caminho fixo para o chromedriver compatível
-    service = ChromeService(executable_path="chromedriver-win64/chromedriver-win64/chromedriver.exe")
-    new_driver = webdriver.Chrome(service=service, options=options)
-    return new_driver
\ No newline at end of file
+    return navegador.inicializar_driver()
@@ -0,0 +1,267 @@
+"""
+Detecção de posts quase duplicados (republicados com pequenas edições em outras seções do blog).
+
+O conteúdo de cada post vira um conjunto de shingles (sequências de TAMANHO_SHINGLE palavras
+normalizadas) e uma assinatura MinHash de NUM_PERMUTACOES valores. As assinaturas ficam num índice
+LSH em SQLite (NUM_BANDAS bandas de LINHAS_POR_BANDA valores): um post novo só é comparado com os
+posts que caem num mesmo balde em alguma banda, nunca com o histórico inteiro.
+
+Cada post recebe um grupo_duplicata: a URL do primeiro post do grupo (a própria URL, se não houver
+nenhum parecido com Jaccard estimado >= LIMIAR_DUPLICATA).
+Relatório de sobreposição de conteúdo a partir da base mestre:
+    python duplicatas.py [relatorio_duplicatas.xlsx]
+"""
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+import estado_crawl
+import utilitarios
+from buscador_palavras_chave import tokenizar
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_INDICE_DUPLICATAS = "duplicatas.sqlite"
+TAMANHO_SHINGLE = 5
+NUM_PERMUTACOES = 128
+NUM_BANDAS = 16
+LINHAS_POR_BANDA = NUM_PERMUTACOES // NUM_BANDAS # Limiar efetivo do LSH ~ (1/16)^(1/8) = 0,71
+LIMIAR_DUPLICATA = 0.8 # Jaccard estimado mínimo para dois posts serem do mesmo grupo
+SEMENTE = 99 # Fixa: as assinaturas gravadas continuam comparáveis entre execuções
+TAMANHO_CONSULTA = 500
+# Pula o NLP de duplicatas e copia os clusters do primeiro post do grupo (ver persistencia.aplicar_nlp)
+PULAR_NLP_DUPLICATAS = os.environ.get("BLOG99_PULAR_NLP_DUPLICATAS", "0") == "1"
+
+_rng = np.random.default_rng(SEMENTE)
+# Hashing multiply-shift: h(x) = ((a * x + b) mod 2^64) >> 32, com a ímpar
+_A = _rng.integers(1, 2**63, size=NUM_PERMUTACOES, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=NUM_PERMUTACOES, dtype=np.uint64)
+
+
+def shingles(texto):
+    """Hashes (crc32) dos shingles de palavras do texto, sem repetição."""
+    tokens = tokenizar(texto) if isinstance(texto, str) else []
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    if len(tokens) < TAMANHO_SHINGLE:
+        grupos = [" ".join(tokens)]
+    else:
+        grupos = (" ".join(tokens[i:i + TAMANHO_SHINGLE]) for i in range(len(tokens) - TAMANHO_SHINGLE + 1))
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grupos), dtype=np.uint64))
+
+
+def assinatura_minhash(texto):
+    """Assinatura MinHash (NUM_PERMUTACOES valores uint32) do texto, ou None se ele não tiver palavras."""
+    hashes = shingles(texto)
+    if not len(hashes):
+        return None
+    with np.errstate(over='ignore'): # O estouro é o próprio 'mod 2^64'
+        valores = (_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)
+    return valores.min(axis=1).astype(np.uint32)
+
+
+def similaridade(assinatura_a, assinatura_b):
+    """Jaccard estimado: fração de posições iguais nas duas assinaturas."""
+    return float(np.mean(assinatura_a == assinatura_b))
+
+
+def _chaves_bandas(assinatura):
+    return [
+        (banda, assinatura[banda * LINHAS_POR_BANDA:(banda + 1) * LINHAS_POR_BANDA].tobytes())
+        for banda in range(NUM_BANDAS)
+    ]
+
+
+class IndiceDuplicatas:
+    """
+    Índice LSH persistente das assinaturas MinHash, em SQLite (assinatura e grupo por URL, e os
+    baldes de cada banda). Guarda também a categoria e o topic_cluster gravados de cada URL, para
+    que as duplicatas copiem os clusters do primeiro post do grupo sem ler a base mestre.
+    """
+
+    def __init__(self, caminho=CAMINHO_INDICE_DUPLICATAS):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS assinaturas (
+                url TEXT PRIMARY KEY,
+                assinatura BLOB NOT NULL,
+                grupo TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS baldes (
+                banda INTEGER NOT NULL,
+                chave BLOB NOT NULL,
+                url TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_baldes ON baldes(banda, chave)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_baldes_url ON baldes(url)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS clusters (
+                url TEXT PRIMARY KEY,
+                categoria TEXT,
+                topic_cluster TEXT NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM assinaturas").fetchone()[0]
+
+    def _candidatos(self, assinatura):
+        """URLs que dividem ao menos um balde com a assinatura."""
+        urls = set()
+        for banda, chave in _chaves_bandas(assinatura):
+            urls.update(url for (url,) in self._conn.execute(
+                "SELECT url FROM baldes WHERE banda = ? AND chave = ?", (banda, chave)
+            ))
+        return urls
+
+    def _assinaturas(self, urls):
+        urls = list(urls)
+        encontradas = {}
+        for inicio in range(0, len(urls), TAMANHO_CONSULTA):
+            lote = urls[inicio:inicio + TAMANHO_CONSULTA]
+            for url, assinatura, grupo in self._conn.execute(
+                f"SELECT url, assinatura, grupo FROM assinaturas WHERE url IN ({', '.join('?' * len(lote))})", lote
+            ):
+                encontradas[url] = (np.frombuffer(assinatura, dtype=np.uint32), grupo)
+        return encontradas
+
+    def adicionar(self, url, texto):
+        """
+        Indexa (ou reindexa, se a URL já existir) o conteúdo do post e retorna o seu grupo_duplicata:
+        o grupo do post indexado mais parecido acima de LIMIAR_DUPLICATA, ou a própria URL.
+        """
+        # Placeholders não entram no índice: todos teriam a mesma assinatura e virariam um só grupo
+        assinatura = None if texto in estado_crawl.CONTEUDOS_PLACEHOLDER else assinatura_minhash(texto)
+        with self._lock:
+            self._conn.execute("DELETE FROM baldes WHERE url = ?", (url,))
+            self._conn.execute("DELETE FROM assinaturas WHERE url = ?", (url,))
+            if assinatura is None:
+                return url # Sem conteúdo: não entra no índice
+            grupo, melhor = url, LIMIAR_DUPLICATA
+            for outra_url, (outra, outro_grupo) in self._assinaturas(self._candidatos(assinatura)).items():
+                valor = similaridade(assinatura, outra)
+                if valor >= melhor:
+                    grupo, melhor = outro_grupo, valor
+            self._conn.execute(
+                "INSERT INTO assinaturas (url, assinatura, grupo) VALUES (?, ?, ?)", (url, assinatura.tobytes(), grupo)
+            )
+            self._conn.executemany(
+                "INSERT INTO baldes (banda, chave, url) VALUES (?, ?, ?)",
+                ((banda, chave, url) for banda, chave in _chaves_bandas(assinatura))
+            )
+        return grupo
+
+    def marcar(self, urls, textos):
+        """Indexa os posts de um lote em uma única transação e retorna o grupo_duplicata de cada um, na ordem."""
+        grupos = [self.adicionar(url, texto) for url, texto in zip(urls, textos)]
+        with self._lock:
+            self._conn.commit()
+        duplicados = sum(1 for url, grupo in zip(urls, grupos) if grupo != url)
+        if duplicados:
+            logger.info(f"📌 {duplicados} de {len(grupos)} posts do lote são quase duplicatas de posts já indexados.")
+        return grupos
+
+    def registrar_clusters(self, urls, categorias, topic_clusters):
+        """Grava a categoria e o topic_cluster (já no formato do Excel) de cada URL persistida."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO clusters (url, categoria, topic_cluster) VALUES (?, ?, ?)",
+                zip(urls, categorias, topic_clusters)
+            )
+            self._conn.commit()
+
+    def clusters_de(self, urls):
+        """{url: (categoria, topic_cluster)} das URLs com clusters registrados."""
+        urls = list(urls)
+        encontrados = {}
+        with self._lock:
+            for inicio in range(0, len(urls), TAMANHO_CONSULTA):
+                lote = urls[inicio:inicio + TAMANHO_CONSULTA]
+                for url, categoria, topic_cluster in self._conn.execute(
+                    f"SELECT url, categoria, topic_cluster FROM clusters WHERE url IN ({', '.join('?' * len(lote))})", lote
+                ):
+                    encontrados[url] = (categoria, topic_cluster)
+        return encontrados
+
+    def urls(self):
+        with self._lock:
+            return {url for (url,) in self._conn.execute("SELECT url FROM assinaturas")}
+
+    def grupos(self):
+        """{grupo: [urls]} dos grupos com mais de um post."""
+        with self._lock:
+            linhas = self._conn.execute("SELECT grupo, url FROM assinaturas ORDER BY grupo, url").fetchall()
+        grupos = {}
+        for grupo, url in linhas:
+            grupos.setdefault(grupo, []).append(url)
+        return {grupo: urls for grupo, urls in grupos.items() if len(urls) > 1}
+
+    def similaridade_entre(self, url_a, url_b):
+        with self._lock:
+            assinaturas = self._assinaturas([url_a, url_b])
+        if url_a not in assinaturas or url_b not in assinaturas:
+            return None
+        return similaridade(assinaturas[url_a][0], assinaturas[url_b][0])
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_indice = utilitarios.compartilhado(IndiceDuplicatas)
+
+
+def obter_indice_duplicatas():
+    """Retorna o índice compartilhado de duplicatas (criado no primeiro uso)."""
+    return _indice()
+
+
+def gerar_relatorio_duplicatas(nome_saida="relatorio_duplicatas.xlsx"):
+    """
+    Relatório de sobreposição de conteúdo: um bloco de linhas por grupo de quase duplicatas, com a
+    similaridade estimada de cada post com o primeiro do grupo. Posts da base mestre ainda não
+    indexados (ex.: importados de um Excel antigo) são indexados antes.
+    """
+    import pandas as pd
+    import base_mestre
+
+    indice = obter_indice_duplicatas()
+    df = base_mestre.BaseMestre().ler(colunas=['url', 'categoria', 'titulo', 'conteudo'])
+    novos = df[~df['url'].isin(indice.urls())]
+    if not novos.empty:
+        logger.info(f"Indexando {len(novos)} posts da base mestre no índice de duplicatas...")
+        indice.marcar(novos['url'].tolist(), novos['conteudo'].tolist())
+
+    info = df.set_index('url')[['categoria', 'titulo']].to_dict('index')
+    linhas = []
+    for grupo, urls in indice.grupos().items():
+        for url in sorted(urls, key=lambda u: u != grupo): # O primeiro do grupo vem primeiro
+            linhas.append({
+                'grupo_duplicata': grupo,
+                'url': url,
+                'categoria': info.get(url, {}).get('categoria'),
+                'titulo': info.get(url, {}).get('titulo'),
+                'similaridade_com_grupo': 1.0 if url == grupo else indice.similaridade_entre(grupo, url),
+            })
+    df_relatorio = pd.DataFrame(linhas, columns=['grupo_duplicata', 'url', 'categoria', 'titulo', 'similaridade_com_grupo'])
+    df_relatorio.to_excel(nome_saida, sheet_name='Quase Duplicatas', index=False, engine='xlsxwriter')
+    logger.info(f"✅ Relatório de duplicatas exportado: '{nome_saida}' ({df_relatorio['grupo_duplicata'].nunique()} grupos, {len(df_relatorio)} posts).")
+    return nome_saida
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    gerar_relatorio_duplicatas(sys.argv[1] if len(sys.argv) > 1 else "relatorio_duplicatas.xlsx")
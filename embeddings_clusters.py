@@ -0,0 +1,179 @@
+"""
+Atribuição de topic clusters por similaridade semântica (sentence-transformers), em CPU.
+
+Cada cluster de TOPIC_CLUSTERS_KEYWORDS vira um centróide: a média normalizada dos embeddings
+das suas palavras-chave. Os posts são codificados em lotes grandes e comparados a todos os
+centróides com um único produto de matrizes. Os embeddings ficam num cache em disco, mapeado
+em memória e indexado pelo hash do texto: só posts novos ou editados são codificados de novo.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+import modelos_nlp
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_CACHE_EMBEDDINGS = "cache_embeddings"
+TAMANHO_LOTE_EMBEDDINGS = 128 # Textos por lote no modelo.encode (lotes grandes aproveitam melhor a CPU)
+CAMPOS_EMBEDDING = ['titulo', 'resumo_meta'] # Inclua 'conteudo' para usar também o corpo do post
+LIMIAR_EMBEDDING = 0.35 # Similaridade de cosseno mínima para atribuir um cluster
+MAX_CLUSTERS_POR_POST = 3
+
+
+class CacheEmbeddings:
+    """
+    Cache de embeddings de um modelo: vetores float32 num arquivo binário só de acréscimo
+    (lido com np.memmap) e um índice SQLite hash -> linha.
+
+    Os vetores são gravados antes do índice; se o processo cair entre os dois, sobram
+    apenas linhas órfãs no arquivo, nunca um índice apontando para dados inexistentes.
+    """
+
+    def __init__(self, nome_modelo, diretorio=DIRETORIO_CACHE_EMBEDDINGS):
+        self.diretorio = os.path.join(diretorio, re.sub(r"[^\w.-]+", "_", nome_modelo))
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._caminho_vetores = os.path.join(self.diretorio, "vetores.f32")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.diretorio, "indice.sqlite"), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vetores (hash TEXT PRIMARY KEY, linha INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+        self._conn.commit()
+        linha = self._conn.execute("SELECT valor FROM metadados WHERE chave = 'dimensao'").fetchone()
+        self.dimensao = int(linha[0]) if linha else None
+
+    def linhas(self, hashes):
+        """Retorna {hash: linha} dos hashes já presentes no cache."""
+        hashes = list(hashes)
+        encontrados = {}
+        with self._lock:
+            for inicio in range(0, len(hashes), 500):
+                lote = hashes[inicio:inicio + 500]
+                encontrados.update(self._conn.execute(
+                    f"SELECT hash, linha FROM vetores WHERE hash IN ({', '.join('?' * len(lote))})", lote
+                ))
+        return encontrados
+
+    def vetores(self, linhas):
+        """Matriz (len(linhas) x dimensao) com os vetores das linhas pedidas."""
+        if not len(linhas):
+            return np.zeros((0, self.dimensao or 0), dtype=np.float32)
+        total = os.path.getsize(self._caminho_vetores) // (4 * self.dimensao)
+        mapa = np.memmap(self._caminho_vetores, dtype=np.float32, mode="r", shape=(total, self.dimensao))
+        return np.asarray(mapa[np.asarray(linhas)])
+
+    def adicionar(self, hashes, matriz):
+        """Acrescenta os vetores (uma linha por hash) ao arquivo e ao índice."""
+        matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+        with self._lock:
+            if self.dimensao is None:
+                self.dimensao = matriz.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO metadados VALUES ('dimensao', ?)", (str(self.dimensao),))
+            tamanho = os.path.getsize(self._caminho_vetores) if os.path.exists(self._caminho_vetores) else 0
+            primeira_linha = tamanho // (4 * self.dimensao)
+            with open(self._caminho_vetores, "ab") as f:
+                f.truncate(primeira_linha * 4 * self.dimensao) # Descarta uma linha parcial de um crash anterior
+                f.write(matriz.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vetores (hash, linha) VALUES (?, ?)",
+                ((hash_conteudo, primeira_linha + i) for i, hash_conteudo in enumerate(hashes))
+            )
+            self._conn.commit()
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = utilitarios.compartilhado(CacheEmbeddings)
+
+
+def obter_cache_embeddings(nome_modelo=None):
+    """Retorna o cache compartilhado de embeddings do modelo (criado no primeiro uso)."""
+    return _caches(nome_modelo or modelos_nlp.MODELO_EMBEDDINGS)
+
+
+def codificar(textos, nome_modelo=None, batch_size=TAMANHO_LOTE_EMBEDDINGS):
+    """
+    Embeddings normalizados (L2) dos textos, na mesma ordem, como matriz float32.
+    Só os textos ausentes do cache passam pelo modelo, que só é carregado se houver algum.
+    """
+    nome_modelo = nome_modelo or modelos_nlp.MODELO_EMBEDDINGS
+    cache = obter_cache_embeddings(nome_modelo)
+    textos = [texto if isinstance(texto, str) else "" for texto in textos]
+    hashes = [utilitarios.hash_texto(texto) for texto in textos]
+    linhas = cache.linhas(set(hashes))
+    pendentes = {h: texto for h, texto in zip(hashes, textos) if h not in linhas}
+    logger.info(f"Embeddings: {len(linhas)} textos distintos no cache, {len(pendentes)} para codificar.")
+
+    if pendentes:
+        modelo = modelos_nlp.obter_sentence_transformer(nome_modelo)
+        matriz = modelo.encode(
+            list(pendentes.values()), batch_size=batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False
+        )
+        cache.adicionar(list(pendentes), matriz)
+        linhas.update(cache.linhas(pendentes))
+    return cache.vetores([linhas[h] for h in hashes])
+
+
+def centroides_dos_clusters(clusters_keywords, nome_modelo=None):
+    """
+    Um centróide normalizado por (categoria, cluster): a média dos embeddings do nome do
+    cluster e das suas palavras-chave. Retorna (lista de (categoria, cluster), matriz de centróides).
+    """
+    chaves, textos, dono = [], [], []
+    for categoria, clusters in clusters_keywords.items():
+        for cluster, keywords in clusters.items():
+            for texto in [cluster, *keywords]:
+                textos.append(texto)
+                dono.append(len(chaves))
+            chaves.append((categoria, cluster))
+    vetores = codificar(textos, nome_modelo)
+    centroides = np.zeros((len(chaves), vetores.shape[1]), dtype=np.float32)
+    np.add.at(centroides, np.asarray(dono), vetores)
+    centroides /= np.maximum(np.linalg.norm(centroides, axis=1, keepdims=True), 1e-12)
+    return chaves, centroides
+
+
+def atribuir_clusters(categorias, textos, clusters_keywords, nome_modelo=None,
+                      limiar=LIMIAR_EMBEDDING, max_clusters=MAX_CLUSTERS_POR_POST):
+    """
+    Clusters de cada post por similaridade com os centróides da sua categoria.
+
+    Args:
+        categorias: Categoria principal de cada post.
+        textos: Texto de cada post (ex.: título + meta descrição).
+        clusters_keywords: Dicionário no formato de TOPIC_CLUSTERS_KEYWORDS.
+        limiar: Similaridade mínima para um cluster ser atribuído.
+        max_clusters: Número máximo de clusters por post.
+
+    Returns:
+        Lista, por post, de [(cluster, similaridade)] do mais ao menos similar (vazia se nenhum passar do limiar).
+    """
+    chaves, centroides = centroides_dos_clusters(clusters_keywords, nome_modelo)
+    similaridades = codificar(textos, nome_modelo) @ centroides.T # Um único produto: posts x clusters
+
+    colunas_por_categoria = {}
+    for coluna, (categoria, _) in enumerate(chaves):
+        colunas_por_categoria.setdefault(categoria, []).append(coluna)
+
+    resultados = []
+    for i, (categoria, texto) in enumerate(zip(categorias, textos)):
+        colunas = colunas_por_categoria.get(categoria, [])
+        if not colunas or not (isinstance(texto, str) and texto.strip()):
+            resultados.append([])
+            continue
+        pontuacoes = similaridades[i, colunas]
+        ordem = np.argsort(-pontuacoes)[:max_clusters]
+        resultados.append([
+            (chaves[colunas[j]][1], round(float(pontuacoes[j]), 4)) for j in ordem if pontuacoes[j] >= limiar
+        ])
+    return resultados
@@ -0,0 +1,200 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PATH = "estado_crawl.sqlite"
+HISTORICO_TXT_LEGADO = "historico_urls_processadas.txt"
+TAMANHO_LOTE_COMMIT = 50 # Resultados acumulados antes de cada commit
+MAX_TENTATIVAS = 3 # Tentativas por URL antes de sair da fila de retentativa
+
+# Situação de cada URL no estado do crawl
+STATUS_PENDENTE = "pendente"
+STATUS_OK = "ok"
+STATUS_PLACEHOLDER = "placeholder" # Extração terminou, mas só com placeholders no conteúdo
+STATUS_ERRO = "erro"
+
+CONTEUDOS_PLACEHOLDER = {None, "", "Conteúdo Indisponível"}
+
+_COLUNAS = {
+    "lastmod": "TEXT",
+    "etag": "TEXT",
+    "last_modified": "TEXT",
+    "status": f"TEXT NOT NULL DEFAULT '{STATUS_PENDENTE}'",
+    "tentativas": "INTEGER NOT NULL DEFAULT 0",
+    "ultimo_erro": "TEXT",
+    "duracao_s": "REAL",
+    "hash_conteudo": "TEXT",
+    "atualizado_em": "TEXT",
+}
+
+
+def status_do_post(post_data):
+    """Classifica o resultado de uma extração: ok, placeholder (sem conteúdo real) ou erro (sem post_data)."""
+    if not post_data:
+        return STATUS_ERRO
+    if post_data.get("conteudo") in CONTEUDOS_PLACEHOLDER:
+        return STATUS_PLACEHOLDER
+    return STATUS_OK
+
+
+class EstadoCrawl:
+    """
+    Estado persistente do crawl, uma linha por URL em SQLite.
+
+    Substitui o historico_urls_processadas.txt e o arquivo manual de URLs com erro:
+    guarda status (pendente/ok/placeholder/erro), número de tentativas, último erro,
+    duração da última extração, hash do conteúdo, o lastmod do sitemap e os
+    validadores HTTP (ETag e Last-Modified) usados no recrawl incremental.
+
+    Resultados são gravados em lotes (TAMANHO_LOTE_COMMIT por transação); um crash
+    perde no máximo o lote corrente, e essas URLs são simplesmente refeitas na próxima execução.
+    """
+
+    def __init__(self, caminho=ESTADO_PATH, tamanho_lote=TAMANHO_LOTE_COMMIT):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self._lock = threading.Lock()
+        self._nao_commitados = 0
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY)")
+        # Migração: bancos criados por versões anteriores ganham as colunas que faltam
+        existentes = {linha[1] for linha in self._conn.execute("PRAGMA table_info(urls)")}
+        for coluna, tipo in _COLUNAS.items():
+            if coluna not in existentes:
+                self._conn.execute(f"ALTER TABLE urls ADD COLUMN {coluna} {tipo}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status, tentativas)")
+        self._conn.commit()
+
+    # --- Leitura ---
+
+    def situacoes(self):
+        """Retorna {url: (status, tentativas)} de todas as URLs conhecidas."""
+        with self._lock:
+            return {url: (status, tentativas) for url, status, tentativas in
+                    self._conn.execute("SELECT url, status, tentativas FROM urls")}
+
+    def urls_processadas(self):
+        """URLs extraídas com sucesso (status ok)."""
+        with self._lock:
+            return {url for (url,) in self._conn.execute("SELECT url FROM urls WHERE status = ?", (STATUS_OK,))}
+
+    def fila_retentativa(self, max_tentativas=MAX_TENTATIVAS):
+        """URLs com erro ou só placeholders que ainda têm tentativas disponíveis, das mais antigas para as mais novas."""
+        with self._lock:
+            return [url for (url,) in self._conn.execute(
+                "SELECT url FROM urls WHERE status IN (?, ?) AND tentativas < ? ORDER BY atualizado_em",
+                (STATUS_ERRO, STATUS_PLACEHOLDER, max_tentativas)
+            )]
+
+    def lastmods(self):
+        """Retorna {url: lastmod} de todas as URLs com lastmod registrado."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT url, lastmod FROM urls WHERE lastmod IS NOT NULL"))
+
+    def validadores(self, url):
+        """Retorna (etag, last_modified) da última resposta HTTP 200 da URL."""
+        with self._lock:
+            linha = self._conn.execute("SELECT etag, last_modified FROM urls WHERE url = ?", (url,)).fetchone()
+        return linha if linha else (None, None)
+
+    def vazio(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM urls LIMIT 1").fetchone() is None
+
+    # --- Escrita ---
+
+    def registrar_resultado(self, url, status, duracao_s=None, erro=None, hash_conteudo=None):
+        """
+        Registra o resultado de uma tentativa de extração. O commit acontece a cada lote.
+        tentativas conta só as falhas consecutivas: um sucesso zera o contador.
+        """
+        with self._lock:
+            self._conn.execute(
+                f"""INSERT INTO urls (url, status, tentativas, ultimo_erro, duracao_s, hash_conteudo, atualizado_em)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       status = excluded.status,
+                       tentativas = CASE WHEN excluded.status = '{STATUS_OK}' THEN 0 ELSE urls.tentativas + 1 END,
+                       ultimo_erro = excluded.ultimo_erro,
+                       duracao_s = excluded.duracao_s,
+                       hash_conteudo = COALESCE(excluded.hash_conteudo, urls.hash_conteudo),
+                       atualizado_em = excluded.atualizado_em""",
+                (url, status, 0 if status == STATUS_OK else 1, erro, duracao_s, hash_conteudo, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            self._nao_commitados += 1
+            if self._nao_commitados >= self.tamanho_lote:
+                self._commit()
+
+    def registrar_lastmods(self, lastmods):
+        """Grava, em uma única transação, o lastmod do sitemap de cada URL ({url: lastmod})."""
+        with self._lock:
+            self._conn.executemany(
+                """INSERT INTO urls (url, lastmod) VALUES (?, ?)
+                   ON CONFLICT(url) DO UPDATE SET lastmod = excluded.lastmod""",
+                lastmods.items()
+            )
+            self._commit()
+
+    def registrar_validadores(self, url, etag, last_modified):
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO urls (url, etag, last_modified) VALUES (?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified""",
+                (url, etag, last_modified)
+            )
+            self._nao_commitados += 1
+            if self._nao_commitados >= self.tamanho_lote:
+                self._commit()
+
+    def importar_urls(self, urls, status=STATUS_OK):
+        """Carrega URLs já processadas (ex.: bootstrap a partir de um Excel). Só altera URLs ainda pendentes."""
+        agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            antes = self._conn.total_changes
+            self._conn.executemany(
+                f"""INSERT INTO urls (url, status, atualizado_em) VALUES (?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET status = excluded.status, atualizado_em = excluded.atualizado_em
+                    WHERE urls.status = '{STATUS_PENDENTE}'""",
+                ((url, status, agora) for url in urls)
+            )
+            self._commit()
+            return self._conn.total_changes - antes
+
+    def importar_historico_txt(self, caminho=HISTORICO_TXT_LEGADO):
+        """Migração única do historico_urls_processadas.txt legado para o estado em SQLite."""
+        if not os.path.exists(caminho):
+            return 0
+        with open(caminho, "r", encoding="utf-8") as f:
+            importadas = self.importar_urls(line.strip() for line in f if line.strip())
+        # Renomeia para não importar de novo, mantendo o arquivo original como backup
+        os.replace(caminho, f"{caminho}.importado")
+        logger.info(f"Histórico legado '{caminho}' importado para o estado do crawl: {importadas} URLs.")
+        return importadas
+
+    def _commit(self):
+        self._conn.commit()
+        self._nao_commitados = 0
+
+    def commit(self):
+        with self._lock:
+            self._commit()
+
+    def fechar(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+
+_estado = utilitarios.compartilhado(EstadoCrawl)
+
+
+def obter_estado():
+    """Retorna a instância compartilhada do estado do crawl (criada no primeiro uso)."""
+    return _estado()
@@ -1,11 +1,82 @@
 import pandas as pd
 from datetime import datetime
+import math
 import os
 import logging # Importa o módulo de logging
+import xlsxwriter
+
+import metricas
+from extrator_html import secao_da_url # Chave de roteamento das linhas entre as abas
 
 # Pega o logger para este módulo (exportador.py)
 logger = logging.getLogger(__name__)
 
+# Abas do Excel e as seções do blog (/blog/<secao>/) que entram em cada uma (None = todas as linhas).
+# Única definição usada por todos os scripts.
+ABAS_EXCEL = {
+    'Dados Brutos': None,
+    'Motorista': {'motorista', 'passageiro', '99moto'},
+    '99Pay': {'99pay'},
+}
+MAX_CARACTERES_CELULA = 32767 # Limite do Excel por célula; textos maiores (ex.: 'conteudo') são truncados
+
+def _valor_celula(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)) or valor is pd.NaT:
+        return None
+    if isinstance(valor, str):
+        return valor[:MAX_CARACTERES_CELULA]
+    if isinstance(valor, (bool, int, float)):
+        return valor
+    texto = str(valor) # Datas, listas e outros tipos vão como texto
+    return texto[:MAX_CARACTERES_CELULA]
+
+
+def escrever_excel_em_streaming(linhas, colunas, nome_arquivo, abas=None):
+    """
+    Grava as linhas direto no xlsxwriter em modo constant_memory, sem montar um DataFrame por aba.
+
+    Cada linha é roteada numa única passada para todas as abas em que entra, pela seção da URL;
+    a lista de abas de cada seção é calculada uma vez e reaproveitada.
+
+    Args:
+        linhas: Iterável de sequências de valores, na ordem de colunas.
+        colunas: Nomes das colunas (precisa conter 'url').
+        nome_arquivo: Caminho do .xlsx.
+        abas: Definição das abas no formato de ABAS_EXCEL (padrão ABAS_EXCEL).
+
+    Returns:
+        dict: Número de linhas gravadas em cada aba.
+    """
+    abas = ABAS_EXCEL if abas is None else abas
+    posicao_url = list(colunas).index('url')
+    workbook = xlsxwriter.Workbook(nome_arquivo, {'constant_memory': True, 'strings_to_urls': False})
+    try:
+        formato_cabecalho = workbook.add_format({'bold': True})
+        planilhas = []
+        for nome_aba in abas:
+            planilha = workbook.add_worksheet(nome_aba)
+            planilha.write_row(0, 0, list(colunas), formato_cabecalho)
+            planilhas.append(planilha)
+        proxima_linha = [1] * len(planilhas)
+        rotas = {} # secao -> índices das abas que recebem a linha
+        for linha in linhas:
+            secao = secao_da_url(linha[posicao_url])
+            destinos = rotas.get(secao)
+            if destinos is None:
+                destinos = rotas[secao] = [
+                    i for i, secoes in enumerate(abas.values()) if secoes is None or secao in secoes
+                ]
+            if not destinos:
+                continue
+            valores = [_valor_celula(valor) for valor in linha]
+            for i in destinos:
+                planilhas[i].write_row(proxima_linha[i], 0, valores)
+                proxima_linha[i] += 1
+    finally:
+        workbook.close()
+    return {nome_aba: total - 1 for nome_aba, total in zip(abas, proxima_linha)}
+
+
 def exportar_para_excel(df_posts, nome_base="blog99_resultado"):
     """
     Exporta o DataFrame com os posts processados para um arquivo .xlsx com um nome fixo.
@@ -34,7 +105,8 @@ def exportar_para_excel(df_posts, nome_base="blog99_resultado"):
             'categoria',
             'titulo',
             'resumo_meta',
-            'topic_cluster'
+            'topic_cluster',
+            'grupo_duplicata'
         ]
         # --- FIM DA CORREÇÃO ---
 
@@ -48,27 +120,16 @@ def exportar_para_excel(df_posts, nome_base="blog99_resultado"):
                 logger.warning(f"Coluna '{col}' não estava na ordem predefinida e foi adicionada ao final.")
 
 
-        df_para_excel = df_posts[final_cols].copy() # Cria uma cópia para evitar SettingWithCopyWarning
-
-        # Filtra Motorista: urls que contenham /blog/motorista ou /blog/99moto
-        motorista_mask = df_para_excel['url'].str.contains(r"/blog/(motorista|99moto)", case=False, na=False)
-        df_motorista = df_para_excel[motorista_mask].copy()
-
-        # Filtra 99Pay: urls que contenham /blog/99pay
-        pay_mask = df_para_excel['url'].str.contains(r"/blog/99pay", case=False, na=False)
-        df_99pay = df_para_excel[pay_mask].copy()
-
-        # Exporta para Excel com múltiplas abas
-        with pd.ExcelWriter(nome_arquivo, engine='xlsxwriter') as writer:
-            df_para_excel.to_excel(writer, sheet_name='Dados Brutos', index=False)
-            df_motorista.to_excel(writer, sheet_name='Motorista', index=False)
-            df_99pay.to_excel(writer, sheet_name='99Pay', index=False)
+        # Sem cópias do DataFrame: as linhas vão direto para o arquivo, já roteadas para as abas
+        with metricas.medir("exportacao_excel"):
+            linhas_por_aba = escrever_excel_em_streaming(
+                zip(*(df_posts[coluna] for coluna in final_cols)), final_cols, nome_arquivo
+            )
+        for nome_aba, total in linhas_por_aba.items():
+            logger.info(f"Aba '{nome_aba}': {total} linhas")
 
-        logger.info(f"✅ Arquivo Excel exportado com sucesso: '{nome_arquivo}' (3 abas)")
-        logger.info(f"Aba 'Dados Brutos': {len(df_para_excel)} linhas")
-        logger.info(f"Aba 'Motorista': {len(df_motorista)} linhas")
-        logger.info(f"Aba '99Pay': {len(df_99pay)} linhas")
-        logger.debug(f"Colunas exportadas na ordem: {list(df_para_excel.columns)}")
+        logger.info(f"✅ Arquivo Excel exportado com sucesso: '{nome_arquivo}' ({len(linhas_por_aba)} abas)")
+        logger.debug(f"Colunas exportadas na ordem: {final_cols}")
         return nome_arquivo
 
     except Exception as e:
@@ -0,0 +1,276 @@
+import json
+import logging
+import re
+import threading
+from datetime import datetime
+
+import lxml.html
+from dateutil.parser import isoparse
+
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# Seletores do corpo do post, em ordem de preferência (formato "tag.classe").
+# 'main' e 'body' só fazem sentido no HTML renderizado pelo navegador: no HTML bruto
+# sempre existem e trariam menus/rodapé, mascarando páginas que dependem de JS.
+SELETORES_CONTEUDO = [
+    "article.entry-content",
+    "div.entry-content",
+    "div.post-content",
+    "div.td-post-content",
+    "main",
+    "body"
+]
+SELETORES_CONTEUDO_HTTP = SELETORES_CONTEUDO[:4]
+# Só seletores específicos do corpo do post entram no cache por seção: 'main'/'body' são
+# último recurso e, se memorizados, passariam na frente do corpo real nas páginas seguintes.
+SELETORES_CACHEAVEIS = set(SELETORES_CONTEUDO_HTTP)
+TAGS_INDESEJADAS = ['script', 'style', 'aside', 'figcaption']
+_XPATH_INDESEJADOS = " | ".join(f".//{tag}" for tag in TAGS_INDESEJADAS) + " | .//comment()"
+
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
+}
+# Um único padrão para as datas no texto: "3 de março de 2023", YYYY-MM-DD e DD/MM/YYYY
+PADRAO_DATA_TEXTO = re.compile(
+    r'\b(?:(?P<dia>\d{1,2})\s+(?:de\s+)?(?P<mes>' + '|'.join(MESES) + r')\s+(?:de\s+)?(?P<ano>\d{4})'
+    r'|(?P<iso>\d{4}-\d{2}-\d{2})'
+    r'|(?P<dia_br>\d{2})/(?P<mes_br>\d{2})/(?P<ano_br>\d{4}))\b',
+    re.IGNORECASE
+)
+# Fontes estruturadas da data de publicação, em ordem de preferência (depois do JSON-LD)
+XPATHS_DATA_PUBLICACAO = [
+    "//meta[@property='article:published_time']/@content",
+    "//meta[@itemprop='datePublished']/@content",
+    "//*[@itemprop='datePublished']/@datetime",
+    "//meta[@property='og:published_time']/@content",
+    "//meta[@name='date' or @name='publish-date' or @name='pubdate']/@content",
+    "//time/@datetime",
+]
+TIPOS_ARTIGO_JSONLD = {'Article', 'BlogPosting', 'NewsArticle'}
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+_XPATH_TEXTO_VISIVEL = "//body//text()[not(ancestor::script or ancestor::style or ancestor::noscript)]"
+
+# Elementos de bloco que viram quebra de linha no texto final, como no .text do Selenium
+TAGS_BLOCO = {
+    'p', 'div', 'li', 'ul', 'ol', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote',
+    'section', 'article', 'header', 'footer', 'table', 'tr', 'pre', 'figure', 'dd', 'dt'
+}
+_ESPACOS = re.compile(r'\s+')
+
+_PADRAO_SECAO = re.compile(r"/blog/([^/?#]+)", re.IGNORECASE)
+
+_xpath_cache = {}
+_seletor_por_secao = {} # Seção do blog -> seletor de conteúdo que funcionou na última página dela
+_seletor_por_secao_lock = threading.Lock()
+
+
+def secao_da_url(url):
+    """Seção do blog na URL (/blog/<secao>/), em minúsculas ('' se não houver)."""
+    encontrado = _PADRAO_SECAO.search(url) if isinstance(url, str) else None
+    return encontrado.group(1).lower() if encontrado else ""
+
+
+def _seletor_para_xpath(seletor):
+    """Converte um seletor simples 'tag.classe' em XPath (sem depender do pacote cssselect)."""
+    if seletor not in _xpath_cache:
+        tag, _, classe = seletor.partition('.')
+        if classe:
+            _xpath_cache[seletor] = f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')]"
+        else:
+            _xpath_cache[seletor] = f"//{tag}"
+    return _xpath_cache[seletor]
+
+
+def _encontrar_conteudo(tree, selectors, secao=None):
+    """
+    Primeiro seletor de selectors (em ordem de prioridade) presente na página, e o seu elemento.
+    O seletor que funcionou por último na seção é só uma dica: vale se estiver na página e nenhum
+    seletor de maior prioridade estiver (verificados numa única consulta). Senão, segue a ordem de prioridade.
+    """
+    with _seletor_por_secao_lock:
+        preferido = _seletor_por_secao.get(secao) if secao else None
+    if preferido in selectors:
+        element = _primeiro(tree, _seletor_para_xpath(preferido))
+        anteriores = selectors[:selectors.index(preferido)]
+        if element is not None and (
+            not anteriores or _primeiro(tree, " | ".join(_seletor_para_xpath(s) for s in anteriores)) is None
+        ):
+            return preferido, element
+        metricas.contar("seletor_conteudo_fallbacks") # A dica da seção não era o seletor certo para esta página
+    for selector in selectors:
+        element = _primeiro(tree, _seletor_para_xpath(selector))
+        if element is not None:
+            return selector, element
+    return None, None
+
+
+def _memorizar_seletor(secao, seletor):
+    if secao and seletor in SELETORES_CACHEAVEIS:
+        with _seletor_por_secao_lock:
+            _seletor_por_secao[secao] = seletor
+
+
+def _primeiro(tree, xpath):
+    resultado = tree.xpath(xpath)
+    return resultado[0] if resultado else None
+
+
+def _texto(element):
+    """Texto do elemento com um bloco por linha e espaços normalizados (equivalente ao .text do Selenium)."""
+    for child in element.iter():
+        if isinstance(child.tag, str) and child.tag in TAGS_BLOCO:
+            child.tail = "\n" + (child.tail or "")
+    linhas = (_ESPACOS.sub(" ", linha).strip() for linha in element.text_content().split("\n"))
+    return "\n".join(linha for linha in linhas if linha)
+
+
+def parse_html(html, encoding="utf-8"):
+    """
+    Faz o parse único do HTML: str (driver.page_source) ou bytes (corpo bruto da resposta HTTP).
+    Para bytes, usa o encoding informado, já que o blog nem sempre declara o charset no HTML
+    (o cliente_http entrega os corpos das respostas em UTF-8, ver cliente_http.corpo_utf8).
+    """
+    if isinstance(html, bytes):
+        return lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding=encoding))
+    return lxml.html.document_fromstring(html)
+
+
+def extrair_titulo(tree):
+    title = _primeiro(tree, "//h1")
+    if title is not None:
+        return title.text_content().strip()
+    meta_title = _primeiro(tree, "//meta[@property='og:title']/@content")
+    if meta_title and meta_title.strip():
+        return meta_title.strip()
+    logger.warning("Título não encontrado para o post.")
+    return "Título Indisponível"
+
+
+def extrair_resumo_meta(tree):
+    meta_description = _primeiro(tree, "//meta[@name='description']/@content")
+    if meta_description and meta_description.strip():
+        return meta_description.strip()
+    logger.warning("Resumo (meta description) não encontrado para o post.")
+    return "Resumo Meta Indisponível"
+
+
+def normalizar_data(valor):
+    """Converte uma data ISO 8601 ou do texto do post em 'YYYY-MM-DD HH:MM:SS' (None se não for uma data válida)."""
+    if not isinstance(valor, str) or not valor.strip():
+        return None
+    valor = valor.strip()
+    try:
+        return isoparse(valor).strftime(FORMATO_DATA)
+    except (ValueError, OverflowError):
+        pass
+    match = PADRAO_DATA_TEXTO.search(valor)
+    return _data_do_match(match) if match else None
+
+
+def _data_do_match(match):
+    try:
+        if match.group('mes'):
+            data = datetime(int(match.group('ano')), MESES[match.group('mes').lower()], int(match.group('dia')))
+        elif match.group('iso'):
+            data = datetime.strptime(match.group('iso'), '%Y-%m-%d')
+        else:
+            data = datetime(int(match.group('ano_br')), int(match.group('mes_br')), int(match.group('dia_br')))
+    except ValueError:
+        return None # Ex.: 31/02/2023
+    return data.strftime(FORMATO_DATA)
+
+
+def _datas_jsonld(tree):
+    """datePublished dos blocos JSON-LD, como (é um artigo?, valor), em ordem (inclui itens de @graph)."""
+    for bloco in tree.xpath("//script[contains(@type, 'ld+json')]/text()"):
+        try:
+            pendentes = [json.loads(bloco)]
+        except ValueError:
+            logger.debug("Bloco JSON-LD inválido ignorado.")
+            continue
+        while pendentes:
+            item = pendentes.pop(0)
+            if isinstance(item, list):
+                pendentes[:0] = item
+            elif isinstance(item, dict):
+                if isinstance(item.get('datePublished'), str):
+                    tipos = item.get('@type')
+                    tipos = set(tipos) if isinstance(tipos, list) else {tipos}
+                    yield bool(tipos & TIPOS_ARTIGO_JSONLD), item['datePublished']
+                pendentes.extend(valor for valor in item.values() if isinstance(valor, (dict, list)))
+
+
+def extrair_data_publicacao(tree):
+    """
+    Data de publicação normalizada ('YYYY-MM-DD HH:MM:SS'). Ordem das fontes:
+    JSON-LD (datePublished de um Article/BlogPosting antes dos demais tipos), meta tags e
+    <time datetime>, e por último uma única varredura linear do texto visível com PADRAO_DATA_TEXTO.
+    """
+    datas_jsonld = sorted(_datas_jsonld(tree), key=lambda item: not item[0]) # sorted é estável
+    for valor in [valor for _, valor in datas_jsonld] + [v for xpath in XPATHS_DATA_PUBLICACAO for v in tree.xpath(xpath)]:
+        data = normalizar_data(valor)
+        if data:
+            return data
+        logger.warning(f"Formato de data de publicação inválido nos metadados: '{valor}'.")
+
+    with metricas.medir("extracao_data_fallback"):
+        # O texto de cada nó é lido uma vez só (sem reconstruir o texto de divs aninhadas)
+        texto = " ".join(tree.xpath(_XPATH_TEXTO_VISIVEL))
+        for match in PADRAO_DATA_TEXTO.finditer(texto):
+            data = _data_do_match(match)
+            if data:
+                logger.debug(f"Data encontrada no texto: {match.group(0)}")
+                return data
+
+    logger.warning("Data de publicação não encontrada ou formato não reconhecido para o post.")
+    return None
+
+
+def extrair_conteudo(tree, selectors=SELETORES_CONTEUDO, secao=None):
+    """
+    Extrai o texto do primeiro seletor de conteúdo encontrado (em ordem de prioridade), removendo
+    script, style, aside, figcaption e comentários.
+    Com secao, o seletor que funcionou na última página da mesma seção do blog é tentado
+    primeiro, sem passar na frente de um seletor de maior prioridade presente na página.
+    """
+    selector, element = _encontrar_conteudo(tree, selectors, secao)
+    if element is None:
+        logger.warning("Não foi possível encontrar um seletor de conteúdo principal no HTML.")
+        return None
+    _memorizar_seletor(secao, selector)
+    for undesirable_tag in element.xpath(_XPATH_INDESEJADOS):
+        undesirable_tag.drop_tree()
+    return _texto(element)
+
+
+def extrair_post(html, selectors=SELETORES_CONTEUDO, encoding="utf-8", url=None):
+    """
+    Motor de extração: um único parse do HTML e, a partir da mesma árvore,
+    título, resumo meta, data de publicação e conteúdo limpo.
+
+    Args:
+        html (str | bytes): driver.page_source ou o corpo bruto da resposta HTTP.
+        selectors (list): Seletores de conteúdo a tentar, em ordem.
+        encoding (str): Encoding usado quando html é bytes.
+        url (str): URL do post; a sua seção do blog escolhe o seletor a tentar primeiro.
+
+    Returns:
+        dict: Campos titulo, resumo_meta, data_publicacao e conteudo do post_data.
+    """
+    with metricas.medir("extracao_parse_html"):
+        tree = parse_html(html, encoding)
+    # Metadados primeiro: a limpeza do conteúdo altera a árvore.
+    titulo = extrair_titulo(tree)
+    resumo_meta = extrair_resumo_meta(tree)
+    data_publicacao = extrair_data_publicacao(tree)
+    with metricas.medir("extracao_conteudo"):
+        conteudo = extrair_conteudo(tree, selectors, secao_da_url(url))
+    return {
+        "titulo": titulo,
+        "resumo_meta": resumo_meta,
+        "data_publicacao": data_publicacao,
+        "conteudo": conteudo
+    }
@@ -1,12 +1,13 @@
-import pandas as pd
-import sys
-
 """
-Script para gerar o arquivo historico_urls_processadas.txt a partir de um Excel já processado.
+Script para carregar no estado do crawl (estado_crawl.sqlite) as URLs de um Excel já processado,
+marcando-as como processadas. Substitui a geração do antigo historico_urls_processadas.txt.
 Uso:
     python gera_historico_urls_do_excel.py seu_arquivo.xlsx [nome_coluna_url]
 Se não informar o nome da coluna, será usado 'url' por padrão.
 """
+import pandas as pd
+import sys
+import estado_crawl
 
 def main():
     if len(sys.argv) < 2:
@@ -18,11 +19,11 @@ def main():
     if col_url not in df.columns:
         print(f"Coluna '{col_url}' não encontrada no arquivo. Colunas disponíveis: {list(df.columns)}")
         return
-    urls = df[col_url].dropna().astype(str).unique()
-    with open('historico_urls_processadas.txt', 'w', encoding='utf-8') as f:
-        for url in urls:
-            f.write(url.strip() + '\n')
-    print(f"Arquivo 'historico_urls_processadas.txt' gerado com {len(urls)} URLs.")
+    urls = df[col_url].dropna().astype(str).str.strip().unique()
+    estado = estado_crawl.obter_estado()
+    importadas = estado.importar_urls(urls)
+    estado.fechar()
+    print(f"Estado do crawl '{estado.caminho}' atualizado: {importadas} de {len(urls)} URLs marcadas como processadas.")
 
 if __name__ == "__main__":
     main()
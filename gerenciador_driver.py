@@ -0,0 +1,218 @@
+"""
+Gerenciador do WebDriver de cada worker do pool.
+
+Em vez de reiniciar o Chrome a cada N URLs, acompanha a saúde do navegador e o recicla quando:
+- a memória (RSS) da árvore de processos do chromedriver/Chrome passa de LIMITE_RSS_DRIVER_MB;
+- a mediana do tempo de carregamento das últimas páginas passa de FATOR_LATENCIA vezes a mediana
+  das primeiras páginas do mesmo driver (o Chrome incha e fica lento em execuções longas);
+- ou, como teto de segurança, depois de MAX_PAGINAS_POR_DRIVER páginas.
+
+Um driver reserva é iniciado em segundo plano depois que o ativo carregou a sua primeira página (só
+workers que de fato caem no Selenium mantêm dois Chrome): a troca custa quase nada e o driver antigo
+é encerrado em segundo plano, sem bloquear o crawl. A reserva ocupa uma vaga de navegador como o ativo.
+A medição de memória usa o psutil, se estiver instalado; sem ele, valem só a latência e o teto de páginas.
+"""
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import metricas
+
+logger = logging.getLogger(__name__)
+
+LIMITE_RSS_DRIVER_MB = int(os.environ.get("BLOG99_LIMITE_RSS_DRIVER_MB", "1500"))
+FATOR_LATENCIA = 2.0
+LATENCIA_MIN_RECICLAR_S = 2.0 # Abaixo disso a lentidão relativa é ruído, não inchaço do navegador
+JANELA_LATENCIA = 20 # Páginas usadas na mediana de referência e na mediana recente
+VERIFICAR_RSS_A_CADA = 10 # Páginas entre duas leituras da memória (percorrer a árvore de processos custa)
+MAX_PAGINAS_POR_DRIVER = 1000
+MANTER_RESERVA = os.environ.get("BLOG99_DRIVER_RESERVA", "1") == "1"
+
+_psutil_ausente_avisado = False
+
+
+def rss_arvore_mb(driver):
+    """RSS (MB) do chromedriver e de todos os processos filhos (Chrome, renderers), ou None se não der para medir."""
+    global _psutil_ausente_avisado
+    try:
+        import psutil
+    except ImportError:
+        if not _psutil_ausente_avisado:
+            logger.warning("psutil não instalado: a reciclagem do driver usa só a latência e o teto de páginas.")
+            _psutil_ausente_avisado = True
+        return None
+    try:
+        processo = psutil.Process(driver.service.process.pid)
+        total = 0
+        for p in [processo, *processo.children(recursive=True)]:
+            try:
+                total += p.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total / (1024 * 1024)
+    except (AttributeError, psutil.Error):
+        return None # Driver sem processo local (ex.: remoto ou substituto do benchmark)
+
+
+def encerrar_driver(driver):
+    try:
+        if driver:
+            driver.quit()
+    except Exception:
+        pass
+
+
+class DriverMonitorado:
+    """Repassa tudo ao WebDriver real, cronometrando cada get() para o gerenciador."""
+
+    def __init__(self, driver, gerenciador):
+        self._driver = driver
+        self._gerenciador = gerenciador
+
+    def get(self, url):
+        inicio = time.perf_counter()
+        try:
+            return self._driver.get(url)
+        finally:
+            self._gerenciador._registrar_pagina(time.perf_counter() - inicio)
+
+    def __getattr__(self, nome):
+        return getattr(self._driver, nome)
+
+
+class GerenciadorDriver:
+    """
+    Driver ativo e reserva de um worker, com reciclagem por memória, latência e teto de páginas.
+    Nenhum navegador é aberto antes do primeiro obter(): workers que só usam o caminho HTTP não sobem o Chrome.
+    vagas (semáforo compartilhado entre os workers) limita quantos navegadores ficam abertos ao mesmo tempo.
+    """
+
+    def __init__(self, fabrica_driver, nome="driver", manter_reserva=MANTER_RESERVA, vagas=None):
+        self.fabrica_driver = fabrica_driver
+        self.nome = nome
+        self.manter_reserva = manter_reserva
+        self.vagas = vagas
+        self.indisponivel = False # A fábrica já falhou: o worker segue só pelo caminho HTTP
+        self._ativo = None
+        self._reserva = None
+        self._thread_reserva = None
+        self._latencias = deque(maxlen=JANELA_LATENCIA)
+        self._referencia_s = None
+        self._paginas = 0
+        self._motivo_reciclagem = None
+
+    # --- Ciclo de vida ---
+
+    def obter(self):
+        """
+        Driver pronto para uso (reciclado antes, se preciso), ou None se não foi possível criar um.
+        Depois de uma falha da fábrica, não tenta de novo e retorna sempre None.
+        """
+        if self._ativo is not None and self._motivo_reciclagem:
+            logger.info(f"[{self.nome}] Reciclando o WebDriver após {self._paginas} páginas: {self._motivo_reciclagem}.")
+            metricas.contar("driver_reinicios")
+            self.descartar()
+        if self._ativo is None:
+            if self.indisponivel:
+                return None
+            driver = self._pegar_reserva()
+            if driver is None:
+                self._ocupar_vaga()
+                with metricas.medir("driver_inicializacao"):
+                    driver = self.fabrica_driver()
+            if driver is None:
+                self._liberar_vaga()
+                self.indisponivel = True
+                logger.error(f"[{self.nome}] Não foi possível inicializar o WebDriver. Seguindo só pelo caminho HTTP.")
+                return None
+            self._ativo = DriverMonitorado(driver, self)
+            self._latencias.clear()
+            self._referencia_s = None
+            self._paginas = 0
+            self._motivo_reciclagem = None
+        return self._ativo
+
+    def descartar(self):
+        """Tira o driver ativo de uso (ex.: 'invalid session id'); o encerramento roda em segundo plano."""
+        if self._ativo is not None:
+            threading.Thread(target=self._encerrar_e_liberar, args=(self._ativo._driver,), daemon=True).start()
+            self._ativo = None
+
+    def encerrar(self):
+        if self._thread_reserva is not None:
+            self._thread_reserva.join()
+        if self._ativo is not None:
+            self._encerrar_e_liberar(self._ativo._driver)
+            self._ativo = None
+        if self._reserva is not None:
+            self._encerrar_e_liberar(self._reserva)
+            self._reserva = None
+
+    # --- Vagas de navegador ---
+
+    def _ocupar_vaga(self):
+        if self.vagas is not None and not self.vagas.acquire(blocking=False):
+            with metricas.medir("driver_espera_vaga"):
+                self.vagas.acquire() # Todos os navegadores permitidos estão abertos em outros workers
+
+    def _liberar_vaga(self):
+        if self.vagas is not None:
+            self.vagas.release()
+
+    def _encerrar_e_liberar(self, driver):
+        encerrar_driver(driver)
+        self._liberar_vaga()
+
+    # --- Reserva ---
+
+    def _preparar_reserva(self):
+        if not self.manter_reserva or self._reserva is not None or self._thread_reserva is not None:
+            return
+        if self.vagas is not None and not self.vagas.acquire(blocking=False):
+            return # A reserva também ocupa uma vaga de navegador; sem vaga livre, fica sem reserva
+
+        def iniciar():
+            with metricas.medir("driver_inicializacao_reserva"):
+                self._reserva = self.fabrica_driver()
+            if self._reserva is None:
+                self._liberar_vaga()
+
+        self._thread_reserva = threading.Thread(target=iniciar, name=f"{self.nome}-reserva", daemon=True)
+        self._thread_reserva.start()
+
+    def _pegar_reserva(self):
+        if self._thread_reserva is not None:
+            with metricas.medir("driver_espera_reserva"):
+                self._thread_reserva.join() # Normalmente já terminou: a reserva sobe enquanto o ativo trabalha
+            self._thread_reserva = None
+        driver, self._reserva = self._reserva, None
+        if driver is not None:
+            metricas.contar("driver_trocas_reserva")
+        return driver
+
+    # --- Saúde ---
+
+    def _registrar_pagina(self, latencia_s):
+        self._paginas += 1
+        if self._paginas == 1:
+            self._preparar_reserva() # O worker usa o Selenium: vale ter a próxima instância pronta
+        self._latencias.append(latencia_s)
+        if self._referencia_s is None and len(self._latencias) == JANELA_LATENCIA:
+            self._referencia_s = statistics.median(self._latencias)
+        self._motivo_reciclagem = self._avaliar_saude()
+
+    def _avaliar_saude(self):
+        if self._paginas >= MAX_PAGINAS_POR_DRIVER:
+            return f"teto de {MAX_PAGINAS_POR_DRIVER} páginas"
+        if self._referencia_s is not None and len(self._latencias) == JANELA_LATENCIA:
+            recente = statistics.median(self._latencias)
+            if recente >= LATENCIA_MIN_RECICLAR_S and recente > FATOR_LATENCIA * self._referencia_s:
+                return f"latência mediana {recente:.2f}s contra {self._referencia_s:.2f}s no início"
+        if self._paginas % VERIFICAR_RSS_A_CADA == 0:
+            rss = rss_arvore_mb(self._ativo._driver)
+            if rss is not None and rss > LIMITE_RSS_DRIVER_MB:
+                return f"memória de {rss:.0f} MB acima de {LIMITE_RSS_DRIVER_MB} MB"
+        return None
@@ -0,0 +1,219 @@
+"""
+Índice TF-IDF do corpus inteiro: o vetorizador é ajustado uma única vez e a matriz esparsa
+de documentos fica em disco. Consultas de posts similares e de pares acima de um limiar
+são produtos de matrizes esparsas, em vez de um TfidfVectorizer novo por par de textos.
+Uso:
+    python indice_tfidf.py [limiar]
+Gera relatorio_similaridade.xlsx, a partir da base mestre, com os pares de posts parecidos e os
+posts relacionados de cada URL.
+"""
+import glob
+import json
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_INDICE = "indice_tfidf"
+CAMPOS_INDICE = ['titulo', 'resumo_meta', 'conteudo'] # Usa '<campo>_processado' (lematizado) quando existir
+FRACAO_MAX_SEM_REAJUSTE = 0.2 # Acima desta fração de posts novos desde o último ajuste, o IDF fica defasado
+TAMANHO_BLOCO_PARES = 1000 # Linhas por bloco no cálculo de pares, limita a memória do produto M @ M.T
+LIMIAR_SIMILARIDADE = 0.5
+TOP_K_RELACIONADOS = 3
+PARAMETROS_VETORIZADOR = dict(strip_accents='unicode', lowercase=True, sublinear_tf=True)
+
+
+def textos_do_dataframe(df, campos=None):
+    """Concatena os campos de texto de cada linha, preferindo a versão lematizada ('<campo>_processado')."""
+    colunas = []
+    for campo in campos or CAMPOS_INDICE:
+        if f"{campo}_processado" in df.columns:
+            colunas.append(f"{campo}_processado")
+        elif campo in df.columns:
+            colunas.append(campo)
+    return [
+        " ".join(valor for valor in valores if isinstance(valor, str))
+        for valores in zip(*(df[coluna].tolist() for coluna in colunas))
+    ] if colunas else [""] * len(df)
+
+
+class IndiceTFIDF:
+    """
+    Matriz TF-IDF (linhas normalizadas, L2) de todos os posts, indexada por URL e persistida em disco.
+
+    Posts novos ou editados entram com adicionar(), usando o vocabulário e o IDF já ajustados,
+    sem reajustar o corpus. Quando os posts adicionados passam de FRACAO_MAX_SEM_REAJUSTE do
+    corpus original, precisa_reajustar() passa a indicar que vale reconstruir o índice.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_INDICE):
+        self.diretorio = diretorio
+        self.vetorizador = None
+        self.matriz = None
+        self.urls = []
+        self.docs_no_ajuste = 0
+        self._posicao = {}
+        if os.path.exists(self._caminho("metadados.json")):
+            self._carregar()
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def __len__(self):
+        return len(self.urls)
+
+    # --- Construção ---
+
+    def construir(self, urls, textos):
+        """Ajusta o vetorizador sobre o corpus inteiro e substitui o índice."""
+        urls, textos = self._sem_duplicadas(urls, textos)
+        self.vetorizador = TfidfVectorizer(**PARAMETROS_VETORIZADOR)
+        self.matriz = self.vetorizador.fit_transform(textos).tocsr()
+        self.urls = urls
+        self.docs_no_ajuste = len(urls)
+        self._reindexar()
+        self.salvar()
+        logger.info(f"✅ Índice TF-IDF construído: {len(urls)} posts, {len(self.vetorizador.vocabulary_)} termos.")
+
+    def adicionar(self, urls, textos):
+        """Inclui posts novos ou substitui posts editados, sem reajustar o vocabulário nem o IDF."""
+        if self.vetorizador is None:
+            return self.construir(urls, textos)
+        urls, textos = self._sem_duplicadas(urls, textos)
+        if not urls:
+            return
+        novas_linhas = self.vetorizador.transform(textos).tocsr()
+        substituidas = {url for url in urls if url in self._posicao}
+        manter = [i for i, url in enumerate(self.urls) if url not in substituidas]
+        self.matriz = sparse.vstack([self.matriz[manter], novas_linhas], format="csr")
+        self.urls = [self.urls[i] for i in manter] + urls
+        self._reindexar()
+        self.salvar()
+        logger.info(f"Índice TF-IDF: {len(urls) - len(substituidas)} posts adicionados, {len(substituidas)} atualizados.")
+        if self.precisa_reajustar():
+            logger.warning("Muitos posts adicionados desde o último ajuste do TF-IDF. Considere reconstruir o índice.")
+
+    def precisa_reajustar(self):
+        return len(self.urls) - self.docs_no_ajuste > FRACAO_MAX_SEM_REAJUSTE * max(self.docs_no_ajuste, 1)
+
+    @staticmethod
+    def _sem_duplicadas(urls, textos):
+        # Mantém a última ocorrência de cada URL
+        por_url = dict(zip(urls, textos))
+        return list(por_url), [texto or "" for texto in por_url.values()]
+
+    def _reindexar(self):
+        self._posicao = {url: i for i, url in enumerate(self.urls)}
+
+    # --- Consultas ---
+
+    def similares(self, url, k=TOP_K_RELACIONADOS):
+        """Os k posts mais parecidos com a URL indexada, como [(url, similaridade)], do mais ao menos parecido."""
+        i = self._posicao.get(url)
+        if i is None:
+            return []
+        return self._top_k(self.matriz[i], k, excluir=i)
+
+    def similares_ao_texto(self, texto, k=TOP_K_RELACIONADOS):
+        """Os k posts mais parecidos com um texto qualquer (não precisa estar no índice)."""
+        if self.vetorizador is None:
+            return []
+        return self._top_k(self.vetorizador.transform([texto or ""]), k)
+
+    def _top_k(self, vetor, k, excluir=None):
+        pontuacoes = (self.matriz @ vetor.T).toarray().ravel()
+        if excluir is not None:
+            pontuacoes[excluir] = -1.0
+        k = min(k, len(pontuacoes) - (excluir is not None))
+        if k <= 0:
+            return []
+        melhores = np.argpartition(-pontuacoes, k - 1)[:k]
+        melhores = melhores[np.argsort(-pontuacoes[melhores])]
+        return [(self.urls[j], float(pontuacoes[j])) for j in melhores if pontuacoes[j] > 0]
+
+    def pares_acima_de(self, limiar=LIMIAR_SIMILARIDADE):
+        """
+        Todos os pares de posts com similaridade de cosseno >= limiar, como [(url_a, url_b, similaridade)].
+        O produto M @ M.T é calculado em blocos de linhas, guardando só o triângulo superior.
+        """
+        pares = []
+        if self.matriz is None:
+            return pares
+        transposta = self.matriz.T.tocsc()
+        for inicio in range(0, self.matriz.shape[0], TAMANHO_BLOCO_PARES):
+            bloco = sparse.triu(self.matriz[inicio:inicio + TAMANHO_BLOCO_PARES] @ transposta, k=1 + inicio).tocoo()
+            for i, j, valor in zip(bloco.row, bloco.col, bloco.data):
+                if valor >= limiar:
+                    pares.append((self.urls[inicio + i], self.urls[j], float(valor)))
+        pares.sort(key=lambda par: par[2], reverse=True)
+        return pares
+
+    # --- Persistência ---
+
+    def salvar(self):
+        """
+        Grava o vetorizador e a matriz em arquivos novos, com a versão no nome, e só então troca os
+        metadados, que apontam para a versão. A troca dos metadados (os.replace) é o único ponto de
+        commit: um crash no meio deixa o índice anterior inteiro, nunca arquivos de versões misturadas.
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        versao = str(time.time_ns())
+        joblib.dump(self.vetorizador, self._caminho(f"vetorizador-{versao}.joblib"))
+        with open(self._caminho(f"matriz-{versao}.npz"), "wb") as f:
+            sparse.save_npz(f, self.matriz)
+        with open(self._caminho("metadados.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"versao": versao, "urls": self.urls, "docs_no_ajuste": self.docs_no_ajuste}, f, ensure_ascii=False)
+        os.replace(self._caminho("metadados.json.tmp"), self._caminho("metadados.json"))
+        # Versões anteriores (e restos de gravações interrompidas) já não são referenciadas
+        for caminho in glob.glob(self._caminho("vetorizador-*.joblib")) + glob.glob(self._caminho("matriz-*.npz")):
+            if versao not in os.path.basename(caminho):
+                os.remove(caminho)
+
+    def _carregar(self):
+        with open(self._caminho("metadados.json"), "r", encoding="utf-8") as f:
+            metadados = json.load(f)
+        sufixo = f"-{metadados['versao']}" if "versao" in metadados else "" # Índices gravados sem versão
+        self.vetorizador = joblib.load(self._caminho(f"vetorizador{sufixo}.joblib"))
+        self.matriz = sparse.load_npz(self._caminho(f"matriz{sufixo}.npz")).tocsr()
+        self.urls = metadados["urls"]
+        self.docs_no_ajuste = metadados["docs_no_ajuste"]
+        self._reindexar()
+
+
+def gerar_relatorio_similaridade(limiar=LIMIAR_SIMILARIDADE, nome_saida="relatorio_similaridade.xlsx"):
+    """
+    Reconstrói o índice a partir da base mestre (o Excel não traz o conteúdo dos posts) e exporta
+    pares similares e posts relacionados.
+    """
+    import base_mestre
+
+    df = base_mestre.BaseMestre().ler(colunas=['url', *CAMPOS_INDICE])
+    if df.empty:
+        logger.warning("Base mestre vazia. Nada para comparar.")
+        return None
+    indice = IndiceTFIDF()
+    indice.construir(df['url'].tolist(), textos_do_dataframe(df))
+
+    df_pares = pd.DataFrame(indice.pares_acima_de(limiar), columns=['url_a', 'url_b', 'similaridade'])
+    df_relacionados = pd.DataFrame(
+        [(url, relacionada, similaridade) for url in indice.urls for relacionada, similaridade in indice.similares(url)],
+        columns=['url', 'url_relacionada', 'similaridade']
+    )
+    with pd.ExcelWriter(nome_saida, engine='xlsxwriter') as writer:
+        df_pares.to_excel(writer, sheet_name='Pares Similares', index=False)
+        df_relacionados.to_excel(writer, sheet_name='Posts Relacionados', index=False)
+    logger.info(f"✅ Relatório de similaridade exportado: '{nome_saida}' ({len(df_pares)} pares com similaridade >= {limiar}).")
+    return nome_saida
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    gerar_relatorio_similaridade(float(sys.argv[1]) if len(sys.argv) > 1 else LIMIAR_SIMILARIDADE)
@@ -1,15 +1,19 @@
 import crawler
-import pandas as pd
-import xlsxwriter 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.common.exceptions import WebDriverException, SessionNotCreatedException
 from datetime import datetime
 import logging
 import os
-import nlp_utils
+import pool_workers
+import estado_crawl
+import base_mestre
+import metricas
+import navegador
+import persistencia
 import glob
 
+# A base mestre é a fonte de dados; o Excel é gerado sob demanda com 'python base_mestre.py'.
+# BLOG99_GERAR_EXCEL=1 volta a regenerar o blog99_resultado.xlsx ao fim de cada execução.
+GERAR_EXCEL = os.environ.get("BLOG99_GERAR_EXCEL", "0") == "1"
+
 # --- CONFIGURAÇÃO DE LOGGING MANUAL E EXPLÍCITA ---
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -28,38 +32,6 @@ file_handler = logging.FileHandler(log_filename, encoding='utf-8')
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 
-def inicializar_driver():
-    """
-    Inicializa uma nova instância do ChromeDriver com opções para melhorar a estabilidade,
-    usando um ChromeDriver baixado manualmente de um caminho específico.
-    """
-    try:
-        driver_folder_path = r"C:\Users\SarahOgbonna\OneDrive - Ogilvy\Documents\Blog_99_Automacao\chromedriver-win64"
-        driver_executable_path = os.path.join(driver_folder_path, "chromedriver.exe")
-        
-        service = ChromeService(driver_executable_path) 
-
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--log-level=3')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--ignore-certificate-errors')
-        options.add_argument('--allow-running-insecure-content')
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36')
-
-        driver = webdriver.Chrome(service=service, options=options)
-        logger.info("✅ ChromeDriver inicializado com sucesso (modo headless com opções de estabilidade).")
-        return driver
-    except SessionNotCreatedException as e:
-        logger.error(f"❌ Erro ao iniciar o ChromeDriver: {e}. Verifique a compatibilidade do Chrome e ChromeDriver ou o caminho especificado.")
-        return None
-    except Exception as e:
-        logger.error(f"❌ Erro inesperado ao inicializar o ChromeDriver: {e}")
-        return None
-
 def gerenciar_arquivos_log():
     """
     Remove arquivos de log antigos, mantendo apenas os 3 mais recentes.
@@ -85,112 +57,99 @@ def main():
         logger.info("Iniciando o pipeline de extração e análise de blog posts.")
         logger.info("=========================================================")
 
-        logger.info("Etapa 1: Baixando URLs do sitemap do blog...")
-        urls = crawler.baixar_sitemap_filtrado()
-
-        historico_path = "historico_urls_processadas.txt"
-        urls_processadas = set()
-        if os.path.exists(historico_path):
-            with open(historico_path, "r", encoding="utf-8") as f:
-                urls_processadas = set(line.strip() for line in f if line.strip())
-            logger.info(f"Histórico carregado: {len(urls_processadas)} URLs já processadas.")
-        else:
-            logger.info("Nenhum histórico anterior encontrado. Processando todas as URLs.")
-
-        urls_novas = [u for u in urls if u not in urls_processadas]
-        logger.info(f"Total de URLs novas a processar: {len(urls_novas)} (de {len(urls)})")
-
-        if not urls_novas:
-            logger.info("Nenhuma URL nova para processar. Pipeline encerrado.")
+        logger.info("Etapa 1: Carregando o estado do crawl...")
+        estado = estado_crawl.obter_estado()
+        estado.importar_historico_txt() # Migração única do historico_urls_processadas.txt, se existir
+        situacoes = estado.situacoes()
+        lastmods_salvos = estado.lastmods()
+        logger.info(f"Estado carregado: {sum(1 for st, _ in situacoes.values() if st == estado_crawl.STATUS_OK)} URLs já processadas.")
+
+        urls_lastmod = {}
+        urls_novas = []
+        urls_alteradas = set()
+        urls_retentativa = []
+        lastmods_referencia = {}
+
+        def urls_a_processar():
+            """
+            Lê o sitemap em streaming e entrega ao pool, assim que encontrada, cada URL
+            nova, alterada (lastmod do sitemap diferente do salvo) ou na fila de retentativa
+            (erro ou só placeholders, com tentativas disponíveis).
+            """
+            for url, lastmod in crawler.iterar_sitemap_filtrado():
+                urls_lastmod[url] = lastmod
+                status, tentativas = situacoes.get(url, (estado_crawl.STATUS_PENDENTE, 0))
+                if status == estado_crawl.STATUS_PENDENTE:
+                    urls_novas.append(url)
+                    yield url
+                elif status != estado_crawl.STATUS_OK:
+                    if tentativas < estado_crawl.MAX_TENTATIVAS:
+                        if lastmod and lastmods_salvos.get(url) and lastmods_salvos[url] != lastmod:
+                            # Revalidação que falhou antes: a base ainda tem a versão anterior do post
+                            urls_alteradas.add(url)
+                        else:
+                            urls_retentativa.append(url)
+                        yield url
+                elif lastmod and lastmods_salvos.get(url) and lastmods_salvos[url] != lastmod:
+                    urls_alteradas.add(url)
+                    yield url
+                elif lastmod and url not in lastmods_salvos:
+                    # Post processado antes do controle de lastmod: registra o lastmod atual como referência
+                    lastmods_referencia[url] = lastmod
+            # Retentativas de URLs que não estão (mais) no sitemap
+            for url in estado.fila_retentativa():
+                if url not in urls_lastmod:
+                    urls_retentativa.append(url)
+                    yield url
+
+        nome_arquivo = "blog99_resultado.xlsx"
+        base = base_mestre.BaseMestre()
+        if base.vazia() and os.path.exists(nome_arquivo):
+            # Migração única: o Excel das versões anteriores vira o ponto de partida da base
+            base.importar_excel(nome_arquivo)
+        persistir_lote = persistencia.PersistenciaLotes(base, estado, lastmods=urls_lastmod, urls_revalidar=urls_alteradas)
+
+        logger.info("Etapa 2: Baixando URLs do sitemap, extraindo conteúdo e aplicando NLP em micro-lotes...")
+        pool_workers.processar_urls_em_paralelo(
+            urls_a_processar(),
+            fabrica_driver=navegador.inicializar_driver,
+            estado=estado,
+            urls_revalidar=urls_alteradas,
+            persistir_lote=persistir_lote
+        )
+        total_a_processar = len(urls_novas) + len(urls_alteradas) + len(urls_retentativa)
+        logger.info(
+            f"Total de URLs novas: {len(urls_novas)} | alteradas desde a última extração: {len(urls_alteradas)} "
+            f"| retentativas: {len(urls_retentativa)} (de {len(urls_lastmod)} no sitemap)"
+        )
+        logger.info(f"Extração concluída: {persistir_lote.posts_gravados} de {total_a_processar} URLs com dados gravados na base.")
+        estado.registrar_lastmods(lastmods_referencia)
+
+        if not total_a_processar:
+            logger.info("Nenhuma URL nova ou alterada para processar. Pipeline encerrado.")
             return
 
-        all_posts_data = []
-        driver = None
-        urls_processed_since_last_restart = 0
-        RESTART_DRIVER_AFTER_N_URLS = 150
-
-        logger.info("Etapa 2: Extraindo conteúdo dos blog posts...")
-        import time
-        for i, url in enumerate(urls_novas):
-            if driver is None or urls_processed_since_last_restart >= RESTART_DRIVER_AFTER_N_URLS:
-                if driver:
-                    driver.quit()
-                    logger.info(f"WebDriver encerrado após {urls_processed_since_last_restart} URLs. Reiniciando...")
-                driver = inicializar_driver()
-                if driver is None:
-                    logger.error("Não foi possível inicializar o WebDriver. Pulando as URLs restantes.")
-                    break
-                urls_processed_since_last_restart = 0
-            
-            start_time = time.time()
-            try:
-                post_data = crawler.extrair_conteudo_da_url(url, driver)
-                elapsed = time.time() - start_time
-                logger.info(f"URL {i+1}/{len(urls_novas)}: {url} processada em {elapsed:.2f} segundos.")
-                if post_data:
-                    all_posts_data.append(post_data)
-                    with open(historico_path, "a", encoding="utf-8") as f:
-                        f.write(url + "\n")
-                urls_processed_since_last_restart += 1
-            except WebDriverException as e:
-                elapsed = time.time() - start_time
-                logger.error(f"❌ Erro do WebDriver para {url} após {elapsed:.2f} segundos. Detalhes: {e}. Tentando reiniciar o driver imediatamente.")
-                if driver:
-                    driver.quit()
-                driver = None
-                urls_processed_since_last_restart = 0
-                continue
-        
-        if driver:
-            driver.quit()
-
-        logger.info("Etapa 3: Pós-processamento e exportação (aplicando a lógica de NLP)...")
-        if all_posts_data:
-            df_coleta = pd.DataFrame(all_posts_data)
-            
-            df_processado = nlp_utils.run_nlp_pipeline(df_coleta)
-            df_processado['topic_cluster'] = df_processado['topic_clusters'].apply(lambda x: ', '.join(x) if x else 'Sem Cluster')
-            
-            colunas_finais = [
-                'data_captura', 'data_publicacao', 'url', 'categoria', 'titulo',
-                'resumo_meta', 'topic_cluster'
-            ]
-            df_novos_dados = df_processado[colunas_finais].copy()
-
-            nome_arquivo = "blog99_resultado.xlsx"
-            
+        if not persistir_lote.posts_gravados:
+            logger.warning("Nenhum dado de post foi coletado para exportação.")
+        elif GERAR_EXCEL:
+            logger.info("Etapa 3: Exportação do Excel a partir da base mestre...")
             try:
-                dict_abas = {}
-                if os.path.exists(nome_arquivo):
-                    logger.info(f"Arquivo '{nome_arquivo}' encontrado. Lendo abas existentes...")
-                    dict_abas = pd.read_excel(nome_arquivo, sheet_name=None)
-                    logger.info(f"Abas existentes: {list(dict_abas.keys())}")
-                
-                df_aba_dados = pd.concat([dict_abas.get('Dados Brutos', pd.DataFrame()), df_novos_dados], ignore_index=True)
-                dict_abas['Dados Brutos'] = df_aba_dados.drop_duplicates(subset=['url'])
-                
-                df_99pay_novos = df_novos_dados[df_novos_dados['url'].str.contains('/blog/99pay', case=False, na=False)]
-                df_aba_99pay = pd.concat([dict_abas.get('99Pay', pd.DataFrame()), df_99pay_novos], ignore_index=True)
-                dict_abas['99Pay'] = df_aba_99pay.drop_duplicates(subset=['url'])
-
-                df_motorista_novos = df_novos_dados[df_novos_dados['url'].str.contains('/blog/motorista|/blog/passageiro|/blog/99Moto', case=False, na=False)]
-                df_aba_motorista = pd.concat([dict_abas.get('Motorista', pd.DataFrame()), df_motorista_novos], ignore_index=True)
-                dict_abas['Motorista'] = df_aba_motorista.drop_duplicates(subset=['url'])
-                
-                with pd.ExcelWriter(nome_arquivo, engine='xlsxwriter') as writer:
-                    for sheet_name, df_sheet in dict_abas.items():
-                        df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
-                        logger.info(f"✅ Dados exportados para a aba '{sheet_name}'.")
-
+                base.gerar_excel(nome_base=nome_arquivo.replace('.xlsx', ''))
             except Exception as e:
-                logger.error(f"❌ Falha ao exportar dados para Excel: {e}")
+                logger.error(f"❌ Falha ao exportar dados: {e}")
         else:
-            logger.warning("Nenhum dado de post foi coletado para exportação.")
+            logger.info("Dados gravados na base mestre. Rode 'python base_mestre.py' para gerar o Excel a partir dela.")
 
         logger.info("=========================================================")
         logger.info("Pipeline concluído.")
         logger.info("=========================================================")
     finally:
+        # Resumo de latência por etapa (p50/p95/p99) em JSON e no formato do Prometheus
+        try:
+            metricas.exportar()
+        except OSError as e:
+            logger.error(f"❌ Falha ao exportar métricas: {e}")
+
         # Encerra os handlers para garantir que o arquivo de log seja salvo
         for handler in logger.handlers:
             handler.close()
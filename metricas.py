@@ -0,0 +1,138 @@
+"""
+Métricas de latência por etapa do pipeline (tempo de driver.get, espera do body, parse,
+fallbacks, reinícios do driver, NLP, exportação...) e contadores de eventos.
+
+Ao fim de cada execução, exportar() grava um resumo JSON com p50/p95/p99 por etapa e um
+textfile no formato do Prometheus (para o textfile collector do node_exporter).
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_JSON = "metricas_execucao.json"
+ARQUIVO_PROMETHEUS = "metricas_blog99.prom"
+PREFIXO_PROMETHEUS = "blog99"
+QUANTIS = (0.5, 0.95, 0.99)
+MAX_AMOSTRAS_POR_ETAPA = 100_000 # Acima disso, as amostras mais antigas são descartadas
+
+
+def _quantil(ordenadas, q):
+    """Quantil por interpolação linear entre as amostras ordenadas."""
+    if not ordenadas:
+        return None
+    posicao = (len(ordenadas) - 1) * q
+    inferior, superior = math.floor(posicao), math.ceil(posicao)
+    return ordenadas[inferior] + (ordenadas[superior] - ordenadas[inferior]) * (posicao - inferior)
+
+
+class Metricas:
+    """Coletor de durações e contadores, seguro para uso a partir de várias threads (workers do pool)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._duracoes = {}
+            self._contadores = {}
+            self._inicio = datetime.now()
+
+    def registrar_duracao(self, etapa, segundos):
+        with self._lock:
+            amostras = self._duracoes.setdefault(etapa, [])
+            amostras.append(segundos)
+            if len(amostras) > MAX_AMOSTRAS_POR_ETAPA:
+                del amostras[:len(amostras) - MAX_AMOSTRAS_POR_ETAPA]
+
+    def contar(self, nome, quantidade=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + quantidade
+
+    @contextmanager
+    def medir(self, etapa):
+        """Mede o bloco como uma amostra da etapa (mesmo que ele termine com exceção)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_duracao(etapa, time.perf_counter() - inicio)
+
+    def resumo(self):
+        """Dicionário com, por etapa, quantidade, soma, máximo e quantis (em segundos), e os contadores."""
+        with self._lock:
+            duracoes = {etapa: sorted(amostras) for etapa, amostras in self._duracoes.items()}
+            contadores = dict(self._contadores)
+            inicio = self._inicio
+        etapas = {}
+        for etapa, ordenadas in sorted(duracoes.items()):
+            etapas[etapa] = {
+                "quantidade": len(ordenadas),
+                "soma_s": round(sum(ordenadas), 6),
+                "max_s": round(ordenadas[-1], 6),
+                **{f"p{int(q * 100)}_s": round(_quantil(ordenadas, q), 6) for q in QUANTIS},
+            }
+        return {
+            "inicio": inicio.strftime('%Y-%m-%d %H:%M:%S'),
+            "fim": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "etapas": etapas,
+            "contadores": dict(sorted(contadores.items())),
+        }
+
+    def formato_prometheus(self, resumo=None):
+        """Resumo no formato de exposição de texto do Prometheus (summary por etapa e counters)."""
+        resumo = resumo or self.resumo()
+        linhas = [
+            f"# HELP {PREFIXO_PROMETHEUS}_etapa_segundos Duração de cada etapa do pipeline.",
+            f"# TYPE {PREFIXO_PROMETHEUS}_etapa_segundos summary",
+        ]
+        for etapa, dados in resumo["etapas"].items():
+            rotulo = f'etapa="{etapa}"'
+            for q in QUANTIS:
+                linhas.append(f'{PREFIXO_PROMETHEUS}_etapa_segundos{{{rotulo},quantile="{q}"}} {dados[f"p{int(q * 100)}_s"]}')
+            linhas.append(f"{PREFIXO_PROMETHEUS}_etapa_segundos_sum{{{rotulo}}} {dados['soma_s']}")
+            linhas.append(f"{PREFIXO_PROMETHEUS}_etapa_segundos_count{{{rotulo}}} {dados['quantidade']}")
+        for nome, valor in resumo["contadores"].items():
+            metrica = f"{PREFIXO_PROMETHEUS}_{re.sub(r'[^a-zA-Z0-9_]', '_', nome)}_total"
+            linhas.append(f"# TYPE {metrica} counter")
+            linhas.append(f"{metrica} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, arquivo_json=ARQUIVO_JSON, arquivo_prometheus=ARQUIVO_PROMETHEUS):
+        """Grava o resumo JSON e o textfile do Prometheus (escrita atômica: o coletor nunca lê um arquivo pela metade)."""
+        resumo = self.resumo()
+        for caminho, conteudo in (
+            (arquivo_json, json.dumps(resumo, ensure_ascii=False, indent=2)),
+            (arquivo_prometheus, self.formato_prometheus(resumo)),
+        ):
+            if not caminho:
+                continue
+            with open(f"{caminho}.tmp", "w", encoding="utf-8") as f:
+                f.write(conteudo)
+            os.replace(f"{caminho}.tmp", caminho)
+        lentas = sorted(resumo["etapas"].items(), key=lambda item: item[1]["soma_s"], reverse=True)[:5]
+        for etapa, dados in lentas:
+            logger.info(
+                f"📌 Etapa '{etapa}': {dados['quantidade']}x, total {dados['soma_s']:.1f}s, "
+                f"p50 {dados['p50_s']:.3f}s, p95 {dados['p95_s']:.3f}s, p99 {dados['p99_s']:.3f}s"
+            )
+        logger.info(f"✅ Métricas exportadas: '{arquivo_json}' e '{arquivo_prometheus}'.")
+        return resumo
+
+
+# Coletor compartilhado por todos os módulos do pipeline
+_metricas = Metricas()
+medir = _metricas.medir
+contar = _metricas.contar
+registrar_duracao = _metricas.registrar_duracao
+resumo = _metricas.resumo
+exportar = _metricas.exportar
+reiniciar = _metricas.reiniciar
@@ -0,0 +1,97 @@
+"""
+Registro de modelos de NLP carregados sob demanda.
+
+Nenhum modelo (nem a biblioteca dele) é importado enquanto não for usado: importar
+nlp_utils ou rodar scripts que só clusterizam por palavras-chave não paga o custo
+de carregar spaCy ou sentence-transformers. Cada modelo é carregado uma única vez
+por processo e compartilhado entre as threads.
+
+Por padrão nada é baixado da internet: se o modelo não estiver instalado, o erro
+explica como instalá-lo. Defina BLOG99_PERMITIR_DOWNLOAD=1 para baixar automaticamente.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+MODELO_SPACY = os.environ.get("BLOG99_MODELO_SPACY", "pt_core_news_sm")
+MODELO_EMBEDDINGS = os.environ.get("BLOG99_MODELO_EMBEDDINGS", "paraphrase-multilingual-MiniLM-L12-v2")
+PERMITIR_DOWNLOAD = os.environ.get("BLOG99_PERMITIR_DOWNLOAD", "0") == "1"
+
+
+class ModeloIndisponivelError(RuntimeError):
+    """O modelo não está instalado localmente e o download automático está desativado."""
+
+
+_modelos = {}
+_lock = threading.Lock()
+
+
+def _carregar_spacy(nome):
+    import spacy
+    try:
+        return spacy.load(nome)
+    except OSError:
+        if not PERMITIR_DOWNLOAD:
+            raise ModeloIndisponivelError(
+                f"Modelo spaCy '{nome}' não encontrado. Instale com 'python -m spacy download {nome}' "
+                f"ou defina BLOG99_PERMITIR_DOWNLOAD=1."
+            )
+        logger.warning(f"❌ Modelo spaCy '{nome}' não encontrado. Baixando agora...")
+        spacy.cli.download(nome)
+        return spacy.load(nome)
+
+
+def _carregar_sentence_transformer(nome):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ModeloIndisponivelError(
+            f"Pacote sentence-transformers não instalado ({e}). Instale com 'pip install sentence-transformers'."
+        ) from e
+    try:
+        # Sem download permitido, usa só o que já está no cache local do Hugging Face
+        return SentenceTransformer(nome, local_files_only=not PERMITIR_DOWNLOAD)
+    except OSError as e:
+        raise ModeloIndisponivelError(
+            f"Modelo sentence-transformers '{nome}' não encontrado localmente ({e}). "
+            f"Defina BLOG99_PERMITIR_DOWNLOAD=1 para baixá-lo."
+        )
+
+
+_CARREGADORES = {
+    "spacy": _carregar_spacy,
+    "sentence_transformers": _carregar_sentence_transformer,
+}
+
+
+def obter_modelo(tipo, nome):
+    """
+    Retorna o modelo do tipo ('spacy' ou 'sentence_transformers') e nome, carregando-o no primeiro uso.
+
+    Raises:
+        ModeloIndisponivelError: Se o modelo não estiver instalado e o download estiver desativado.
+    """
+    chave = (tipo, nome)
+    modelo = _modelos.get(chave)
+    if modelo is not None:
+        return modelo
+    with _lock:
+        if chave not in _modelos:
+            _modelos[chave] = _CARREGADORES[tipo](nome)
+            logger.info(f"✅ Modelo {tipo} '{nome}' carregado com sucesso.")
+        return _modelos[chave]
+
+
+def obter_spacy(nome=None):
+    return obter_modelo("spacy", nome or MODELO_SPACY)
+
+
+def obter_sentence_transformer(nome=None):
+    return obter_modelo("sentence_transformers", nome or MODELO_EMBEDDINGS)
+
+
+def modelos_carregados():
+    """Lista (tipo, nome) dos modelos já carregados neste processo."""
+    return list(_modelos)
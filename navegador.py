@@ -0,0 +1,145 @@
+"""
+Perfil único e enxuto do Chrome headless usado por todos os scripts (main.py, reextrai_urls_com_erro.py
+e crawler.reiniciar_driver_com_delay).
+
+- page_load_strategy 'eager': driver.get volta no DOMContentLoaded, sem esperar imagens, fontes e iframes.
+- Bloqueio via DevTools (Network.setBlockedURLs) de imagens, fontes, CSS, mídia e domínios de
+  terceiros (analytics, anúncios, pixels, embeds). O conteúdo do post vem do page_source, nada disso é lido.
+- Log de desempenho do Chrome ligado para medir os bytes transferidos por página (bytes_transferidos).
+
+A lista de bloqueio é configurável: BLOG99_BLOQUEIOS_EXTRAS acrescenta padrões (separados por vírgula)
+e BLOG99_NAVEGADOR_ENXUTO=0 volta ao carregamento completo das páginas.
+"""
+import json
+import logging
+import os
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.common.exceptions import SessionNotCreatedException
+
+import cliente_http
+import metricas
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_CHROMEDRIVER = os.environ.get(
+    "BLOG99_CHROMEDRIVER",
+    r"C:\Users\SarahOgbonna\OneDrive - Ogilvy\Documents\Blog_99_Automacao\chromedriver-win64\chromedriver.exe"
+)
+NAVEGADOR_ENXUTO = os.environ.get("BLOG99_NAVEGADOR_ENXUTO", "1") == "1"
+TIMEOUT_CARREGAMENTO_S = 30 # driver.get levanta TimeoutException depois disso (o padrão do Chrome é 300 s)
+USER_AGENT = cliente_http.USER_AGENT # O mesmo nos dois caminhos (HTTP e navegador)
+
+# Tipos de recurso bloqueados, por extensão (o '*' final cobre query strings como ?ver=1.2)
+PADROES_RECURSOS_BLOQUEADOS = [
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.css*",
+    "*.mp4*", "*.webm*", "*.mp3*",
+]
+# Domínios de terceiros: analytics, tag managers, anúncios, pixels, chats e embeds
+DOMINIOS_TERCEIROS_BLOQUEADOS = [
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "doubleclick.net",
+    "googleadservices.com", "facebook.net", "facebook.com/tr", "connect.facebook.net",
+    "hotjar.com", "clarity.ms", "analytics.tiktok.com", "bat.bing.com", "snap.licdn.com",
+    "static.ads-twitter.com", "cdn.segment.com", "onesignal.com", "intercom.io", "zendesk.com",
+    "youtube.com", "ytimg.com", "fonts.googleapis.com", "fonts.gstatic.com",
+]
+BLOQUEIOS_EXTRAS = [p.strip() for p in os.environ.get("BLOG99_BLOQUEIOS_EXTRAS", "").split(",") if p.strip()]
+
+
+def padroes_bloqueados():
+    """Padrões de URL (com curinga '*') enviados ao Network.setBlockedURLs."""
+    return (
+        PADROES_RECURSOS_BLOQUEADOS
+        + [f"*{dominio}*" for dominio in DOMINIOS_TERCEIROS_BLOQUEADOS]
+        + BLOQUEIOS_EXTRAS
+    )
+
+
+def criar_opcoes(enxuto=NAVEGADOR_ENXUTO):
+    """ChromeOptions do perfil headless (estabilidade + carregamento enxuto)."""
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--log-level=3')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--ignore-certificate-errors')
+    options.add_argument('--allow-running-insecure-content')
+    options.add_argument(f'--user-agent={USER_AGENT}')
+    # Log de desempenho (eventos Network.*) para medir os bytes transferidos por página
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    if enxuto:
+        options.page_load_strategy = 'eager'
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-background-networking')
+        options.add_argument('--mute-audio')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+    return options
+
+
+def _ativar_bloqueios(driver):
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': padroes_bloqueados()})
+
+
+def inicializar_driver():
+    """
+    Inicializa uma nova instância do ChromeDriver com o perfil enxuto.
+    Usa o chromedriver de CAMINHO_CHROMEDRIVER (variável BLOG99_CHROMEDRIVER) e, se ele não existir,
+    deixa o Selenium localizar um compatível. Retorna None se o driver não puder ser criado.
+    """
+    try:
+        if os.path.exists(CAMINHO_CHROMEDRIVER):
+            service = ChromeService(CAMINHO_CHROMEDRIVER)
+        else:
+            service = ChromeService()
+        driver = webdriver.Chrome(service=service, options=criar_opcoes())
+        driver.set_page_load_timeout(TIMEOUT_CARREGAMENTO_S)
+        if NAVEGADOR_ENXUTO:
+            try:
+                _ativar_bloqueios(driver)
+            except Exception as e:
+                logger.warning(f"Não foi possível ativar o bloqueio de recursos via DevTools: {e}. Seguindo sem bloqueio.")
+        logger.info(f"✅ ChromeDriver inicializado com sucesso (headless, perfil {'enxuto' if NAVEGADOR_ENXUTO else 'completo'}).")
+        return driver
+    except SessionNotCreatedException as e:
+        logger.error(f"❌ Erro ao iniciar o ChromeDriver: {e}. Verifique a compatibilidade do Chrome e ChromeDriver ou o caminho especificado.")
+        return None
+    except Exception as e:
+        logger.error(f"❌ Erro inesperado ao inicializar o ChromeDriver: {e}")
+        return None
+
+
+def bytes_transferidos(driver):
+    """
+    Bytes recebidos pela rede desde a última chamada (soma de encodedDataLength dos eventos
+    Network.loadingFinished do log de desempenho). Ler o log também o esvazia, o que evita que ele
+    cresça na memória do chromedriver ao longo das URLs de um mesmo driver.
+    Retorna None se o driver não tiver log de desempenho.
+    """
+    try:
+        entradas = driver.get_log('performance')
+    except Exception:
+        return None
+    total = 0
+    bloqueadas = 0
+    for entrada in entradas:
+        try:
+            mensagem = json.loads(entrada['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        if mensagem.get('method') == 'Network.loadingFinished':
+            total += int(mensagem.get('params', {}).get('encodedDataLength') or 0)
+        elif mensagem.get('method') == 'Network.loadingFailed' and mensagem.get('params', {}).get('blockedReason'):
+            bloqueadas += 1
+    if bloqueadas:
+        metricas.contar("navegador_requisicoes_bloqueadas", bloqueadas)
+    return total
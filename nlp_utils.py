@@ -1,24 +1,31 @@
 import pandas as pd
-import numpy as np
-import spacy
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import importlib.metadata
+import time
 import logging
+import os
+import cache_lemas
+import metricas
+import clusters_tfidf
+import embeddings_clusters
+import modelos_nlp
+import utilitarios
+from buscador_palavras_chave import BuscadorPalavrasChave
 
 # Configuração básica de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Carregar o modelo spaCy para português
-try:
-    nlp = spacy.load("pt_core_news_sm")
-    logger.info("✅ Modelo spaCy 'pt_core_news_sm' carregado com sucesso.")
-except OSError:
-    logger.error("❌ Modelo spaCy 'pt_core_news_sm' não encontrado. Baixando agora...")
-    spacy.cli.download("pt_core_news_sm")
-    nlp = spacy.load("pt_core_news_sm")
-    logger.info("✅ Modelo spaCy 'pt_core_news_sm' baixado e carregado com sucesso.")
+# --- PRÉ-PROCESSAMENTO EM LOTE ---
+TAMANHO_LOTE_NLP = 64 # Textos por lote no nlp.pipe
+NUM_PROCESSOS_NLP = int(os.environ.get("BLOG99_NLP_PROCESSOS", "1")) # Processos do spaCy no nlp.pipe
+MIN_TEXTOS_MULTIPROCESSO = 200 # Abaixo disso o pré-processamento roda em um único processo
+COMPONENTES_DESATIVADOS = ["parser", "ner"] # Não são usados na lematização
+# Colunas lematizadas por run_nlp_pipeline (gera '<campo>_processado'), separadas por vírgula.
+# Ex.: BLOG99_CAMPOS_PREPROCESSAMENTO=titulo,resumo_meta,conteudo. Vazio (padrão): sem lematização nem spaCy.
+CAMPOS_PREPROCESSAMENTO = [
+    campo.strip() for campo in os.environ.get("BLOG99_CAMPOS_PREPROCESSAMENTO", "").split(",") if campo.strip()
+]
 
 # --- DEFINIÇÃO DOS TOPIC CLUSTERS E SUAS PALAVRAS-CHAVE ---
 # Dicionário que mapeia a categoria principal para um dicionário de Topic Clusters
@@ -73,91 +80,226 @@ TOPIC_CLUSTERS_KEYWORDS = {
 }
 
 
-def preprocess_text(text):
-    """Remove caracteres especiais, números e tokeniza/lemmatiza o texto."""
+def _limpar_texto(text):
     if pd.isna(text) or not isinstance(text, str):
         return ""
     text = re.sub(r'[^a-zA-ZáéíóúÁÉÍÓÚçÇâêîôûÂÊÎÔÛãõÃÕàèìòùÀÈÌÒÙ\s]', '', text) # Remove não-letras e números
-    text = text.lower()
-    doc = nlp(text)
+    return text.lower()
+
+def _lemas(doc):
     # Exclui stopwords e pontuação, retorna lemmas
-    tokens = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
-    return " ".join(tokens)
+    return " ".join(token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.is_alpha)
+
+def _nome_modelo():
+    # Nome e versão do pacote do modelo, sem carregá-lo: um corpus todo em cache não precisa do spaCy
+    nome = modelos_nlp.MODELO_SPACY
+    try:
+        return f"{nome}-{importlib.metadata.version(nome)}"
+    except importlib.metadata.PackageNotFoundError:
+        return nome
+
+def preprocessar_em_lote(textos, batch_size=TAMANHO_LOTE_NLP, n_process=None, cache=None):
+    """
+    Limpa e lematiza uma sequência de textos com nlp.pipe, em lotes e opcionalmente em vários processos.
+
+    Args:
+        textos: Iterável de textos (valores nulos ou não-texto viram "").
+        batch_size: Textos por lote enviado ao spaCy.
+        n_process: Processos do spaCy; padrão NUM_PROCESSOS_NLP. Lotes pequenos rodam sempre em um só processo.
+        cache: CacheLemas usado para não reprocessar textos já lematizados; padrão o cache compartilhado.
+
+    Returns:
+        Lista com o texto lematizado de cada entrada, na mesma ordem.
+    """
+    cache = cache or cache_lemas.obter_cache_lemas()
+    modelo = _nome_modelo()
+    textos = list(textos)
+    hashes = [utilitarios.hash_texto(texto) if texto.strip() else None for texto in map(_limpar_texto, textos)]
+    conhecidos = cache.obter_varios(dict.fromkeys(h for h in hashes if h), modelo)
+    # Limpa de novo só os pendentes, sem guardar uma segunda cópia do corpus inteiro
+    pendentes = {}
+    for texto, hash_conteudo in zip(textos, hashes):
+        if hash_conteudo and hash_conteudo not in conhecidos and hash_conteudo not in pendentes:
+            pendentes[hash_conteudo] = _limpar_texto(texto)
+    log = logger.info if len(textos) > 1 else logger.debug
+    log(f"Pré-processamento NLP: {len(conhecidos)} textos no cache de lemas, {len(pendentes)} para processar.")
+
+    if pendentes:
+        nlp = modelos_nlp.obter_spacy() # O modelo só é carregado aqui, quando há texto novo para lematizar
+        n_process = n_process or NUM_PROCESSOS_NLP
+        if len(pendentes) < MIN_TEXTOS_MULTIPROCESSO:
+            n_process = 1 # Subir processos e copiar o modelo custa mais do que processar poucos textos
+        desativados = [componente for componente in COMPONENTES_DESATIVADOS if componente in nlp.pipe_names]
+        novos = {}
+        docs = nlp.pipe(pendentes.values(), batch_size=batch_size, n_process=n_process, disable=desativados)
+        for hash_conteudo, doc in zip(pendentes.keys(), docs):
+            novos[hash_conteudo] = _lemas(doc)
+            if len(novos) >= batch_size:
+                cache.salvar_varios(novos, modelo)
+                conhecidos.update(novos)
+                novos = {}
+        if novos:
+            cache.salvar_varios(novos, modelo)
+            conhecidos.update(novos)
+
+    return [conhecidos.get(hash_conteudo, "") if hash_conteudo else "" for hash_conteudo in hashes]
+
+def preprocess_text(text):
+    """Remove caracteres especiais, números e tokeniza/lemmatiza o texto."""
+    return preprocessar_em_lote([text])[0]
 
 def calculate_similarity(text1, text2):
-    """Calcula a similaridade de cosseno entre dois textos."""
+    """Calcula a similaridade de cosseno entre dois textos. Para comparar muitos posts, use indice_tfidf.IndiceTFIDF."""
     if not text1 or not text2:
         return 0.0
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
     vectorizer = TfidfVectorizer()
     tfidf_matrix = vectorizer.fit_transform([text1, text2])
     return cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
 
 # --- FUNÇÃO PARA IDENTIFICAR TOPIC CLUSTERS ---
-def identificar_topic_clusters_nlp(categoria_principal, titulo, resumo_meta):
+# Campos concatenados para a busca de palavras-chave. Inclua 'conteudo' para classificar pelo corpo do post.
+CAMPOS_CLUSTERIZACAO = ['titulo', 'resumo_meta']
+# 'palavras_chave' (padrão: presença das palavras-chave em CAMPOS_CLUSTERIZACAO), 'tfidf' (pontuação TF-IDF
+# pelo texto inteiro, ver clusters_tfidf.py) ou 'embeddings' (similaridade semântica, via sentence-transformers)
+MODO_CLUSTERIZACAO = os.environ.get("BLOG99_MODO_CLUSTERIZACAO", "palavras_chave")
+_embeddings_indisponiveis = False # Modelo de embeddings ausente: o modo 'embeddings' passa a usar palavras-chave
+
+_buscador = None
+
+def obter_buscador(recriar=False):
     """
-    Identifica topic clusters com base na categoria principal e nas palavras-chave
-    presentes no título e meta-descrição.
-    Inclui um fallback para gerar um cluster genérico se nenhum for encontrado.
+    Autômato de palavras-chave construído uma única vez a partir de TOPIC_CLUSTERS_KEYWORDS.
+    Use recriar=True depois de alterar o dicionário em tempo de execução.
     """
-    identified_clusters = []
-    
-    # Concatena título e resumo_meta para formar o "contexto" de busca
-    text_to_analyze_lower = "" # Versão em minúsculas para comparação
-    if pd.notna(titulo) and isinstance(titulo, str):
-        text_to_analyze_lower += titulo.lower() + " "
-    if pd.notna(resumo_meta) and isinstance(resumo_meta, str):
-        text_to_analyze_lower += resumo_meta.lower()
-
-    if not text_to_analyze_lower.strip(): # Verifica se há algum texto útil
+    global _buscador
+    if _buscador is None or recriar:
+        _buscador = BuscadorPalavrasChave(TOPIC_CLUSTERS_KEYWORDS)
+    return _buscador
+
+def _juntar_textos(*textos):
+    return " ".join(t for t in textos if pd.notna(t) and isinstance(t, str))
+
+def _clusters_com_fallback(categoria_principal, texto, buscador):
+    if not texto.strip(): # Verifica se há algum texto útil
         # Se não há texto para analisar, atribui um cluster padrão
         return ["Sem Conteúdo"]
 
-    # Busca topic clusters específicos para a categoria principal
-    if categoria_principal in TOPIC_CLUSTERS_KEYWORDS:
-        for cluster_name, keywords in TOPIC_CLUSTERS_KEYWORDS[categoria_principal].items():
-            for keyword in keywords:
-                # Compara a keyword em minúsculas com o texto em minúsculas
-                if keyword.lower() in text_to_analyze_lower:
-                    identified_clusters.append(cluster_name)
-                    break # Encontrou uma keyword para este cluster, pode ir para o próximo cluster
-    
-    # Remove duplicatas
-    identified_clusters = list(set(identified_clusters))
+    # Busca topic clusters específicos para a categoria principal (palavra inteira, sem acentos)
+    identified_clusters = buscador.clusters(texto, categoria_principal)
 
     # --- Lógica de Fallback (SÓ se NENHUM cluster específico for identificado) ---
     if not identified_clusters:
-        if categoria_principal == "Outros":
-            identified_clusters.append("Geral")
-        elif categoria_principal in TOPIC_CLUSTERS_KEYWORDS:
-            identified_clusters.append(f"{categoria_principal} - Genérico")
-        else:
-            identified_clusters.append("Cluster Desconhecido - Genérico")
+        identified_clusters.append(_cluster_generico(categoria_principal))
 
     return identified_clusters
 
+def _cluster_generico(categoria_principal):
+    if categoria_principal == "Outros":
+        return "Geral"
+    elif categoria_principal in TOPIC_CLUSTERS_KEYWORDS:
+        return f"{categoria_principal} - Genérico"
+    return "Cluster Desconhecido - Genérico"
 
-def run_nlp_pipeline(df):
-    logger.info("Iniciando pipeline de NLP...")
+def identificar_topic_clusters_nlp(categoria_principal, titulo, resumo_meta):
+    """
+    Identifica topic clusters com base na categoria principal e nas palavras-chave
+    presentes no título e meta-descrição.
+    Inclui um fallback para gerar um cluster genérico se nenhum for encontrado.
+    """
+    return _clusters_com_fallback(categoria_principal, _juntar_textos(titulo, resumo_meta), obter_buscador())
+
+def identificar_topic_clusters_em_lote(df, campos=None):
+    """
+    Identifica os topic clusters de todas as linhas do DataFrame de uma vez, com o
+    mesmo autômato e uma única passada linear por texto (sem df.apply linha a linha).
+    """
+    campos = [campo for campo in (campos or CAMPOS_CLUSTERIZACAO) if campo in df.columns]
+    buscador = obter_buscador()
+    textos = [_juntar_textos(*valores) for valores in zip(*(df[campo].tolist() for campo in campos))] if campos else [""] * len(df)
+    return [
+        _clusters_com_fallback(categoria, texto, buscador)
+        for categoria, texto in zip(df['categoria'].tolist(), textos)
+    ]
+
+def identificar_topic_clusters_por_embedding(df, campos=None):
+    """
+    Identifica os topic clusters por similaridade de embeddings com os centróides de cada cluster
+    da categoria do post. Posts sem nenhum cluster acima do limiar recebem o resultado por palavras-chave.
+
+    Returns:
+        Tupla (clusters, pontuacoes): por linha, a lista de clusters e a lista de (cluster, similaridade).
+    """
+    campos = [campo for campo in (campos or embeddings_clusters.CAMPOS_EMBEDDING) if campo in df.columns]
+    textos = [_juntar_textos(*valores) for valores in zip(*(df[campo].tolist() for campo in campos))] if campos else [""] * len(df)
+    pontuacoes = embeddings_clusters.atribuir_clusters(df['categoria'].tolist(), textos, TOPIC_CLUSTERS_KEYWORDS)
+    por_palavras_chave = identificar_topic_clusters_em_lote(df)
+    clusters = [
+        [cluster for cluster, _ in ranking] if ranking else fallback
+        for ranking, fallback in zip(pontuacoes, por_palavras_chave)
+    ]
+    return clusters, pontuacoes
 
-    # A função identificar_topic_clusters_nlp já lida com os campos 'titulo' e 'resumo_meta'
-    # diretamente, sem necessidade de pré-processamento para este fim específico.
-    # As linhas abaixo podem ser comentadas/removidas se não forem usadas em outras partes
-    # do seu pipeline NLP que dependam de texto processado.
-    # df['conteudo_processado'] = df['conteudo'].apply(preprocess_text)
-    # df['titulo_processado'] = df['titulo'].apply(preprocess_text)
-    # df['resumo_meta_processado'] = df['resumo_meta'].apply(preprocess_text)
-
-    # --- Aplica a função de identificação de Topic Clusters ---
-    df['topic_clusters'] = df.apply(
-        lambda row: identificar_topic_clusters_nlp(
-            row['categoria'], # Usa a categoria já identificada pelo crawler
-            row['titulo'],    # Usa o título original
-            row['resumo_meta']# Usa a meta-descrição original
-        ),
-        axis=1
+def identificar_topic_clusters_por_tfidf(df, campos=None, ajustar=False):
+    """
+    Pontua os topic clusters de todas as linhas pelo texto inteiro (título, meta descrição e conteúdo),
+    com pesos TF-IDF e um único produto de matrizes esparsas (ver clusters_tfidf.py). Posts sem nenhum
+    cluster acima do limiar recebem o cluster genérico da categoria ("Sem Conteúdo" se não houver texto).
+    Com ajustar=True, o IDF é ajustado sobre estas linhas e gravado para os próximos lotes.
+
+    Returns:
+        Tupla (clusters, pontuacoes): por linha, a lista de clusters e a lista de (cluster, pontuação).
+    """
+    campos = [campo for campo in (campos or clusters_tfidf.CAMPOS_TFIDF) if campo in df.columns]
+    textos = [_juntar_textos(*valores) for valores in zip(*(df[campo].tolist() for campo in campos))] if campos else [""] * len(df)
+    categorias = df['categoria'].tolist()
+    pontuacoes = clusters_tfidf.atribuir_clusters(
+        categorias, textos, TOPIC_CLUSTERS_KEYWORDS, ajustar=ajustar, buscador=obter_buscador()
     )
-    logger.info("✅ Topic clusters identificados (com fallback de categoria genérica).")
+    clusters = [
+        [cluster for cluster, _ in ranking] if ranking
+        else ["Sem Conteúdo"] if not texto.strip() else [_cluster_generico(categoria)]
+        for ranking, texto, categoria in zip(pontuacoes, textos, categorias)
+    ]
+    return clusters, pontuacoes
+
+
+def run_nlp_pipeline(df, campos_clusterizacao=None, campos_preprocessamento=None, modo_clusterizacao=None):
+    logger.info("Iniciando pipeline de NLP...")
+    inicio = time.perf_counter()
+
+    # A identificação de Topic Clusters usa os campos originais (título, meta descrição e conteúdo
+    # no modo 'tfidf') diretamente, sem necessidade de pré-processamento para este fim específico.
+    # Os campos de CAMPOS_PREPROCESSAMENTO são lematizados em lote, com cache por hash do texto.
+    for campo in (CAMPOS_PREPROCESSAMENTO if campos_preprocessamento is None else campos_preprocessamento):
+        if campo in df.columns:
+            df[f'{campo}_processado'] = preprocessar_em_lote(df[campo].tolist())
+            logger.info(f"✅ Coluna '{campo}_processado' gerada.")
+
+    # --- Aplica a identificação de Topic Clusters em lote ---
+    # Usa a categoria já identificada pelo crawler e os campos originais de texto
+    global _embeddings_indisponiveis
+    modo = modo_clusterizacao or MODO_CLUSTERIZACAO
+    if modo == "embeddings" and _embeddings_indisponiveis:
+        modo = "palavras_chave"
+    if modo == "embeddings":
+        try:
+            df['topic_clusters'], df['topic_clusters_scores'] = identificar_topic_clusters_por_embedding(df, campos_clusterizacao)
+            logger.info("✅ Topic clusters identificados por embeddings (com fallback por palavras-chave).")
+        except modelos_nlp.ModeloIndisponivelError as e:
+            # Sem o modelo, todos os lotes falhariam: avisa uma vez e segue por palavras-chave até o fim da execução
+            _embeddings_indisponiveis = True
+            logger.error(f"❌ Clusterização por embeddings indisponível: {e} Usando palavras-chave.")
+            modo = "palavras_chave"
+    if modo == "tfidf":
+        df['topic_clusters'], df['topic_clusters_scores'] = identificar_topic_clusters_por_tfidf(df, campos_clusterizacao)
+        logger.info("✅ Topic clusters pontuados por TF-IDF no texto inteiro (com fallback de categoria genérica).")
+    elif modo != "embeddings":
+        df['topic_clusters'] = identificar_topic_clusters_em_lote(df, campos_clusterizacao)
+        logger.info("✅ Topic clusters identificados (com fallback de categoria genérica).")
 
+    metricas.registrar_duracao("nlp_pipeline", time.perf_counter() - inicio)
     logger.info("Pipeline de NLP concluído.")
     return df
 
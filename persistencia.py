@@ -0,0 +1,102 @@
+"""
+Caminho único de gravação dos micro-lotes na base mestre, usado pelo main.py e pelo
+reextrai_urls_com_erro.py: marcação de quase duplicatas, NLP (topic_cluster) e upsert na base.
+O pool de workers só registra as URLs de um lote como processadas depois que ele foi gravado.
+"""
+import logging
+
+import pandas as pd
+
+import duplicatas
+import estado_crawl
+import nlp_utils
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_FINAIS = [
+    'data_captura', 'data_publicacao', 'url', 'categoria', 'titulo',
+    'resumo_meta', 'topic_cluster', 'grupo_duplicata'
+]
+
+
+def aplicar_nlp(df_lote, base, indice_duplicatas=None):
+    """
+    NLP de um micro-lote, com topic_cluster já no formato do Excel.
+    Com duplicatas.PULAR_NLP_DUPLICATAS, as quase duplicatas de um post da mesma categoria (no lote
+    ou já gravado) não passam pelo NLP: recebem os clusters do primeiro post do grupo, guardados
+    no índice de duplicatas (a base mestre só é lida para grupos gravados antes desse registro).
+    """
+    copias = pd.Series(False, index=df_lote.index)
+    clusters_dos_grupos = {} # grupo -> (categoria, topic_cluster)
+    if duplicatas.PULAR_NLP_DUPLICATAS:
+        candidatas = df_lote['grupo_duplicata'] != df_lote['url']
+        grupos_fora_do_lote = set(df_lote.loc[candidatas, 'grupo_duplicata']) - set(df_lote['url'])
+        if grupos_fora_do_lote:
+            indice_duplicatas = indice_duplicatas or duplicatas.obter_indice_duplicatas()
+            clusters_dos_grupos.update(indice_duplicatas.clusters_de(grupos_fora_do_lote))
+            faltantes = grupos_fora_do_lote - set(clusters_dos_grupos)
+            if faltantes:
+                df_base = base.ler(colunas=['url', 'categoria', 'topic_cluster'], urls=faltantes)
+                clusters_dos_grupos.update(zip(df_base['url'], zip(df_base['categoria'], df_base['topic_cluster'])))
+        categorias_dos_grupos = dict(zip(df_lote.loc[~candidatas, 'url'], df_lote.loc[~candidatas, 'categoria']))
+        categorias_dos_grupos.update({grupo: categoria for grupo, (categoria, _) in clusters_dos_grupos.items()})
+        copias = candidatas & (df_lote['grupo_duplicata'].map(categorias_dos_grupos) == df_lote['categoria'])
+
+    partes = []
+    if (~copias).any():
+        df_processado = nlp_utils.run_nlp_pipeline(df_lote[~copias])
+        df_processado['topic_cluster'] = df_processado['topic_clusters'].apply(lambda x: ', '.join(x) if x else 'Sem Cluster')
+        clusters_dos_grupos.update(zip(df_processado['url'], zip(df_processado['categoria'], df_processado['topic_cluster'])))
+        partes.append(df_processado)
+    if copias.any():
+        df_copias = df_lote[copias].copy()
+        df_copias['topic_cluster'] = df_copias['grupo_duplicata'].map(lambda grupo: clusters_dos_grupos[grupo][1])
+        partes.append(df_copias)
+        logger.info(f"NLP pulado para {int(copias.sum())} quase duplicatas (clusters copiados do primeiro post do grupo).")
+    return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+
+class PersistenciaLotes:
+    """
+    persistir_lote do pool de workers: NLP e gravação na base mestre de cada micro-lote.
+    Só depois disso o pool registra as URLs do lote como processadas: um crash perde no máximo o lote corrente.
+
+    Args:
+        base (BaseMestre): Base onde os posts são gravados (com o conteúdo; o Excel é só uma visão derivada dela).
+        estado (EstadoCrawl): Estado do crawl onde o lastmod das URLs gravadas é registrado.
+        lastmods (dict): {url: lastmod} do sitemap. Pode ser preenchido enquanto o pool roda.
+        urls_revalidar (set): URLs já gravadas na base que estão sendo revalidadas. Se a nova extração
+            falhar (erro ou só placeholders), a linha da base e o lastmod antigo ficam como estão,
+            e a próxima execução tenta de novo.
+    """
+
+    def __init__(self, base, estado, lastmods=None, urls_revalidar=None):
+        self.base = base
+        self.estado = estado
+        self.lastmods = lastmods if lastmods is not None else {}
+        self.urls_revalidar = urls_revalidar if urls_revalidar is not None else set()
+        self.indice_duplicatas = duplicatas.obter_indice_duplicatas()
+        self.posts_gravados = 0
+
+    def __call__(self, posts):
+        falhas = [
+            post["url"] for post in posts
+            if post["url"] in self.urls_revalidar and estado_crawl.status_do_post(post) != estado_crawl.STATUS_OK
+        ]
+        if falhas:
+            logger.warning(f"{len(falhas)} revalidações sem conteúdo no lote: a versão gravada na base é mantida.")
+            posts = [post for post in posts if post["url"] not in falhas]
+            if not posts:
+                return
+        df_lote = pd.DataFrame(posts)
+        # Impressão digital (MinHash) do conteúdo: quase duplicatas recebem o grupo do primeiro post parecido
+        df_lote['grupo_duplicata'] = self.indice_duplicatas.marcar(df_lote['url'].tolist(), df_lote['conteudo'].tolist())
+        df_processado = aplicar_nlp(df_lote, self.base, self.indice_duplicatas)
+        self.base.upsert(df_processado[COLUNAS_FINAIS + ['conteudo']])
+        self.indice_duplicatas.registrar_clusters(
+            df_processado['url'].tolist(), df_processado['categoria'].tolist(), df_processado['topic_cluster'].tolist()
+        )
+        self.estado.registrar_lastmods({
+            url: self.lastmods[url] for url in df_processado['url'] if self.lastmods.get(url)
+        })
+        self.posts_gravados += len(posts)
@@ -0,0 +1,261 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+import crawler
+import estado_crawl
+import gerenciador_driver
+import metricas
+import utilitarios
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 8
+MEMORIA_POR_NAVEGADOR_MB = 500 # Consumo aproximado de um Chrome headless com uma aba aberta (ativo ou reserva)
+TAMANHO_MICRO_LOTE = 50 # Posts por lote de NLP + gravação na base (persistir_lote); cada lote é durável antes do próximo
+
+_FIM = None # Sentinela que sinaliza o fim das filas
+
+
+def _valor_env(nome):
+    valor_env = os.environ.get(nome)
+    if valor_env:
+        try:
+            return max(1, int(valor_env))
+        except ValueError:
+            logger.warning(f"{nome} inválido ('{valor_env}'). Usando cálculo automático.")
+    return None
+
+
+def calcular_num_workers():
+    """
+    Define quantos workers usar: variável de ambiente BLOG99_NUM_WORKERS, se existir,
+    senão o número de núcleos limitado por MAX_WORKERS. A memória limita só os navegadores
+    (calcular_max_navegadores): a maior parte das páginas vem pelo caminho HTTP, sem Chrome.
+    """
+    return _valor_env("BLOG99_NUM_WORKERS") or max(1, min(os.cpu_count() or 1, MAX_WORKERS))
+
+
+def calcular_max_navegadores():
+    """
+    Quantos Chrome (ativos e reservas) podem ficar abertos ao mesmo tempo: variável de ambiente
+    BLOG99_MAX_NAVEGADORES, se existir, senão o limite pela memória disponível.
+    Retorna None quando não há limite a aplicar.
+    """
+    valor_env = _valor_env("BLOG99_MAX_NAVEGADORES")
+    if valor_env:
+        return valor_env
+    try:
+        memoria_total_mb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None # os.sysconf não existe no Windows
+    # Reserva metade da memória para o sistema e para o próprio pipeline
+    return max(1, memoria_total_mb // 2 // MEMORIA_POR_NAVEGADOR_MB)
+
+
+def _worker(worker_id, fila_urls, fila_resultados, fabrica_driver, total_urls, urls_revalidar, vagas_navegador):
+    """
+    Consome URLs da fila compartilhada. O WebDriver próprio (com reserva, ver gerenciador_driver)
+    só é criado na primeira URL que precisa do Selenium; sem navegador, o worker segue pelo caminho HTTP.
+    """
+    gerenciador = gerenciador_driver.GerenciadorDriver(fabrica_driver, nome=f"Worker {worker_id}", vagas=vagas_navegador)
+
+    while True:
+        item = fila_urls.get()
+        if item is _FIM:
+            break
+        i, url = item
+
+        post_data = None
+        erro = None
+        start_time = time.time()
+        for tentativa in range(2):
+            try:
+                post_data = crawler.extrair_conteudo_da_url(
+                    url, revalidar=url in urls_revalidar, obter_driver=gerenciador.obter
+                )
+                break
+            except crawler.FalhaHTTP as e:
+                erro = f"FalhaHTTP: {e}"
+                logger.error(f"[Worker {worker_id}] ❌ {url} não pôde ser obtida via HTTP. Detalhes: {e}")
+                break
+            except WebDriverException as e:
+                erro = f"WebDriverException: {e}"
+                logger.error(f"[Worker {worker_id}] ❌ Erro do WebDriver para {url}. Detalhes: {e}. Reiniciando o driver.")
+                gerenciador.descartar()
+                metricas.contar("driver_erros")
+                if "invalid session id" not in str(e).lower():
+                    break
+            except Exception as e:
+                erro = f"{type(e).__name__}: {e}"
+                logger.exception(f"[Worker {worker_id}] ❌ Erro inesperado para {url}. Detalhes: {e}")
+                break
+
+        elapsed = time.time() - start_time
+        metricas.registrar_duracao("url_total", elapsed)
+        logger.info(f"[Worker {worker_id}] URL {i+1}/{total_urls}: {url} processada em {elapsed:.2f} segundos.")
+        fila_resultados.put((i, url, post_data, elapsed, erro))
+
+    gerenciador.encerrar()
+
+
+def _registrar(estado, item, erro_lote=None):
+    _, url, post_data, elapsed, erro = item
+    if erro_lote:
+        # Extraída, mas não persistida: volta para a fila de retentativa
+        estado.registrar_resultado(url, estado_crawl.STATUS_ERRO, duracao_s=elapsed, erro=erro_lote)
+        return
+    estado.registrar_resultado(
+        url, estado_crawl.status_do_post(post_data), duracao_s=elapsed, erro=erro,
+        hash_conteudo=utilitarios.hash_texto(post_data["conteudo"]) if post_data and post_data.get("conteudo") else None
+    )
+
+
+def _fechar_lote(lote, estado, persistir_lote):
+    """
+    Persiste um micro-lote e só então registra suas URLs no estado do crawl.
+    Se a persistência falhar, as URLs do lote ficam com erro e são refeitas depois.
+    Uma falha ao registrar o lote (ex.: erro do SQLite) também marca suas URLs com erro, sem
+    derrubar o escritor: os lotes seguintes continuam sendo gravados.
+    """
+    lote.sort(key=lambda item: item[0])
+    posts = [item[2] for item in lote if item[2]]
+    erro_lote = None
+    if posts:
+        try:
+            with metricas.medir("persistencia_lote"):
+                persistir_lote(posts)
+        except Exception as e:
+            erro_lote = f"Falha ao persistir o lote: {type(e).__name__}: {e}"
+            logger.exception(f"❌ {erro_lote}. {len(posts)} URLs voltam para a fila de retentativa.")
+    try:
+        for item in lote:
+            _registrar(estado, item, erro_lote if item[2] else None)
+        estado.commit()
+    except Exception as e:
+        erro_registro = f"Falha ao registrar o lote: {type(e).__name__}: {e}"
+        logger.exception(f"❌ {erro_registro}. As {len(lote)} URLs do lote são marcadas com erro.")
+        try:
+            for item in lote:
+                _registrar(estado, item, erro_registro)
+            estado.commit()
+        except Exception:
+            logger.exception("❌ Não foi possível marcar as URLs do lote com erro no estado do crawl.")
+
+
+def _escritor(fila_resultados, resultados, estado, persistir_lote=None, tamanho_lote=TAMANHO_MICRO_LOTE):
+    """
+    Único responsável por gravar resultados: serializa as escritas no estado do crawl
+    e na lista de posts, evitando concorrência entre workers.
+    URLs que só produziram placeholders ficam com status 'placeholder' e entram na fila de retentativa.
+
+    Com persistir_lote, os resultados são agrupados em micro-lotes de tamanho_lote e nada fica
+    acumulado em memória: cada lote é persistido (ex.: NLP + base mestre) antes de suas URLs
+    contarem como processadas, então um crash perde no máximo o lote corrente.
+    """
+    lote = []
+    while True:
+        item = fila_resultados.get()
+        if item is _FIM:
+            break
+        if persistir_lote is None:
+            _registrar(estado, item)
+            if item[2]:
+                resultados.append((item[0], item[2]))
+            continue
+        lote.append(item)
+        if len(lote) >= tamanho_lote:
+            _fechar_lote(lote, estado, persistir_lote)
+            lote = []
+    if lote:
+        _fechar_lote(lote, estado, persistir_lote)
+    estado.commit()
+
+
+def _colocar(fila, item, workers):
+    """Enfileira com espera limitada, desistindo se todos os workers já tiverem encerrado."""
+    while True:
+        try:
+            fila.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            if not any(worker.is_alive() for worker in workers):
+                return False
+
+
+def processar_urls_em_paralelo(urls, fabrica_driver, estado=None, num_workers=None, urls_revalidar=None,
+                               persistir_lote=None, tamanho_lote=TAMANHO_MICRO_LOTE):
+    """
+    Processa as URLs com um pool de workers, cada um com seu próprio WebDriver (criado só se o Selenium for necessário).
+
+    Args:
+        urls (iterable): URLs a processar. Pode ser um gerador (ex.: o sitemap em streaming):
+            as URLs vão para a fila à medida que são produzidas.
+        fabrica_driver (callable): Função sem argumentos que cria um WebDriver (ou None em caso de falha).
+        estado (EstadoCrawl): Estado do crawl onde o resultado de cada URL é registrado.
+            Se None, usa a instância compartilhada de estado_crawl.
+        num_workers (int): Número de workers. Se None, usa calcular_num_workers().
+        urls_revalidar (set): URLs já processadas que mudaram no sitemap (extraídas com GET condicional).
+            Pode ser preenchido pelo próprio gerador antes de entregar cada URL.
+        persistir_lote (callable): Recebe cada micro-lote de post_data e o grava de forma durável.
+            As URLs só são registradas no estado do crawl depois que o lote foi persistido.
+        tamanho_lote (int): Número de resultados por micro-lote.
+
+    Returns:
+        list: Lista de dicionários post_data na ordem das URLs de entrada
+            (vazia com persistir_lote, já que os posts não são acumulados em memória).
+    """
+    num_workers = num_workers or calcular_num_workers()
+    total_urls = len(urls) if hasattr(urls, "__len__") else "?"
+    if total_urls != "?":
+        num_workers = min(num_workers, total_urls) or 1
+    max_navegadores = calcular_max_navegadores()
+    vagas_navegador = threading.BoundedSemaphore(max_navegadores) if max_navegadores else None
+    logger.info(
+        f"Iniciando pool com {num_workers} workers para {total_urls} URLs "
+        f"(até {max_navegadores or 'N'} navegadores abertos ao mesmo tempo)."
+    )
+
+    # Fila limitada: um gerador lento ou rápido demais não acumula URLs em memória
+    fila_urls = queue.Queue(maxsize=num_workers * 4)
+    fila_resultados = queue.Queue()
+
+    resultados = []
+    estado = estado or estado_crawl.obter_estado()
+    escritor = threading.Thread(
+        target=_escritor, args=(fila_resultados, resultados, estado, persistir_lote, tamanho_lote), daemon=True
+    )
+    escritor.start()
+
+    workers = [
+        threading.Thread(
+            target=_worker,
+            args=(worker_id, fila_urls, fila_resultados, fabrica_driver, total_urls,
+                  urls_revalidar if urls_revalidar is not None else set(), vagas_navegador),
+            name=f"worker-{worker_id}",
+            daemon=True
+        )
+        for worker_id in range(1, num_workers + 1)
+    ]
+    for worker in workers:
+        worker.start()
+
+    for item in enumerate(urls):
+        if not _colocar(fila_urls, item, workers):
+            logger.error("Todos os workers encerraram. URLs restantes não serão processadas.")
+            break
+    for _ in workers:
+        if not _colocar(fila_urls, _FIM, workers):
+            break
+    for worker in workers:
+        worker.join()
+
+    fila_resultados.put(_FIM)
+    escritor.join()
+
+    resultados.sort(key=lambda item: item[0])
+    return [post_data for _, post_data in resultados]
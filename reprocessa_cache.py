@@ -0,0 +1,48 @@
+"""
+Modo replay: refaz extração, NLP e exportação de todo o corpus a partir do cache de HTML,
+sem rede e sem navegador. Útil para testar mudanças nos extratores ou em
+nlp_utils.TOPIC_CLUSTERS_KEYWORDS sem recrawl.
+Uso:
+    python reprocessa_cache.py [saida.xlsx]
+"""
+import pandas as pd
+import crawler
+import cache_html
+import exportador
+import nlp_utils
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def reprocessar_cache(nome_saida="blog99_resultado_cache.xlsx"):
+    cache = cache_html.obter_cache()
+    entradas = cache.entradas()
+    logger.info(f"Total de páginas no cache: {len(entradas)}")
+    if not entradas:
+        logger.warning("Cache de HTML vazio. Nada para reprocessar.")
+        return None
+
+    all_posts_data = []
+    for i, (url, _hash, data_captura) in enumerate(entradas):
+        html = cache.obter(url)
+        if html is None:
+            continue
+        post_data = crawler.processar_html(url, html, origem="cache")
+        post_data["data_captura"] = data_captura # Data em que a página foi baixada, não a do replay
+        all_posts_data.append(post_data)
+        logger.debug(f"{i+1}/{len(entradas)}: {url} reprocessada.")
+
+    df = nlp_utils.run_nlp_pipeline(pd.DataFrame(all_posts_data))
+    df['topic_cluster'] = df['topic_clusters'].apply(lambda x: ', '.join(x) if x else 'Sem Cluster')
+    colunas_finais = [
+        'data_captura', 'data_publicacao', 'url', 'categoria', 'titulo',
+        'resumo_meta', 'topic_cluster'
+    ]
+    arquivo = exportador.exportar_para_excel(df[colunas_finais], nome_base=nome_saida.replace('.xlsx', ''))
+    logger.info(f"Arquivo exportado: {arquivo}")
+    return arquivo
+
+if __name__ == "__main__":
+    import sys
+    reprocessar_cache(sys.argv[1] if len(sys.argv) > 1 else "blog99_resultado_cache.xlsx")
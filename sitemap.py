@@ -0,0 +1,123 @@
+import logging
+import queue
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from lxml import etree
+
+import agendador
+import cliente_http
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_TIMEOUT = cliente_http.TIMEOUT_PADRAO # (conexão, leitura) em segundos
+MAX_WORKERS_SITEMAP = 4
+TAMANHO_FILA = 1000 # Limite de URLs em trânsito entre os downloads e o consumidor
+TAMANHO_CHUNK = 64 * 1024
+
+_FIM_SITEMAP = object() # Sentinela: um sitemap (índice ou filho) terminou de ser lido
+
+
+def _eventos(parser):
+    """Consome os elementos já completos do parser, descartando-os logo após o uso."""
+    for _, elem in parser.read_events():
+        loc = elem.findtext("{*}loc")
+        lastmod = elem.findtext("{*}lastmod")
+        tipo = etree.QName(elem).localname
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+        if loc:
+            yield tipo, loc.strip(), lastmod.strip() if lastmod else None
+
+
+def _ler_sitemap(url, headers, timeout):
+    """
+    Lê um sitemap em streaming com um parser incremental e gera ('sitemap', loc, None)
+    para cada filho de um sitemap-index e ('url', loc, lastmod) para cada URL.
+    O corpo nunca é carregado inteiro em memória. Trata Content-Encoding gzip e
+    também arquivos .xml.gz (detectados pelo magic number).
+    """
+    parser = etree.XMLPullParser(
+        events=("end",), tag=("{*}url", "{*}sitemap"),
+        resolve_entities=False, no_network=True, huge_tree=True
+    )
+    descompressor = None
+    with cliente_http.get_com_retentativa(url, rotulo="sitemap_get", headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        for i, chunk in enumerate(response.iter_content(chunk_size=TAMANHO_CHUNK)):
+            if i == 0 and chunk[:2] == b'\x1f\x8b':
+                descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if descompressor:
+                chunk = descompressor.decompress(chunk)
+            parser.feed(chunk)
+            yield from _eventos(parser)
+        cliente_http.contabilizar_bytes(response, "sitemap_get")
+    parser.close()
+    yield from _eventos(parser)
+
+
+def iterar_sitemaps(sitemap_urls, headers=None, max_workers=MAX_WORKERS_SITEMAP, timeout=SITEMAP_TIMEOUT):
+    """
+    Gera (url, lastmod) de todos os sitemaps informados, seguindo sitemap-index
+    recursivamente e baixando os filhos em paralelo. As URLs são entregues assim
+    que encontradas, sem esperar a leitura completa.
+    Erros em um sitemap são registrados e não interrompem os demais.
+    """
+    fila = queue.Queue(maxsize=TAMANHO_FILA)
+    cancelado = threading.Event()
+    lock = threading.Lock()
+    visitados = set()
+    pendentes = [0]
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sitemap")
+
+    def colocar(item):
+        while not cancelado.is_set():
+            try:
+                fila.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def processar(url):
+        try:
+            logger.info(f"Processando sitemap: {url}")
+            for tipo, loc, lastmod in _ler_sitemap(url, headers, timeout):
+                if cancelado.is_set():
+                    return
+                if tipo == "sitemap":
+                    agendar(loc)
+                else:
+                    colocar((loc, lastmod))
+        except (requests.exceptions.RequestException, agendador.FalhaTransitoria, etree.XMLSyntaxError, OSError) as e:
+            logger.warning(f"❌ Erro ao baixar ou processar sitemap '{url}'. Detalhes: {e}")
+        except Exception as e:
+            logger.exception(f"❌ Ocorreu um erro inesperado ao processar sitemap '{url}'. Detalhes: {e}")
+        finally:
+            colocar(_FIM_SITEMAP)
+
+    def agendar(url):
+        with lock:
+            if cancelado.is_set() or url in visitados:
+                return
+            visitados.add(url)
+            pendentes[0] += 1
+        executor.submit(processar, url)
+
+    try:
+        for sitemap_url in sitemap_urls:
+            agendar(sitemap_url)
+        while True:
+            item = fila.get()
+            if item is _FIM_SITEMAP:
+                with lock:
+                    pendentes[0] -= 1
+                    if pendentes[0] == 0:
+                        break
+                continue
+            yield item
+    finally:
+        cancelado.set()
+        executor.shutdown(wait=False)
@@ -0,0 +1,30 @@
+from duplicatas import IndiceDuplicatas
+
+TEXTO = " ".join(f"palavra{i}" for i in range(200))
+
+
+def test_placeholders_nao_formam_grupo(tmp_path):
+    indice = IndiceDuplicatas(caminho=str(tmp_path / "duplicatas.sqlite"))
+    urls = [
+        "https://99app.com/blog/motorista/post/",
+        "https://99app.com/blog/99pay/post/",
+        "https://99app.com/blog/99food/post/",
+    ]
+
+    grupos = indice.marcar(urls, ["Conteúdo Indisponível", "Conteúdo Indisponível", None])
+
+    assert grupos == urls
+    assert indice.grupos() == {}
+    assert indice.urls() == set()
+    indice.fechar()
+
+
+def test_quase_duplicatas_recebem_o_grupo_do_primeiro_post(tmp_path):
+    indice = IndiceDuplicatas(caminho=str(tmp_path / "duplicatas.sqlite"))
+    primeiro, copia = "https://99app.com/blog/motorista/a/", "https://99app.com/blog/99pay/a/"
+
+    grupos = indice.marcar([primeiro, copia], [TEXTO, TEXTO + " fim"])
+
+    assert grupos == [primeiro, primeiro]
+    assert indice.grupos() == {primeiro: sorted([primeiro, copia])}
+    indice.fechar()
@@ -0,0 +1,25 @@
+import estado_crawl
+from estado_crawl import STATUS_ERRO, STATUS_OK, EstadoCrawl
+
+URL = "https://99app.com/blog/motorista/post/"
+
+
+def test_sucesso_zera_as_tentativas(tmp_path):
+    estado = EstadoCrawl(caminho=str(tmp_path / "estado.sqlite"))
+    for status in (STATUS_ERRO, STATUS_ERRO, STATUS_OK, STATUS_OK, STATUS_ERRO):
+        estado.registrar_resultado(URL, status)
+
+    assert estado.situacoes()[URL] == (STATUS_ERRO, 1)
+    assert estado.fila_retentativa() == [URL]
+    estado.fechar()
+
+
+def test_falhas_consecutivas_esgotam_as_tentativas(tmp_path):
+    estado = EstadoCrawl(caminho=str(tmp_path / "estado.sqlite"))
+    estado.registrar_resultado(URL, STATUS_OK)
+    for _ in range(estado_crawl.MAX_TENTATIVAS):
+        estado.registrar_resultado(URL, STATUS_ERRO)
+
+    assert estado.situacoes()[URL] == (STATUS_ERRO, estado_crawl.MAX_TENTATIVAS)
+    assert estado.fila_retentativa() == []
+    estado.fechar()
@@ -0,0 +1,19 @@
+import extrator_html
+
+SECAO = "teste-seletores"
+
+
+def _pagina(corpo):
+    return f"<html><head><title>Post</title></head><body>{corpo}</body></html>"
+
+
+def test_dica_da_secao_nao_passa_na_frente_de_seletor_prioritario(monkeypatch):
+    monkeypatch.setattr(extrator_html, "_seletor_por_secao", {})
+    so_div = _pagina('<div class="entry-content">Corpo da div.</div>')
+    com_article = _pagina(
+        '<div class="entry-content">Bloco relacionado.</div><article class="entry-content">Corpo do artigo.</article>'
+    )
+
+    assert extrator_html.extrair_conteudo(extrator_html.parse_html(so_div), secao=SECAO) == "Corpo da div."
+    assert extrator_html.extrair_conteudo(extrator_html.parse_html(com_article), secao=SECAO) == "Corpo do artigo."
+    assert extrator_html.extrair_conteudo(extrator_html.parse_html(so_div), secao=SECAO) == "Corpo da div."
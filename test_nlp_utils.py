@@ -0,0 +1,72 @@
+import pandas as pd
+
+import cache_lemas
+import embeddings_clusters
+import modelos_nlp
+import nlp_utils
+
+
+def _lote():
+    return pd.DataFrame({
+        'url': ["https://99app.com/blog/99pay/renda/"],
+        'categoria': ["99Pay"],
+        'titulo': ["Como fazer renda extra"],
+        'resumo_meta': [""],
+        'conteudo': ["Dicas de renda extra."],
+    })
+
+
+def test_embeddings_indisponiveis_caem_nas_palavras_chave(monkeypatch):
+    chamadas = []
+
+    def sem_modelo(*args, **kwargs):
+        chamadas.append(args)
+        raise modelos_nlp.ModeloIndisponivelError("Modelo ausente.")
+
+    monkeypatch.setattr(embeddings_clusters, "atribuir_clusters", sem_modelo)
+    monkeypatch.setattr(nlp_utils, "_embeddings_indisponiveis", False)
+
+    for _ in range(2):
+        df = nlp_utils.run_nlp_pipeline(_lote(), campos_preprocessamento=[], modo_clusterizacao="embeddings")
+        assert df['topic_clusters'].tolist() == [["Renda Extra"]]
+    assert len(chamadas) == 1
+
+
+class _Token:
+    def __init__(self, texto):
+        self.lemma_ = texto.rstrip("s")
+        self.is_stop = texto in {"de", "a", "o"}
+        self.is_punct = False
+        self.is_alpha = texto.isalpha()
+
+
+class _SpacyFalso:
+    pipe_names = ["tok2vec", "lemmatizer", "parser", "ner"]
+
+    def __init__(self):
+        self.textos = []
+
+    def pipe(self, textos, batch_size, n_process, disable):
+        assert disable == ["parser", "ner"]
+        for texto in textos:
+            self.textos.append(texto)
+            yield [_Token(palavra) for palavra in texto.split()]
+
+
+def test_pipeline_lematiza_em_lote_com_cache(tmp_path, monkeypatch):
+    nlp = _SpacyFalso()
+    cache = cache_lemas.CacheLemas(caminho=str(tmp_path / "lemas.sqlite"))
+    monkeypatch.setattr(modelos_nlp, "obter_spacy", lambda: nlp)
+    monkeypatch.setattr(cache_lemas, "obter_cache_lemas", lambda: cache)
+    monkeypatch.setattr(nlp_utils, "CAMPOS_PREPROCESSAMENTO", ["titulo", "conteudo"])
+
+    df = nlp_utils.run_nlp_pipeline(_lote(), modo_clusterizacao="palavras_chave")
+    assert df['titulo_processado'].tolist() == ["como fazer renda extra"]
+    assert df['conteudo_processado'].tolist() == ["dica renda extra"]
+    assert len(nlp.textos) == 2
+
+    # Textos já lematizados vêm do cache, sem passar de novo pelo spaCy
+    df = nlp_utils.run_nlp_pipeline(_lote(), modo_clusterizacao="palavras_chave")
+    assert df['conteudo_processado'].tolist() == ["dica renda extra"]
+    assert len(nlp.textos) == 2
+    cache.fechar()
@@ -0,0 +1,37 @@
+import queue
+
+import pool_workers
+from estado_crawl import STATUS_ERRO, STATUS_OK, EstadoCrawl
+
+URLS = [f"https://99app.com/blog/motorista/post-{i}/" for i in range(4)]
+
+
+def _item(i):
+    post = {"url": URLS[i], "conteudo": f"Conteúdo do post {i}."}
+    return (i, URLS[i], post, 0.1, None)
+
+
+def test_falha_ao_registrar_lote_nao_derruba_o_escritor(tmp_path, monkeypatch):
+    estado = EstadoCrawl(caminho=str(tmp_path / "estado.sqlite"))
+    registrar = estado.registrar_resultado
+    falhas = []
+
+    def registrar_com_falha(url, status, **kwargs):
+        if url == URLS[0] and status == STATUS_OK and not falhas:
+            falhas.append(url)
+            raise RuntimeError("database is locked")
+        return registrar(url, status, **kwargs)
+
+    monkeypatch.setattr(estado, "registrar_resultado", registrar_com_falha)
+    gravados = []
+    fila = queue.Queue()
+    for i in range(len(URLS)):
+        fila.put(_item(i))
+    fila.put(pool_workers._FIM)
+
+    pool_workers._escritor(fila, [], estado, persistir_lote=gravados.extend, tamanho_lote=2)
+
+    assert [post["url"] for post in gravados] == URLS
+    situacoes = estado.situacoes()
+    assert [situacoes[url][0] for url in URLS] == [STATUS_ERRO, STATUS_ERRO, STATUS_OK, STATUS_OK]
+    estado.fechar()
@@ -0,0 +1,31 @@
+"""
+Utilitários compartilhados pelos módulos do crawler: instâncias únicas criadas no primeiro uso
+(estado do crawl, caches, índices, sessão HTTP) e o hash dos textos usado como chave nos caches.
+"""
+import hashlib
+import threading
+
+
+def compartilhado(fabrica):
+    """
+    Retorna uma função que cria a instância com fabrica(*chave) no primeiro uso e depois devolve
+    sempre a mesma (uma por chave, se houver), inclusive quando chamada de várias threads ao mesmo tempo.
+    """
+    instancias = {}
+    lock = threading.Lock()
+
+    def obter(*chave):
+        instancia = instancias.get(chave)
+        if instancia is None:
+            with lock:
+                instancia = instancias.get(chave)
+                if instancia is None:
+                    instancia = instancias[chave] = fabrica(*chave)
+        return instancia
+
+    return obter
+
+
+def hash_texto(texto):
+    """SHA-256 (hexadecimal) do texto em UTF-8."""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()